@@ -0,0 +1,78 @@
+""" Measure how long importing parts of `langchain_interface` takes in a fresh
+interpreter, as short-lived CLI workers and spawned processes pay it.
+
+Usage:
+    python -m benchmarks.import_time [--rounds 5] [--pythonpath PATH]
+
+Every statement runs in `--rounds` new processes. We report the median time of
+the statement itself and of the whole process, and which heavy dependencies the
+statement loaded. `--pythonpath` points at another checkout of the package (e.g.
+a `git worktree` of an older commit) to compare against.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Text
+
+
+STATEMENTS = [
+    "import langchain_interface.steps",
+    "from langchain_interface.steps import Step; Step.by_name('decompose')",
+    "from langchain_interface.steps import Step; [Step.by_name(name) for name in Step.list_available()]",
+    "import langchain_interface.example_selectors",
+    "import langchain_interface.interfaces",
+    "from langchain_interface.interfaces import BIRDProbInferenceInterface",
+]
+
+_HEAVY_MODULES = ["langchain_core.runnables", "langchain.prompts", "langgraph", "numpy", "rank_bm25", "tqdm"]
+
+_TEMPLATE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+print(json.dumps({{"seconds": time.perf_counter() - start, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def _run_once(statement: Text, pythonpath: Optional[Text]) -> Dict[Text, Any]:
+    # `-c` puts the working directory first on the path
+    directory = pythonpath if pythonpath is not None else os.getcwd()
+    start = os.times().elapsed
+    completed = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", _TEMPLATE.format(statement=statement, heavy=_HEAVY_MODULES)],
+        cwd=directory, env={**os.environ, "PYTHONPATH": directory}, capture_output=True, text=True, check=True
+    )
+    return {**json.loads(completed.stdout.strip().splitlines()[-1]), "process_seconds": os.times().elapsed - start}
+
+
+def run(statements: List[Text], rounds: int, pythonpath: Optional[Text] = None) -> List[Dict[Text, Any]]:
+    results = []
+
+    for statement in statements:
+        runs = [_run_once(statement, pythonpath) for _ in range(rounds)]
+        results.append({
+            "statement": statement,
+            "import_ms": statistics.median(run["seconds"] for run in runs) * 1e3,
+            "process_ms": statistics.median(run["process_seconds"] for run in runs) * 1e3,
+            "loaded": runs[0]["loaded"],
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--pythonpath", type=str, default=None)
+    parser.add_argument("--statements", type=str, nargs="+", default=STATEMENTS)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.statements, args.rounds, pythonpath=args.pythonpath), indent=4))
+
+
+if __name__ == "__main__":
+    main()
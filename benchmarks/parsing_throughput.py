@@ -0,0 +1,83 @@
+""" Measure output-parser throughput over a corpus of recorded responses.
+
+Usage:
+    python -m benchmarks.parsing_throughput [--rounds 2000] [--fixture PATH]
+
+For every parser in the corpus, we report parses per second both with a cold
+fenced-block cache (cleared before every round) and with a warm cache (the same
+completion parsed repeatedly, as happens when several consumers look at it).
+We also report the throughput of `parse_many` over the whole corpus at once.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import time
+from typing import Text, Dict, Any, List
+from langchain_interface.parsers.fenced_blocks import find_fenced_blocks
+
+
+_DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "recorded_responses.json")
+
+
+def _load_parser(path: Text):
+    module_name, class_name = path.split(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def _time_rounds(parser, responses: List[Text], rounds: int, clear_cache: bool) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        if clear_cache:
+            find_fenced_blocks.cache_clear()
+        for response in responses:
+            parser.parse(response)
+    return time.perf_counter() - start
+
+
+def _time_bulk(parser, responses: List[Text], rounds: int) -> float:
+    texts = responses * rounds
+    find_fenced_blocks.cache_clear()
+    start = time.perf_counter()
+    parser.parse_many(texts)
+    return time.perf_counter() - start
+
+
+def run(fixture: Text, rounds: int) -> List[Dict[Text, Any]]:
+    with open(fixture, "r") as file_:
+        corpus = json.load(file_)
+
+    results = []
+
+    for entry in corpus:
+        parser = _load_parser(entry["parser"])
+        responses = entry["responses"]
+        num_parses = rounds * len(responses)
+
+        cold = _time_rounds(parser, responses, rounds, clear_cache=True)
+        warm = _time_rounds(parser, responses, rounds, clear_cache=False)
+        bulk = _time_bulk(parser, responses, rounds)
+
+        results.append({
+            "parser": entry["parser"],
+            "num_parses": num_parses,
+            "cold_parses_per_sec": num_parses / cold,
+            "warm_parses_per_sec": num_parses / warm,
+            "bulk_parses_per_sec": num_parses / bulk,
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixture", type=str, default=_DEFAULT_FIXTURE)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.fixture, args.rounds), indent=4))
+
+
+if __name__ == "__main__":
+    main()
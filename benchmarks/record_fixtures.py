@@ -0,0 +1,138 @@
+""" Record the completions that `benchmarks.suite` replays for BIRD runs.
+
+Usage:
+    python -m benchmarks.record_fixtures [--scenarios PATH] [--output PATH] [--model NAME [--base-url URL]]
+
+Every scenario in `--scenarios` is run through the BIRD graph with a
+`RecordingChatModel`. Without `--model`, the completions come from a scripted
+model that answers every BIRD step in its expected format with the factors of
+the scenario and deterministic verdicts, so the recording can be regenerated
+offline whenever a prompt changes. With `--model`, a `ChatOpenAI` model (e.g. a
+vLLM server at `--base-url`) answers instead.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional, Text
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_interface.models.chat_models import RecordingChatModel
+from langchain_interface.interfaces.bird.prob_inference_interface import BIRDProbInferenceInterface
+
+
+_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+DEFAULT_SCENARIOS = os.path.join(_FIXTURES, "bird_scenarios.json")
+DEFAULT_RECORDINGS = os.path.join(_FIXTURES, "bird_recordings.jsonl")
+
+
+def load_scenarios(path: Text = DEFAULT_SCENARIOS) -> List[Dict[Text, Any]]:
+    with open(path, "r", encoding="utf-8") as file_:
+        return json.load(file_)
+
+
+def bird_inputs(scenario: Dict[Text, Any]) -> Dict[Text, Text]:
+    return {key: scenario[key] for key in ("scenario", "condition", "outcome_1", "outcome_2")}
+
+
+def _fields(text: Text) -> Dict[Text, Text]:
+    """ The "Key: value" lines of a prompt. """
+    return dict(line.split(": ", 1) for line in text.split("\n") if ": " in line)
+
+
+def _verdict(*texts: Text, modulo: int) -> int:
+    return int(hashlib.md5("\n".join(texts).encode("utf-8")).hexdigest(), 16) % modulo
+
+
+class _ScriptedBIRDModel(BaseChatModel):
+    """ Answers the prompt of the BIRD step that calls it (known from the
+    `step` metadata of the run) from `scenarios`.
+    """
+
+    scenarios: List[Dict[Text, Any]]
+
+    @property
+    def _llm_type(self) -> Text:
+        return "scripted-bird"
+
+    def _answer(self, step: Optional[Text], prompt: Text) -> Text:
+        fields = _fields(prompt)
+        scenario = next(scenario for scenario in self.scenarios if scenario["scenario"] == fields["Scenario"])
+
+        if step == "BIRDSentenceProposalStep":
+            hypothesis = fields["Hypothesis"]
+            values = [value for values in scenario["factors"].values() for value in values]
+            return "\n".join(
+                f"{idx + 1}. {value}, which makes it more likely that {hypothesis[0].lower()}{hypothesis[1:]}"
+                for idx, value in enumerate(values)
+                if _verdict(hypothesis, value, modulo=2) == 0
+            ) or f"1. {values[0]}."
+        if step == "BIRDSummarizeToFactorStep":
+            return json.dumps(scenario["factors"])
+        if step == "BIRDImplicationCheckStep":
+            implied = _verdict(fields["Condition"], fields["Statement"], modulo=3) > 0
+            return (
+                f"Given that {fields['Condition'][0].lower()}{fields['Condition'][1:]} "
+                f"the statement is {'likely' if implied else 'unlikely'} to hold.\n```{str(implied).lower()}```"
+            )
+        if step == "BIRDGroupedImplicationCheckStep":
+            return json.dumps({"results": [
+                {"statement": statement, "implied": _verdict(fields["Condition"], statement, modulo=3) > 0}
+                for statement in json.loads(fields["Statements"])
+            ]})
+        if step == "BIRDReevaluateImplicationStep":
+            return prompt.split("\n", 1)[1]
+        if step == "BIRDSentenceSupportDeterminationStep":
+            outcome = _verdict(fields["Condition"], fields["Outcome 1"], modulo=2) + 1
+            return f"The condition makes outcome {outcome} more likely.\n```Outcome {outcome}```"
+
+        if step == "BIRDGroupedSentenceSupportDeterminationStep":
+            return json.dumps({"results": [
+                {"condition": condition, "result": f"Outcome {_verdict(condition, fields['Outcome 1'], modulo=2) + 1}"}
+                for condition in json.loads(fields["Conditions"])
+            ]})
+
+        raise ValueError(f"No script for step {step}.")
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[Text]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        step = (run_manager.metadata if run_manager is not None else {}).get("step")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(step, messages[-1].content)))])
+
+
+def record(scenarios: List[Dict[Text, Any]], output_path: Text, llm: Optional[BaseChatModel] = None) -> int:
+    """ Record the BIRD runs of all `scenarios` and return the number of prompts. """
+
+    recorder = RecordingChatModel(llm=llm if llm is not None else _ScriptedBIRDModel(scenarios=scenarios))
+    BIRDProbInferenceInterface().get_runnable(recorder).batch([bird_inputs(scenario) for scenario in scenarios])
+    recorder.save(output_path)
+
+    return len(recorder.records)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=str, default=DEFAULT_SCENARIOS)
+    parser.add_argument("--output", type=str, default=DEFAULT_RECORDINGS)
+    parser.add_argument("--model", type=str, default=None)
+    parser.add_argument("--base-url", type=str, default=None)
+    args = parser.parse_args()
+
+    llm = None
+    if args.model is not None:
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(model=args.model, base_url=args.base_url, temperature=0)
+
+    print(json.dumps({"output": args.output, "num_prompts": record(load_scenarios(args.scenarios), args.output, llm=llm)}, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+""" Measure the cost of merging fan-out branch updates into graph state.
+
+Usage:
+    python -m benchmarks.state_merge [--widths 8 32 128 512] [--rounds 20]
+
+For every fan-out width we report:
+
+- the time to apply `width` single-key updates to a dict channel and `width`
+  completions to a list channel, the way LangGraph applies the writes of one
+  superstep, once with channels that fold the reducers in `states.base_states`
+  (a fresh merged container per update) and once with the one-pass channels
+  there (a single copy per superstep);
+- the time of a whole graph run that fans out `width` `Send` branches, each
+  writing one key and one completion, with either kind of channel.
+"""
+
+import argparse
+import json
+import time
+from typing import Annotated, Any, Dict, List, Text
+from typing_extensions import TypedDict
+from langgraph.channels.base import BaseChannel
+from langgraph.channels.binop import BinaryOperatorAggregate
+from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send
+from langchain_interface.states.base_states import (
+    append,
+    keyupdate,
+    AppendAggregate,
+    KeyUpdateAggregate
+)
+
+
+_COMPLETION = "x" * 2000
+
+
+def _time_fold(dict_channel: BaseChannel, list_channel: BaseChannel, width: int, rounds: int) -> float:
+    updates = [{f"value {idx}": True} for idx in range(width)]
+    completions = [_COMPLETION] * width
+    start = time.perf_counter()
+    for _ in range(rounds):
+        dict_channel.from_checkpoint(None).update(updates)
+        list_channel.from_checkpoint(None).update(completions)
+    return (time.perf_counter() - start) / rounds
+
+
+def _build_graph(dict_channel: Any, list_channel: Any):
+
+    class FanOutState(TypedDict):
+        values: list
+        checks: Annotated[dict, dict_channel]
+        responses: Annotated[list, list_channel]
+
+    def _fan_out(state) -> list:
+        return [Send("check", {"value": value}) for value in state['values']]
+
+    graph_builder = StateGraph(FanOutState)
+    graph_builder.add_node("prepare", lambda state: {})
+    graph_builder.add_node("check", lambda state: {"checks": {state['value']: True}, "responses": _COMPLETION})
+    graph_builder.add_edge(START, "prepare")
+    graph_builder.add_conditional_edges("prepare", _fan_out, ["check"])
+    graph_builder.add_edge("check", END)
+
+    return graph_builder.compile()
+
+
+def _time_graph(dict_channel: Any, list_channel: Any, width: int, rounds: int) -> float:
+    graph = _build_graph(dict_channel, list_channel)
+    inputs = {"values": [f"value {idx}" for idx in range(width)], "checks": {}, "responses": []}
+    start = time.perf_counter()
+    for _ in range(rounds):
+        graph.invoke(inputs)
+    return (time.perf_counter() - start) / rounds
+
+
+def run(widths: List[int], rounds: int) -> List[Dict[Text, Any]]:
+    results = []
+
+    for width in widths:
+        results.append({
+            "width": width,
+            "reducer_fold_ms": _time_fold(
+                BinaryOperatorAggregate(dict, keyupdate), BinaryOperatorAggregate(list, append), width, rounds * 10
+            ) * 1e3,
+            "one_pass_fold_ms": _time_fold(KeyUpdateAggregate(dict), AppendAggregate(list), width, rounds * 10) * 1e3,
+            "reducer_graph_ms": _time_graph(keyupdate, append, width, rounds) * 1e3,
+            "one_pass_graph_ms": _time_graph(KeyUpdateAggregate, AppendAggregate, width, rounds) * 1e3,
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--widths", type=int, nargs="+", default=[8, 32, 128, 512])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    print(json.dumps(run(args.widths, args.rounds), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+""" Measure the library's own overhead offline, with `ReplayChatModel` replaying
+recorded completions instead of calling an LLM.
+
+Usage:
+    python -m benchmarks.suite [--benchmarks render invoke batch parse bird marginalize]
+        [--rounds 20] [--batch-size 16] [--latency 0.] [--output PATH]
+
+Benchmarks:
+
+- render: rendering the prompt of every registered step, with the inputs in
+  `fixtures/step_fixtures.json`;
+- invoke: `Step.chain_llm(...).invoke` of every step, i.e. rendering, the
+  replayed call and parsing the recorded completion;
+- batch: the same chain's `batch` over `--batch-size` copies of the inputs;
+- parse: the step's output parser on the recorded completion;
+- bird: whole BIRD runs over the scenarios of `fixtures/bird_scenarios.json`,
+  replaying `fixtures/bird_recordings.jsonl` (see `benchmarks.record_fixtures`),
+  one by one with `invoke` and all at once with `abatch`;
+- marginalize: `marginalize` over a growing number of factors, exactly, by
+  Monte Carlo sampling and as chosen by the budget, and `marginalize_batch`.
+
+Every measurement is one row with the mean and minimum milliseconds over the
+rounds. The rows are printed as JSON together with the commit, versions and time
+of the run, and `--output` appends the same object as one line to a JSON lines
+file, to track the results over time. `--latency` adds that many seconds to
+every replayed call, e.g. to see how much of it concurrency hides.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import numpy
+import os
+import platform
+import subprocess
+import time
+from importlib import metadata
+from typing import Any, Callable, Dict, List, Optional, Text
+from langchain_interface.steps.step import Step
+from langchain_interface.models.chat_models import ReplayChatModel, prompt_key
+from langchain_interface.interfaces.bird.marginalization import (
+    marginalize,
+    marginalize_exact,
+    marginalize_monte_carlo,
+    marginalize_batch
+)
+from langchain_interface.interfaces.bird.prob_inference_interface import BIRDProbInferenceInterface
+from .record_fixtures import DEFAULT_RECORDINGS, DEFAULT_SCENARIOS, bird_inputs, load_scenarios
+
+
+BENCHMARKS = ["render", "invoke", "batch", "parse", "bird", "marginalize"]
+
+_DEFAULT_STEP_FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "step_fixtures.json")
+
+_PACKAGES = ["langchain-core", "langgraph", "numpy"]
+
+
+def _timed(fn: Callable[[], Any], rounds: int) -> Dict[Text, float]:
+    durations = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return {"rounds": rounds, "mean_ms": sum(durations) / rounds * 1e3, "min_ms": min(durations) * 1e3}
+
+
+def load_step_fixtures(path: Text = _DEFAULT_STEP_FIXTURE) -> List[Dict[Text, Any]]:
+    with open(path, "r", encoding="utf-8") as file_:
+        return json.load(file_)
+
+
+def _step_benchmarks(fixtures: List[Dict[Text, Any]], names: List[Text], rounds: int, batch_size: int, latency: float) -> List[Dict[Text, Any]]:
+    results = []
+
+    for fixture in fixtures:
+        step = Step.by_name(fixture["step"])()
+        inputs, completion = fixture["inputs"], fixture["completion"]
+        prompt_template, output_parser = step.get_prompt_template(), step.get_output_parser()
+        llm = ReplayChatModel(
+            recordings={prompt_key(prompt_template.invoke(inputs).to_messages()): completion},
+            latency=latency
+        )
+        chain = step.chain_llm(llm)
+
+        measured = {
+            "render": lambda: prompt_template.invoke(inputs),
+            "invoke": lambda: chain.invoke(inputs),
+            "batch": lambda: chain.batch([inputs] * batch_size),
+            "parse": lambda: output_parser.parse(completion),
+        }
+        for name in names:
+            results.append({"benchmark": name, "name": fixture["step"], **_timed(measured[name], rounds)})
+
+    return results
+
+
+def _bird_benchmarks(scenarios: List[Dict[Text, Any]], recordings_path: Text, rounds: int, latency: float) -> List[Dict[Text, Any]]:
+    llm = ReplayChatModel.from_file(recordings_path, latency=latency)
+    runnable = BIRDProbInferenceInterface().get_runnable(llm)
+    inputs = [bird_inputs(scenario) for scenario in scenarios]
+    results = []
+
+    try:
+        for scenario_inputs in inputs:
+            results.append({"benchmark": "bird", "name": f"invoke: {scenario_inputs['scenario']}", **_timed(lambda: runnable.invoke(scenario_inputs), rounds)})
+        results.append({"benchmark": "bird", "name": f"abatch: {len(inputs)} scenarios", **_timed(lambda: asyncio.run(runnable.abatch(inputs)), rounds)})
+    except ValueError as error:
+        raise ValueError(f"{error} Prompts changed? Run `python -m benchmarks.record_fixtures` again.") from error
+
+    return results
+
+
+def _marginalize_benchmarks(factor_counts: List[int], num_values: int, rounds: int, seed: int = 0) -> List[Dict[Text, Any]]:
+    rng = numpy.random.default_rng(seed)
+    results = []
+
+    for num_factors in factor_counts:
+        value_dists = [rng.dirichlet(numpy.ones(num_values)) for _ in range(num_factors)]
+        supportiveness = [rng.choice([.25, .5, .75], size=num_values) for _ in range(num_factors)]
+        name = f"{num_factors} factors x {num_values} values"
+
+        results.append({"benchmark": "marginalize", "name": f"auto: {name}", **_timed(lambda: marginalize(value_dists, supportiveness, seed=seed), rounds)})
+        results.append({"benchmark": "marginalize", "name": f"monte-carlo: {name}", **_timed(lambda: marginalize_monte_carlo(value_dists, supportiveness, seed=seed), rounds)})
+        if num_values ** num_factors <= 2 ** 20:
+            results.append({"benchmark": "marginalize", "name": f"exact: {name}", **_timed(lambda: marginalize_exact(value_dists, supportiveness), rounds)})
+        if num_values ** num_factors <= 2 ** 16:
+            batch_dists = numpy.stack([numpy.stack(value_dists)] * 64)
+            batch_support = numpy.stack([numpy.stack(supportiveness)] * 64)
+            results.append({"benchmark": "marginalize", "name": f"batch of 64: {name}", **_timed(lambda: marginalize_batch(batch_dists, batch_support), rounds)})
+
+    return results
+
+
+def _environment() -> Dict[Text, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=os.path.dirname(__file__), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": {package: metadata.version(package) for package in _PACKAGES},
+    }
+
+
+def run(
+    benchmarks: List[Text],
+    rounds: int,
+    batch_size: int = 16,
+    latency: float = 0.,
+    factor_counts: Optional[List[int]] = None,
+    step_fixture: Text = _DEFAULT_STEP_FIXTURE,
+    scenarios: Text = DEFAULT_SCENARIOS,
+    recordings: Text = DEFAULT_RECORDINGS
+) -> Dict[Text, Any]:
+    results = []
+
+    step_names = [name for name in benchmarks if name in ("render", "invoke", "batch", "parse")]
+    if step_names:
+        results.extend(_step_benchmarks(load_step_fixtures(step_fixture), step_names, rounds, batch_size, latency))
+    if "bird" in benchmarks:
+        results.extend(_bird_benchmarks(load_scenarios(scenarios), recordings, rounds, latency))
+    if "marginalize" in benchmarks:
+        results.extend(_marginalize_benchmarks(factor_counts or [2, 4, 6, 8, 10, 12, 16], 3, rounds))
+
+    return {
+        "environment": _environment(),
+        "parameters": {"rounds": rounds, "batch_size": batch_size, "latency": latency},
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--benchmarks", type=str, nargs="+", choices=BENCHMARKS, default=BENCHMARKS)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.)
+    parser.add_argument("--factor-counts", type=int, nargs="+", default=None)
+    parser.add_argument("--step-fixture", type=str, default=_DEFAULT_STEP_FIXTURE)
+    parser.add_argument("--scenarios", type=str, default=DEFAULT_SCENARIOS)
+    parser.add_argument("--recordings", type=str, default=DEFAULT_RECORDINGS)
+    parser.add_argument("--output", type=str, default=None, help="Append the results as one line to this JSON lines file.")
+    args = parser.parse_args()
+
+    report = run(
+        args.benchmarks,
+        args.rounds,
+        batch_size=args.batch_size,
+        latency=args.latency,
+        factor_counts=args.factor_counts,
+        step_fixture=args.step_fixture,
+        scenarios=args.scenarios,
+        recordings=args.recordings
+    )
+
+    if args.output is not None:
+        with open(args.output, "a", encoding="utf-8") as file_:
+            file_.write(json.dumps(report) + "\n")
+
+    print(json.dumps(report, indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+""" Package attributes that are imported on first access (PEP 562), so that
+importing a package does not import every module in it.
+"""
+
+import importlib
+import sys
+from typing import Any, Callable, Dict, List, Text, Tuple
+
+
+def lazy_attributes(package: Text, attributes: Dict[Text, Text]) -> Tuple[Callable[[Text], Any], Callable[[], List[Text]]]:
+    """ The `__getattr__` and `__dir__` of `package`, where `attributes` maps
+    every lazy attribute to the module (relative to `package`) defining it.
+    """
+
+    def __getattr__(name: Text) -> Any:
+        if name not in attributes:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(attributes[name], package), name)
+        # later lookups find it without calling us again
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__() -> List[Text]:
+        return sorted(set(vars(sys.modules[package])) | set(attributes))
+
+    return __getattr__, __dir__
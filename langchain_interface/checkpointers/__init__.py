@@ -0,0 +1 @@
+from .sqlite_checkpoint_saver import SQLiteCheckpointSaver
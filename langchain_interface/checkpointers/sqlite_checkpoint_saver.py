@@ -0,0 +1,277 @@
+""" A durable local LangGraph checkpointer backed by a single SQLite file. """
+
+import random
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Text, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from ..instances.codec import InstanceCodec
+
+
+class SQLiteCheckpointSaver(BaseCheckpointSaver):
+    """ Stores checkpoints like LangGraph's `InMemorySaver` (channel values as
+    versioned blobs, so unchanged channels are not rewritten), but in a SQLite
+    file that survives the process. Values are encoded with `InstanceCodec`
+    unless another `serde` is given.
+    """
+
+    def __init__(self, database_path: Text, serde: Optional[SerializerProtocol] = None):
+        super().__init__(serde=serde if serde is not None else InstanceCodec())
+        self._database_path = database_path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(database_path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(
+                """
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT, parent_checkpoint_id TEXT,
+                    type TEXT, checkpoint BLOB, metadata_type TEXT, metadata BLOB,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+                );
+                CREATE TABLE IF NOT EXISTS blobs (
+                    thread_id TEXT, checkpoint_ns TEXT, channel TEXT, version TEXT, type TEXT, blob BLOB,
+                    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+                );
+                CREATE TABLE IF NOT EXISTS writes (
+                    thread_id TEXT, checkpoint_ns TEXT, checkpoint_id TEXT, task_id TEXT, idx INTEGER,
+                    channel TEXT, type TEXT, blob BLOB, task_path TEXT,
+                    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+                );
+                """
+            )
+
+    def close(self):
+        self._connection.close()
+
+    def _load_blobs(self, thread_id: Text, checkpoint_ns: Text, versions: ChannelVersions) -> Dict[Text, Any]:
+        channel_values = {}
+        for channel, version in versions.items():
+            row = self._connection.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version))
+            ).fetchone()
+            if row is not None and row[0] != "empty":
+                channel_values[channel] = self.serde.loads_typed(row)
+        return channel_values
+
+    def _to_tuple(self, thread_id: Text, checkpoint_ns: Text, row: Tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        checkpoint = self.serde.loads_typed((type_, checkpoint))
+        writes = self._connection.execute(
+            "SELECT task_id, channel, type, blob FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_blobs(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((type_, blob))) for task_id, channel, type_, blob in writes],
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_checkpoint_id,
+                    }
+                }
+                if parent_checkpoint_id else None
+            ),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        )
+
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._connection.execute(query + " AND checkpoint_id = ?", (thread_id, checkpoint_ns, checkpoint_id)).fetchone()
+            else:
+                row = self._connection.execute(query + " ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, checkpoint_ns)).fetchone()
+            return self._to_tuple(thread_id, checkpoint_ns, row) if row is not None else None
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[Text, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints WHERE 1 = 1"
+        )
+        params = []
+        if config is not None:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if config["configurable"].get("checkpoint_ns") is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(config["configurable"]["checkpoint_ns"])
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before is not None and (before_checkpoint_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_checkpoint_id)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+            tuples = []
+            for thread_id, checkpoint_ns, *row in rows:
+                if limit is not None and len(tuples) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[4], row[5]))
+                    if not all(metadata.get(key) == value for key, value in filter.items()):
+                        continue
+                tuples.append(self._to_tuple(thread_id, checkpoint_ns, tuple(row)))
+
+        yield from tuples
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint = checkpoint.copy()
+        values = checkpoint.pop("channel_values")
+
+        blobs = [
+            (thread_id, checkpoint_ns, channel, str(version), *(
+                self.serde.dumps_typed(values[channel]) if channel in values else ("empty", b"")
+            ))
+            for channel, version in new_versions.items()
+        ]
+
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blobs)
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    *self.serde.dumps_typed(checkpoint),
+                    *self.serde.dumps_typed(get_checkpoint_metadata(config, metadata)),
+                )
+            )
+
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[Text, Any]],
+        task_id: Text,
+        task_path: Text = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        rows = [
+            (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx), channel, *self.serde.dumps_typed(value), task_path)
+            for idx, (channel, value) in enumerate(writes)
+        ]
+
+        with self._lock, self._connection:
+            # special writes (errors, interrupts, ...) are replaced, regular ones are only written once
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[4] < 0]
+            )
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[4] >= 0]
+            )
+
+    def delete_thread(self, thread_id: Text) -> None:
+        with self._lock, self._connection:
+            for table in ("checkpoints", "blobs", "writes"):
+                self._connection.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[Text, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[Text, Any]],
+        task_id: Text,
+        task_path: Text = "",
+    ) -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: Text) -> None:
+        return self.delete_thread(thread_id)
+
+    def get_next_version(self, current: Optional[Text], channel: None) -> Text:
+        # same scheme as `InMemorySaver`: versions sort as strings, and the random
+        # suffix keeps forked histories from overwriting each other's blobs
+        if current is None:
+            current_version = 0
+        elif isinstance(current, int):
+            current_version = current
+        else:
+            current_version = int(current.split(".")[0])
+        return f"{current_version + 1:032}.{random.random():016}"
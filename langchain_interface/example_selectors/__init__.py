@@ -1,4 +1,11 @@
-from .constant_example_selector import ConstantExampleSelector
-from .static_and_dynamic_selector import StaticAndDynamicExampleSelector
-from .example_selector import ExampleSelector
-from .bm25_example_selector import BM25ExampleSelector
\ No newline at end of file
+from .._lazy import lazy_attributes
+
+_LAZY_ATTRIBUTES = {
+    "ConstantExampleSelector": ".constant_example_selector",
+    "StaticAndDynamicExampleSelector": ".static_and_dynamic_selector",
+    "ExampleSelector": ".example_selector",
+    "BM25ExampleSelector": ".bm25_example_selector",
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
+__all__ = list(_LAZY_ATTRIBUTES)
@@ -2,13 +2,35 @@
 to support demonstration in prompt.
 """
 import abc
+import importlib
 from registrable import Registrable
 from typing import Dict, List, Text, Any
 from langchain_core.example_selectors import BaseExampleSelector
 
 
+# the module of every registered selector, imported on its first `by_name`
+SELECTOR_MODULES = {
+    "bm25-example-selector": ".bm25_example_selector",
+    "constant-example-selector": ".constant_example_selector",
+    "static-and-dynamic-example-selector": ".static_and_dynamic_selector",
+}
+
+
 class ExampleSelector(Registrable, BaseExampleSelector):
     def __init__(
         self,
     ):
         super().__init__()
+
+    @classmethod
+    def by_name(cls, name: Text) -> type:
+        if cls is ExampleSelector and name in SELECTOR_MODULES:
+            importlib.import_module(SELECTOR_MODULES[name], __package__)
+        return super().by_name(name)
+
+    @classmethod
+    def list_available(cls) -> List[Text]:
+        available = super().list_available()
+        if cls is ExampleSelector:
+            available += [name for name in SELECTOR_MODULES if name not in available]
+        return available
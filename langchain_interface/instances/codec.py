@@ -0,0 +1,105 @@
+""" A compact msgpack encoding for states holding `Instance`s (and other dataclasses),
+usable as a LangGraph checkpoint serializer.
+
+Dataclasses are packed as their field values in declaration order, the same way
+`Instance.__reduce__` rebuilds them, and every class path is written once per
+payload instead of once per object. Tuples survive the round trip. Values the
+encoding cannot express (e.g. LangChain messages) fall back to LangGraph's
+`JsonPlusSerializer`.
+"""
+
+import dataclasses
+import importlib
+import ormsgpack
+from typing import Any, Dict, List, Text, Tuple
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+
+_DATACLASS_EXT = 1
+_TUPLE_EXT = 2
+
+_OPTIONS = (
+    ormsgpack.OPT_PASSTHROUGH_DATACLASS
+    | ormsgpack.OPT_PASSTHROUGH_TUPLE
+    | ormsgpack.OPT_NON_STR_KEYS
+)
+
+
+def _class_path(cls: type) -> Text:
+    if "<locals>" in cls.__qualname__:
+        raise TypeError(f"{cls.__qualname__} cannot be imported back and is not encoded.")
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def _resolve_class(path: Text) -> type:
+    module_name, qualname = path.split(":")
+    cls = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        cls = getattr(cls, name)
+    if not (isinstance(cls, type) and dataclasses.is_dataclass(cls)):
+        raise TypeError(f"{path} is not a dataclass.")
+    return cls
+
+
+def _encode(obj: Any) -> bytes:
+    """ Pack `obj` as (class paths, payload). """
+    classes: Dict[type, int] = {}
+
+    def _default(value: Any) -> ormsgpack.Ext:
+        if isinstance(value, tuple):
+            return ormsgpack.Ext(_TUPLE_EXT, ormsgpack.packb(list(value), default=_default, option=_OPTIONS))
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            index = classes.setdefault(type(value), len(classes))
+            fields = [getattr(value, field.name) for field in dataclasses.fields(value)]
+            return ormsgpack.Ext(_DATACLASS_EXT, ormsgpack.packb([index, *fields], default=_default, option=_OPTIONS))
+        raise TypeError(f"{type(value).__name__} is not supported by the instance encoding.")
+
+    payload = ormsgpack.packb(obj, default=_default, option=_OPTIONS)
+    paths = [None] * len(classes)
+    for cls, index in classes.items():
+        paths[index] = _class_path(cls)
+
+    return ormsgpack.packb([paths, payload])
+
+
+def _decode(data: bytes) -> Any:
+    paths, payload = ormsgpack.unpackb(data)
+    classes = [_resolve_class(path) for path in paths]
+
+    def _ext_hook(code: int, data: bytes) -> Any:
+        if code == _TUPLE_EXT:
+            return tuple(ormsgpack.unpackb(data, ext_hook=_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS))
+        if code == _DATACLASS_EXT:
+            index, *fields = ormsgpack.unpackb(data, ext_hook=_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS)
+            return classes[index](*fields)
+        raise ValueError(f"Unknown extension type {code}.")
+
+    return ormsgpack.unpackb(payload, ext_hook=_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS)
+
+
+class InstanceCodec(SerializerProtocol):
+    """ """
+
+    __TYPE__ = "instance-msgpack"
+
+    def __init__(self):
+        self._fallback = JsonPlusSerializer()
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._fallback.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self._fallback.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[Text, bytes]:
+        try:
+            return self.__TYPE__, _encode(obj)
+        except TypeError:
+            return self._fallback.dumps_typed(obj)
+
+    def loads_typed(self, data: Tuple[Text, bytes]) -> Any:
+        type_, payload = data
+        if type_ == self.__TYPE__:
+            return _decode(payload)
+        return self._fallback.loads_typed(data)
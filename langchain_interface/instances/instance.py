@@ -15,7 +15,7 @@ from typing import (
     Optional,
 )
 import abc
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 
 
 def _to_dict(element) -> Union[Dict[Text, Any], List[Dict[Text, Any]]]:
@@ -44,6 +44,11 @@ class Instance(abc.ABC):
         """ """
         return {k: _to_dict(v) for k, v in self}
 
+    def __reduce__(self):
+        # `LLMResponse` shadows `__dict__`, which breaks the default
+        # pickling protocol, so we rebuild instances from their fields.
+        return (self.__class__, tuple(getattr(self, field.name) for field in fields(self)))
+
 
 @dataclass(frozen=True, eq=True)
 class LLMResponse(Instance):
@@ -0,0 +1,6 @@
+from .metrics import MetricsRegistry, Histogram, DEFAULT_BUCKETS
+from .spans import SpanRecord, SpanExporter, JSONLinesSpanExporter, OpenTelemetrySpanExporter
+from .instrument import MetricsCallbackHandler, instrument, increment, observe
+from .cache import InstrumentedCache
+from .profiling import SamplingProfiler, load_folded, aggregate, diff_profiles, diff_folded
+from .accounting import ModelPrice, DEFAULT_PRICES, Usage, TokenAccountant, account, record_usage
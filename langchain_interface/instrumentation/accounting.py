@@ -0,0 +1,220 @@
+""" Attribute the tokens and estimated cost of LLM calls to steps, graph nodes
+and input rows.
+
+Inside `with account() as accountant:` every chat model call is reported to a
+`TokenAccountant` (through a LangChain configure hook, like `instrument`), which
+reads the prompt, completion and cached prompt tokens off the returned message
+and keeps them per
+
+- `model`: the `model_name` of the response;
+- `mode`: "online", "batch" (answered through the batch API, see
+  `BatchedAPIMixin`, which reports itself since it runs no callbacks) or
+  "cached" (an LLM cache hit, which costs nothing);
+- `step`, `node` and `row`: the `Step` chain, LangGraph node and dataset input
+  (see `Interface.arun_dataset`) the call ran under, from its metadata.
+
+The cost is estimated from `prices` (USD per million tokens, matched by the
+longest prefix of the model name), with cached prompt tokens at their own price
+and batch calls at the batch discount. Calls to models without a price count
+tokens only, and their names are kept in `unpriced_models`.
+"""
+
+import contextlib
+import threading
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Iterator, List, Optional, Text, Tuple, Union
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+
+
+@dataclass(frozen=True, eq=True)
+class ModelPrice:
+    # USD per million tokens
+    prompt: float
+    completion: float
+    # cached prompt tokens, at the prompt price if not given
+    cached_prompt: Optional[float] = None
+    # the fraction of the price paid for calls through the batch API
+    batch_multiplier: float = .5
+
+
+# list prices; pass your own to `account` for other models or negotiated rates
+DEFAULT_PRICES = {
+    "gpt-4o": ModelPrice(prompt=2.5, completion=10., cached_prompt=1.25),
+    "gpt-4o-mini": ModelPrice(prompt=.15, completion=.6, cached_prompt=.075),
+    "gpt-4.1": ModelPrice(prompt=2., completion=8., cached_prompt=.5),
+    "gpt-4.1-mini": ModelPrice(prompt=.4, completion=1.6, cached_prompt=.1),
+    "gpt-4.1-nano": ModelPrice(prompt=.1, completion=.4, cached_prompt=.025),
+}
+
+ACCOUNTING_KEYS = ("model", "mode", "step", "node", "row")
+
+
+@dataclass
+class Usage:
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    # the part of `prompt_tokens` read from the provider's prompt cache
+    cached_prompt_tokens: int = 0
+    cost: float = 0.
+
+    def add(self, other: "Usage"):
+        self.calls += other.calls
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.cached_prompt_tokens += other.cached_prompt_tokens
+        self.cost += other.cost
+
+
+def _token_counts(message: BaseMessage) -> Tuple[int, int, int]:
+    """ (prompt, completion, cached prompt) tokens, from the usage metadata or,
+    failing that, the provider's `token_usage` in the response metadata.
+    """
+    usage = getattr(message, "usage_metadata", None)
+    if usage:
+        return (
+            usage.get("input_tokens", 0),
+            usage.get("output_tokens", 0),
+            (usage.get("input_token_details") or {}).get("cache_read", 0)
+        )
+
+    token_usage = message.response_metadata.get("token_usage") or {}
+    return (
+        token_usage.get("prompt_tokens", 0),
+        token_usage.get("completion_tokens", 0),
+        (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0) or 0
+    )
+
+
+def _mode(message: BaseMessage) -> Text:
+    # LangChain zeroes the cost of cache hits
+    if (getattr(message, "usage_metadata", None) or {}).get("total_cost") == 0:
+        return "cached"
+    return "batch" if message.response_metadata.get("batch_api") else "online"
+
+
+class TokenAccountant(BaseCallbackHandler):
+    """ """
+
+    run_inline = True
+
+    def __init__(self, prices: Optional[Dict[Text, ModelPrice]] = None):
+        super().__init__()
+        self.prices = prices if prices is not None else DEFAULT_PRICES
+        self.unpriced_models = set()
+        self._lock = threading.Lock()
+        self._metadata: Dict[uuid.UUID, Dict[Text, Any]] = {}
+        self._usage: Dict[Tuple, Usage] = {}
+
+    def price(self, model: Text) -> Optional[ModelPrice]:
+        matches = [name for name in self.prices if model.startswith(name)]
+        return self.prices[max(matches, key=len)] if matches else None
+
+    def cost(self, model: Text, mode: Text, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int) -> float:
+        price = self.price(model)
+        if price is None:
+            self.unpriced_models.add(model)
+            return 0.
+        if mode == "cached":
+            return 0.
+
+        cached_price = price.cached_prompt if price.cached_prompt is not None else price.prompt
+        cost = (
+            (prompt_tokens - cached_prompt_tokens) * price.prompt
+            + cached_prompt_tokens * cached_price
+            + completion_tokens * price.completion
+        ) / 1e6
+        return cost * price.batch_multiplier if mode == "batch" else cost
+
+    def record(self, message: BaseMessage, metadata: Optional[Dict[Text, Any]] = None):
+        """ Account for the call that returned `message`, under the step, node and
+        row in its run's `metadata`.
+        """
+        metadata = metadata or {}
+        model, mode = message.response_metadata.get("model_name", ""), _mode(message)
+        prompt_tokens, completion_tokens, cached_prompt_tokens = _token_counts(message)
+        usage = Usage(
+            calls=1,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            cached_prompt_tokens=cached_prompt_tokens,
+            cost=self.cost(model, mode, prompt_tokens, completion_tokens, cached_prompt_tokens)
+        )
+        key = (model, mode, metadata.get("step", ""), metadata.get("langgraph_node", ""), metadata.get("row"))
+
+        with self._lock:
+            self._usage.setdefault(key, Usage()).add(usage)
+
+    def total(self) -> Usage:
+        total = Usage()
+        with self._lock:
+            for usage in self._usage.values():
+                total.add(usage)
+        return total
+
+    def by(self, *keys: Text) -> Dict[Union[Any, Tuple], Usage]:
+        """ Usage per value of one of `ACCOUNTING_KEYS` (e.g. `by("step")`), or
+        per tuple of values of several (e.g. `by("row", "node")`).
+        """
+        indices = [ACCOUNTING_KEYS.index(key) for key in keys]
+        grouped: Dict[Union[Any, Tuple], Usage] = {}
+        with self._lock:
+            for key, usage in self._usage.items():
+                group = tuple(key[idx] for idx in indices)
+                grouped.setdefault(group[0] if len(group) == 1 else group, Usage()).add(usage)
+        return grouped
+
+    def to_records(self) -> List[Dict[Text, Any]]:
+        """ One JSON-able dict per (model, mode, step, node, row). """
+        with self._lock:
+            return [{**dict(zip(ACCOUNTING_KEYS, key)), **asdict(usage)} for key, usage in self._usage.items()]
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        with self._lock:
+            self._metadata[run_id] = metadata or {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        with self._lock:
+            self._metadata[run_id] = metadata or {}
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        with self._lock:
+            metadata = self._metadata.pop(run_id, None)
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                if message is not None:
+                    self.record(message, metadata)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._metadata.pop(run_id, None)
+
+
+_ACTIVE_ACCOUNTANT: ContextVar[Optional[TokenAccountant]] = ContextVar("langchain_interface_accountant", default=None)
+register_configure_hook(_ACTIVE_ACCOUNTANT, inheritable=True)
+
+
+@contextlib.contextmanager
+def account(prices: Optional[Dict[Text, ModelPrice]] = None) -> Iterator[TokenAccountant]:
+    """ Account for the LLM calls made in this context (and in the tasks and
+    threads it hands its context to).
+    """
+    accountant = TokenAccountant(prices=prices)
+    token = _ACTIVE_ACCOUNTANT.set(accountant)
+    try:
+        yield accountant
+    finally:
+        _ACTIVE_ACCOUNTANT.reset(token)
+
+
+def record_usage(message: BaseMessage, metadata: Optional[Dict[Text, Any]] = None):
+    """ For calls that run no callbacks, e.g. the batch API. """
+    accountant = _ACTIVE_ACCOUNTANT.get()
+    if accountant is not None:
+        accountant.record(message, metadata)
@@ -0,0 +1,37 @@
+""" """
+
+from typing import Any, Optional, Text
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from .instrument import increment
+
+
+class InstrumentedCache(BaseCache):
+    """ An LLM cache that counts its hits and misses under
+    `cache_lookups_total{cache="llm"}` while instrumentation is on, e.g.
+    `set_llm_cache(InstrumentedCache(SQLiteCache(...)))`.
+    """
+
+    def __init__(self, cache: BaseCache):
+        self._cache = cache
+
+    def lookup(self, prompt: Text, llm_string: Text) -> Optional[RETURN_VAL_TYPE]:
+        value = self._cache.lookup(prompt, llm_string)
+        increment("cache_lookups_total", cache="llm", result="hit" if value is not None else "miss")
+        return value
+
+    def update(self, prompt: Text, llm_string: Text, return_val: RETURN_VAL_TYPE) -> None:
+        self._cache.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs: Any) -> None:
+        self._cache.clear(**kwargs)
+
+    async def alookup(self, prompt: Text, llm_string: Text) -> Optional[RETURN_VAL_TYPE]:
+        value = await self._cache.alookup(prompt, llm_string)
+        increment("cache_lookups_total", cache="llm", result="hit" if value is not None else "miss")
+        return value
+
+    async def aupdate(self, prompt: Text, llm_string: Text, return_val: RETURN_VAL_TYPE) -> None:
+        await self._cache.aupdate(prompt, llm_string, return_val)
+
+    async def aclear(self, **kwargs: Any) -> None:
+        await self._cache.aclear(**kwargs)
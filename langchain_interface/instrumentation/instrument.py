@@ -0,0 +1,219 @@
+""" Record where the time of interface runs goes, and what they cost.
+
+Inside `with instrument() as metrics:` every LangChain / LangGraph run is
+reported to a `MetricsCallbackHandler` (through a LangChain configure hook, so
+no callbacks have to be passed around), which records
+
+- `node_latency_seconds{node}`: graph nodes;
+- `step_latency_seconds{step}`: `Step` chains (see `Step.chain_llm`), with their
+  `prompt_render_seconds`, `llm_latency_seconds` and `parse_seconds`, as well as
+  `llm_calls_total`, `prompt_tokens_total`, `completion_tokens_total`,
+  `parse_failures_total` and `llm_errors_total`;
+
+while the code paths that cannot be seen from callbacks report
+`cache_lookups_total{cache, result}` (the LLM cache and memo stores) and
+`batch_wait_seconds` / `batch_requests_total` (the batch API) through
+`increment` and `observe`. Outside of it the handler is not attached and
+`increment` / `observe` return right away.
+"""
+
+import contextlib
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Text
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.tracers.context import register_configure_hook
+from .metrics import MetricsRegistry
+from .spans import SpanExporter, SpanRecord
+
+
+@dataclass
+class _Run:
+    name: Text
+    kind: Text
+    start_time_ns: int
+    trace_id: uuid.UUID
+    parent_run_id: Optional[uuid.UUID]
+    step: Text
+    # the graph node this run belongs to, if any
+    node: Optional[Text]
+
+
+def _step_of(metadata: Optional[Dict[Text, Any]]) -> Text:
+    return (metadata or {}).get("step", "")
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """ """
+
+    # record in the calling thread, rather than in an executor for async runs
+    run_inline = True
+
+    def __init__(self, metrics: MetricsRegistry, span_exporter: Optional[SpanExporter] = None):
+        super().__init__()
+        self.metrics = metrics
+        self._span_exporter = span_exporter
+        self._lock = threading.Lock()
+        self._runs: Dict[uuid.UUID, _Run] = {}
+        self._spans: Dict[uuid.UUID, List[SpanRecord]] = {}
+
+    def _start(
+        self,
+        run_id: uuid.UUID,
+        parent_run_id: Optional[uuid.UUID],
+        name: Text,
+        kind: Text,
+        metadata: Optional[Dict[Text, Any]]
+    ):
+        with self._lock:
+            parent = self._runs.get(parent_run_id)
+            node = (metadata or {}).get("langgraph_node")
+            if kind == "chain":
+                if name == _step_of(metadata):
+                    kind = "step"
+                # nested runnables of a node inherit its metadata, so only its outermost run counts
+                elif node is not None and name == node and not self._inside_node(parent, node):
+                    kind = "node"
+            self._runs[run_id] = _Run(
+                name=name,
+                kind=kind,
+                start_time_ns=time.time_ns(),
+                trace_id=parent.trace_id if parent is not None else run_id,
+                parent_run_id=parent_run_id if parent is not None else None,
+                step=_step_of(metadata),
+                node=node,
+            )
+
+    def _inside_node(self, run: Optional[_Run], node: Text) -> bool:
+        while run is not None:
+            if run.kind == "node" and run.name == node:
+                return True
+            run = self._runs.get(run.parent_run_id)
+        return False
+
+    def _end(self, run_id: uuid.UUID, error: Optional[BaseException] = None, attributes: Optional[Dict[Text, Any]] = None):
+        end_time_ns = time.time_ns()
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+
+        seconds = (end_time_ns - run.start_time_ns) / 1e9
+        if run.kind == "node":
+            self.metrics.observe("node_latency_seconds", seconds, node=run.name)
+        elif run.kind == "step":
+            self.metrics.observe("step_latency_seconds", seconds, step=run.name)
+        elif run.kind == "prompt":
+            self.metrics.observe("prompt_render_seconds", seconds, step=run.step)
+        elif run.kind == "parser":
+            self.metrics.observe("parse_seconds", seconds, step=run.step)
+            if error is not None:
+                self.metrics.increment("parse_failures_total", step=run.step)
+        elif run.kind == "llm":
+            self.metrics.observe("llm_latency_seconds", seconds, step=run.step)
+            self.metrics.increment("llm_calls_total", step=run.step)
+            if error is not None:
+                self.metrics.increment("llm_errors_total", step=run.step)
+
+        if self._span_exporter is None:
+            return
+
+        span = SpanRecord(
+            trace_id=run.trace_id.hex,
+            span_id=run_id.hex[:16],
+            parent_span_id=run.parent_run_id.hex[:16] if run.parent_run_id is not None else None,
+            name=run.name,
+            kind=run.kind,
+            start_time_ns=run.start_time_ns,
+            end_time_ns=end_time_ns,
+            attributes={
+                **({"step": run.step} if run.step else {}),
+                **({"node": run.node} if run.node is not None else {}),
+                **(attributes or {}),
+            },
+            error=f"{type(error).__name__}: {error}" if error is not None else None
+        )
+        with self._lock:
+            spans = self._spans.setdefault(run.trace_id, [])
+            spans.append(span)
+            if run.parent_run_id is not None:
+                return
+            del self._spans[run.trace_id]
+        self._span_exporter.export(spans)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        run_type = kwargs.get("run_type")
+        name = kwargs.get("name") or (serialized or {}).get("name", "")
+        self._start(run_id, parent_run_id, name, run_type if run_type in ("prompt", "parser") else "chain", metadata)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        self._start(run_id, parent_run_id, kwargs.get("name") or (serialized or {}).get("name", "llm"), "llm", metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        self._start(run_id, parent_run_id, kwargs.get("name") or (serialized or {}).get("name", "llm"), "llm", metadata)
+
+    def on_llm_end(self, response: LLMResult, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.get(run_id)
+        step = run.step if run is not None else ""
+
+        prompt_tokens, completion_tokens = 0, 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    prompt_tokens += usage.get("input_tokens", 0)
+                    completion_tokens += usage.get("output_tokens", 0)
+        if not prompt_tokens and not completion_tokens:
+            token_usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens, completion_tokens = token_usage.get("prompt_tokens", 0), token_usage.get("completion_tokens", 0)
+
+        self.metrics.increment("prompt_tokens_total", prompt_tokens, step=step)
+        self.metrics.increment("completion_tokens_total", completion_tokens, step=step)
+        self._end(run_id, attributes={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens})
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=error)
+
+
+_ACTIVE_HANDLER: ContextVar[Optional[MetricsCallbackHandler]] = ContextVar("langchain_interface_metrics", default=None)
+register_configure_hook(_ACTIVE_HANDLER, inheritable=True)
+
+
+@contextlib.contextmanager
+def instrument(
+    metrics: Optional[MetricsRegistry] = None,
+    span_exporter: Optional[SpanExporter] = None
+) -> Iterator[MetricsRegistry]:
+    """ Record the runs started in this context (and in the tasks and threads it
+    hands its context to) into `metrics`, and export their spans if a
+    `span_exporter` is given.
+    """
+    handler = MetricsCallbackHandler(metrics if metrics is not None else MetricsRegistry(), span_exporter=span_exporter)
+    token = _ACTIVE_HANDLER.set(handler)
+    try:
+        yield handler.metrics
+    finally:
+        _ACTIVE_HANDLER.reset(token)
+
+
+def increment(name: Text, value: float = 1., **labels: Text):
+    handler = _ACTIVE_HANDLER.get()
+    if handler is not None:
+        handler.metrics.increment(name, value, **labels)
+
+
+def observe(name: Text, value: float, **labels: Text):
+    handler = _ACTIVE_HANDLER.get()
+    if handler is not None:
+        handler.metrics.observe(name, value, **labels)
@@ -0,0 +1,126 @@
+""" Counters and latency histograms, exportable as Prometheus text. """
+
+import bisect
+import threading
+from typing import Dict, List, Optional, Sequence, Text, Tuple
+
+
+DEFAULT_BUCKETS = (.001, .005, .01, .025, .05, .1, .25, .5, 1., 2.5, 5., 10., 30., 60., 300.)
+
+_Labels = Tuple[Tuple[Text, Text], ...]
+
+
+class Histogram:
+    """ Counts of observations per bucket, where bucket `i` holds the
+    observations in (buckets[i - 1], buckets[i]] and the last one everything
+    above the largest bound.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """ The upper bound of the bucket holding the `q`-quantile. """
+        if not self.count:
+            return None
+        rank, cumulative = q * self.count, 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+
+def _escape(value: Text) -> Text:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: _Labels, extra: Optional[Tuple[Text, Text]] = None) -> Text:
+    pairs = list(labels) + ([extra] if extra is not None else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> Text:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """ Thread-safe named counters and histograms with string labels. """
+
+    def __init__(self, prefix: Text = "langchain_interface", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self._prefix = prefix
+        self._buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters: Dict[Text, Dict[_Labels, float]] = {}
+        self._histograms: Dict[Text, Dict[_Labels, Histogram]] = {}
+
+    def increment(self, name: Text, value: float = 1., **labels: Text):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.) + value
+
+    def observe(self, name: Text, value: float, **labels: Text):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(self._buckets)
+            series[key].observe(value)
+
+    def counter(self, name: Text, **labels: Text) -> float:
+        """ The counter summed over the series matching `labels`. """
+        with self._lock:
+            return sum(
+                count for key, count in self._counters.get(name, {}).items()
+                if labels.items() <= dict(key).items()
+            )
+
+    def histogram(self, name: Text, **labels: Text) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def series(self, name: Text) -> List[Dict[Text, Text]]:
+        """ The label sets recorded under `name`. """
+        with self._lock:
+            return [dict(key) for key in {**self._counters.get(name, {}), **self._histograms.get(name, {})}]
+
+    def cache_hit_ratio(self, cache: Optional[Text] = None) -> Optional[float]:
+        """ Hits over lookups in `cache_lookups_total`, of one cache ("llm" or "memo") or all. """
+        labels = {"cache": cache} if cache is not None else {}
+        hits = self.counter("cache_lookups_total", result="hit", **labels)
+        lookups = hits + self.counter("cache_lookups_total", result="miss", **labels)
+        return hits / lookups if lookups else None
+
+    def to_prometheus(self) -> Text:
+        """ All metrics in the Prometheus text exposition format. """
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                metric = f"{self._prefix}_{name}"
+                lines.append(f"# TYPE {metric} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+            for name in sorted(self._histograms):
+                metric = f"{self._prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        lines.append(f"{metric}_bucket{_format_labels(labels, ('le', _format_value(bound)))} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
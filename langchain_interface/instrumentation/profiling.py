@@ -0,0 +1,310 @@
+""" Find out where the wall-clock time of interface runs goes, per graph node
+and `Step`, and compare runs.
+
+`SamplingProfiler` samples the stacks of all threads from a background thread
+while it is active. Nothing has to be wrapped or passed down, so runs cost
+nothing extra when it is not, and sync, threaded and async runs are sampled
+alike. Every sample is put under a root:
+
+- `node:<name>`: inside a LangGraph node, found by the task of LangGraph's
+  retry loop on the stack, or in a thread the node handed work to, found by
+  the node's runnable config;
+- `<scheduler>`: inside the Pregel loop, but not in a node;
+- `<io wait>`: an event loop waiting in its selector, i.e. for the network;
+- `<event loop>`: other event loop callbacks;
+- `<no graph>`: a `Step` chain called outside of a graph;
+- `<executor>`: sync code that an async run handed to an executor thread
+  without its config, e.g. a plain function node of an async graph run.
+
+Within the stack, the frame running a `Step` chain (see `Step.chain_llm`) is
+shown as `step:<name>`. Threads blocked waiting for others (e.g. the sync
+Pregel loop waiting for its node threads) are not counted, so that the time of
+parallel nodes is not counted twice.
+
+Profiles are written in the folded stack format that `flamegraph.pl`,
+speedscope and inferno read, weighted by microseconds. To compare two runs:
+
+    python -m langchain_interface.instrumentation.profiling before.folded after.folded [--by node|step|function] [--diff-out diff.folded]
+
+which reports the change of time per node, step or (self time per) function,
+and optionally writes a two-column folded file for `difffolded`-style
+differential flamegraphs (`flamegraph.pl diff.folded`).
+
+cProfile cannot attribute time to nodes that interleave on one event loop
+(there is one profiler per thread), so `cprofile_path` only adds a
+deterministic whole-run profile of the calling thread, for `pstats`.
+"""
+
+import argparse
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Any, Dict, List, Optional, Text, Tuple, Union
+from langchain_core.runnables.base import RunnableBinding
+
+try:
+    from langgraph.pregel import Pregel
+    from langgraph.pregel.retry import run_with_retry, arun_with_retry
+    _NODE_CODES = {run_with_retry.__code__, arun_with_retry.__code__}
+    _SCHEDULER_CODES = {Pregel.stream.__code__, Pregel.astream.__code__}
+except ImportError:
+    _NODE_CODES, _SCHEDULER_CODES = set(), set()
+
+
+_BINDING_METHODS = {"invoke", "ainvoke", "batch", "abatch", "stream", "astream"}
+
+Stack = Tuple[Text, ...]
+
+
+def _frame_label(frame: FrameType) -> Text:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _step_name(frame: FrameType) -> Optional[Text]:
+    if frame.f_code.co_name not in _BINDING_METHODS:
+        return None
+    binding = frame.f_locals.get("self")
+    if not isinstance(binding, RunnableBinding):
+        return None
+    return (binding.config.get("metadata") or {}).get("step")
+
+
+def _run_metadata(frames: List[FrameType]) -> Dict[Text, Any]:
+    """ The node and step from the innermost runnable config (or callback manager)
+    on the stack. Threads that a node hands work to (e.g. the threads of `batch`)
+    run with a copy of its config, so this attributes them too.
+    """
+    found = {}
+    for frame in reversed(frames):
+        varnames = frame.f_code.co_varnames
+        if "config" in varnames:
+            config = frame.f_locals.get("config")
+            metadata = config.get("metadata") if isinstance(config, dict) else None
+        elif "run_manager" in varnames:
+            # e.g. a sync model called from an async run, in an executor thread
+            metadata = getattr(frame.f_locals.get("run_manager"), "metadata", None)
+        else:
+            continue
+        if not metadata:
+            continue
+        for key in ("langgraph_node", "step"):
+            if key in metadata and key not in found:
+                found[key] = metadata[key]
+        if len(found) == 2:
+            break
+    return found
+
+
+def _is_blocked(frame: FrameType) -> bool:
+    filename = frame.f_code.co_filename
+    return (
+        filename.endswith("threading.py") and frame.f_code.co_name in ("wait", "_wait_for_tstate_lock", "join")
+        or filename.endswith(os.path.join("concurrent", "futures", "_base.py"))
+    )
+
+
+def _classify(frame: FrameType) -> Optional[Stack]:
+    """ The folded stack (root first) of a thread's sample, or None to skip it. """
+
+    frames: List[FrameType] = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+
+    # waiting for other threads, which are sampled themselves
+    if _is_blocked(frames[-1]):
+        return None
+
+    root, start = None, 0
+    for idx, frame in enumerate(frames):
+        code = frame.f_code
+        if code in _NODE_CODES:
+            task = frame.f_locals.get("task")
+            root, start = f"node:{getattr(task, 'name', '?')}", idx + 1
+        elif root is None and code in _SCHEDULER_CODES:
+            root, start = "<scheduler>", idx + 1
+
+    metadata = _run_metadata(frames)
+    if (root is None or root == "<scheduler>") and "langgraph_node" in metadata:
+        root, start = f"node:{metadata['langgraph_node']}", 0
+
+    if root is None:
+        loop_idx = next((idx for idx, frame in enumerate(frames) if frame.f_code.co_name == "_run_once" and frame.f_code.co_filename.endswith("base_events.py")), None)
+        if loop_idx is not None:
+            leaf = frames[-1].f_code
+            if leaf.co_name == "select" and leaf.co_filename.endswith("selectors.py"):
+                return ("<io wait>",)
+            root, start = "<event loop>", loop_idx + 1
+        elif "step" in metadata:
+            root, start = "<no graph>", 0
+        else:
+            executor_idx = next((idx for idx, frame in enumerate(frames) if frame.f_code.co_name == "wrapper" and frame.f_code.co_filename.endswith(os.path.join("runnables", "config.py"))), None)
+            if executor_idx is None:
+                return None
+            root, start = "<executor>", executor_idx + 1
+
+    labels = [root]
+    for frame in frames[start:]:
+        step = _step_name(frame)
+        labels.append(f"step:{step}" if step is not None else _frame_label(frame))
+    if "step" in metadata and f"step:{metadata['step']}" not in labels:
+        # the step's chain runs in another thread
+        labels.insert(1, f"step:{metadata['step']}")
+    return tuple(labels)
+
+
+class SamplingProfiler:
+    """ Samples every `interval` seconds while active (`start` / `stop`, or as a
+    context manager). Samples are weighted by the wall-clock time since the
+    previous one.
+    """
+
+    def __init__(self, interval: float = .005, cprofile_path: Optional[Text] = None):
+        self._interval = interval
+        self._cprofile_path = cprofile_path
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._stacks: Counter = Counter()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._sample, name="langchain-interface-profiler", daemon=True)
+        self._thread.start()
+        if self._cprofile_path is not None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        return self
+
+    def stop(self):
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self._cprofile_path)
+            self._cprofile = None
+        self._stopping.set()
+        self._thread.join()
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stopping.wait(self._interval):
+            now = time.perf_counter()
+            weight = int((now - last) * 1e6)
+            last = now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = _classify(frame)
+                if stack is not None:
+                    self._stacks[stack] += weight
+
+    @property
+    def stacks(self) -> Counter:
+        """ Microseconds per folded stack. """
+        return self._stacks
+
+    def by_node(self) -> Dict[Text, float]:
+        return aggregate(self._stacks, by="node")
+
+    def by_step(self) -> Dict[Text, float]:
+        return aggregate(self._stacks, by="step")
+
+    def to_folded(self) -> Text:
+        return to_folded(self._stacks)
+
+    def save(self, path: Text):
+        with open(path, "w", encoding="utf-8") as file_:
+            file_.write(self.to_folded())
+
+
+def to_folded(stacks: Counter) -> Text:
+    return "".join(f"{';'.join(stack)} {weight}\n" for stack, weight in sorted(stacks.items()) if weight > 0)
+
+
+def load_folded(path: Text) -> Counter:
+    stacks = Counter()
+    with open(path, "r", encoding="utf-8") as file_:
+        for line in file_:
+            if line.strip():
+                stack, weight = line.rstrip("\n").rsplit(" ", 1)
+                stacks[tuple(stack.split(";"))] += int(weight)
+    return stacks
+
+
+def aggregate(stacks: Counter, by: Text = "node") -> Dict[Text, float]:
+    """ Seconds per root ("node"), innermost step ("step") or leaf function
+    ("function", i.e. self time).
+    """
+    seconds = Counter()
+    for stack, weight in stacks.items():
+        if by == "node":
+            key = stack[0]
+        elif by == "step":
+            key = next((label for label in reversed(stack) if label.startswith("step:")), "<no step>")
+        elif by == "function":
+            key = stack[-1]
+        else:
+            raise ValueError(f"Unknown aggregation {by}.")
+        seconds[key] += weight / 1e6
+    return dict(seconds)
+
+
+def diff_profiles(
+    before: Union[Counter, Text],
+    after: Union[Counter, Text],
+    by: Text = "node"
+) -> List[Tuple[Text, float, float, float]]:
+    """ (key, seconds before, seconds after, change) for every key of the
+    aggregation, largest absolute change first. Profiles are given as stacks or
+    paths of folded files.
+    """
+    before = aggregate(load_folded(before) if isinstance(before, str) else before, by=by)
+    after = aggregate(load_folded(after) if isinstance(after, str) else after, by=by)
+    rows = [
+        (key, before.get(key, 0.), after.get(key, 0.), after.get(key, 0.) - before.get(key, 0.))
+        for key in set(before) | set(after)
+    ]
+    return sorted(rows, key=lambda row: -abs(row[3]))
+
+
+def diff_folded(before: Counter, after: Counter) -> Text:
+    """ Two-column folded stacks ("stack before after") for differential flamegraphs. """
+    return "".join(
+        f"{';'.join(stack)} {before.get(stack, 0)} {after.get(stack, 0)}\n"
+        for stack in sorted(set(before) | set(after))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two folded profiles of interface runs.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--by", choices=["node", "step", "function"], default="node")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--diff-out", default=None, help="Write a two-column folded file for a differential flamegraph.")
+    args = parser.parse_args()
+
+    before, after = load_folded(args.before), load_folded(args.after)
+    print(f"{args.by:<60} {'before (s)':>12} {'after (s)':>12} {'change (s)':>12}")
+    for key, seconds_before, seconds_after, change in diff_profiles(before, after, by=args.by)[:args.top]:
+        print(f"{key[:60]:<60} {seconds_before:>12.3f} {seconds_after:>12.3f} {change:>+12.3f}")
+
+    if args.diff_out is not None:
+        with open(args.diff_out, "w", encoding="utf-8") as file_:
+            file_.write(diff_folded(before, after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+""" Spans of instrumented runs and where to export them. """
+
+import abc
+import threading
+try:
+    import ujson as json
+except ImportError:
+    import json
+from dataclasses import dataclass
+from registrable import Registrable
+from typing import Any, Dict, List, Optional, Text
+
+
+@dataclass(frozen=True, eq=True)
+class SpanRecord:
+    # hex ids in the OpenTelemetry widths (32 and 16 digits)
+    trace_id: Text
+    span_id: Text
+    parent_span_id: Optional[Text]
+    name: Text
+    # "node", "step", "prompt", "llm", "parser" or "chain"
+    kind: Text
+    start_time_ns: int
+    end_time_ns: int
+    attributes: Dict[Text, Any]
+    error: Optional[Text]
+
+
+class SpanExporter(Registrable, abc.ABC):
+    """ Receives the spans of one trace (a top-level run) once it has ended. """
+
+    @abc.abstractmethod
+    def export(self, spans: List[SpanRecord]):
+        """ """
+        raise NotImplementedError
+
+
+def _otlp_value(value: Any) -> Dict[Text, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+@SpanExporter.register("jsonl")
+class JSONLinesSpanExporter(SpanExporter):
+    """ Appends spans to a local file, one OTLP/JSON span object per line. """
+
+    def __init__(self, path: Text):
+        super().__init__()
+        self._path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[SpanRecord]):
+        with self._lock, open(self._path, "a", encoding="utf-8") as file_:
+            for span in spans:
+                file_.write(json.dumps({
+                    "traceId": span.trace_id,
+                    "spanId": span.span_id,
+                    "parentSpanId": span.parent_span_id or "",
+                    "name": span.name,
+                    "kind": "SPAN_KIND_INTERNAL",
+                    "startTimeUnixNano": str(span.start_time_ns),
+                    "endTimeUnixNano": str(span.end_time_ns),
+                    "attributes": [
+                        {"key": key, "value": _otlp_value(value)}
+                        for key, value in {"langchain_interface.kind": span.kind, **span.attributes}.items()
+                    ],
+                    "status": {"code": "STATUS_CODE_ERROR", "message": span.error} if span.error is not None else {},
+                }, ensure_ascii=False) + "\n")
+
+
+@SpanExporter.register("opentelemetry")
+class OpenTelemetrySpanExporter(SpanExporter):
+    """ Replays spans into an OpenTelemetry tracer (the global one by default),
+    parents before children, so that they are exported by whatever span
+    processors the tracer provider is configured with. Needs `opentelemetry-api`.
+    """
+
+    def __init__(self, tracer: Optional[Any] = None):
+        super().__init__()
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError("OpenTelemetrySpanExporter needs `pip install opentelemetry-api opentelemetry-sdk`.") from e
+        self._trace = trace
+        self._tracer = tracer if tracer is not None else trace.get_tracer("langchain_interface")
+
+    def export(self, spans: List[SpanRecord]):
+        replayed = {}
+        for span in sorted(spans, key=lambda span: span.start_time_ns):
+            parent = replayed.get(span.parent_span_id)
+            otel_span = self._tracer.start_span(
+                span.name,
+                context=self._trace.set_span_in_context(parent) if parent is not None else None,
+                attributes={"langchain_interface.kind": span.kind, **span.attributes},
+                start_time=span.start_time_ns,
+            )
+            if span.error is not None:
+                otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+            replayed[span.span_id] = otel_span
+        for span in spans:
+            replayed[span.span_id].end(end_time=span.end_time_ns)
@@ -1 +1,8 @@
-from .prob_inference_interface import BIRDProbInferenceInterface
\ No newline at end of file
+from ..._lazy import lazy_attributes
+
+_LAZY_ATTRIBUTES = {
+    "BIRDProbInferenceInterface": ".prob_inference_interface",
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
+__all__ = list(_LAZY_ATTRIBUTES)
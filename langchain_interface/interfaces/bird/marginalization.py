@@ -0,0 +1,207 @@
+""" Marginalize P(outcome 1 | condition) over the joint assignments of the
+filtered BIRD factors.
+
+Every factor contributes a distribution over its values (how strongly the
+condition implies each value) and the supportiveness of each value for
+outcome 1. For an assignment picking one value per factor,
+
+    P(o1 | f) = prod(s) / (prod(s) + prod(1 - s))
+
+and the score is the expectation of P(o1 | f) under the product of the value
+distributions. Exact enumeration is exponential in the number of factors, so
+above a budget of joint assignments the expectation is estimated by sampling
+assignments from the value distributions instead.
+
+`marginalize_batch` computes exact scores for many scenarios at once from
+padded (scenario, factor, value) arrays, e.g. to re-score a stored dataset.
+"""
+
+import math
+import numpy
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import List, Literal, Optional, Text, Tuple
+
+
+MarginalizationMethod = Literal["exact", "monte-carlo"]
+
+
+@dataclass(frozen=True, eq=True)
+class MarginalizationResult:
+    score: float
+    method: MarginalizationMethod
+    # half-width of the confidence interval around `score`, 0. when exact
+    error: float
+
+
+def _posterior(log_pp: numpy.ndarray, log_np: numpy.ndarray) -> numpy.ndarray:
+    """ P(o1 | f) from the log products of s and of 1 - s. """
+    with numpy.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        return 1. / (1. + numpy.exp(log_np - log_pp))
+
+
+def _logs(supportiveness: numpy.ndarray):
+    with numpy.errstate(divide="ignore"):
+        return numpy.log(supportiveness), numpy.log(1. - supportiveness)
+
+
+def num_assignments(value_dists: List[numpy.ndarray]) -> int:
+    return math.prod(len(dist) for dist in value_dists)
+
+
+def marginalize_exact(
+    value_dists: List[numpy.ndarray],
+    supportiveness: List[numpy.ndarray]
+) -> float:
+    """ Enumerate all joint assignments by broadcasting one axis per factor. """
+
+    ndim = len(value_dists)
+    log_pp, log_np, joint = numpy.zeros(()), numpy.zeros(()), numpy.ones(())
+
+    for axis, (dist, support) in enumerate(zip(value_dists, supportiveness)):
+        shape = [1] * ndim
+        shape[axis] = len(dist)
+        log_s, log_not_s = _logs(numpy.asarray(support, dtype=numpy.float64))
+        log_pp = log_pp + log_s.reshape(shape)
+        log_np = log_np + log_not_s.reshape(shape)
+        joint = joint * numpy.asarray(dist, dtype=numpy.float64).reshape(shape)
+
+    return float(numpy.sum(_posterior(log_pp, log_np) * joint))
+
+
+def marginalize_monte_carlo(
+    value_dists: List[numpy.ndarray],
+    supportiveness: List[numpy.ndarray],
+    num_samples: int = 10000,
+    confidence: float = .95,
+    seed: Optional[int] = None
+) -> MarginalizationResult:
+    """ Sample assignments from the value distributions and average P(o1 | f).
+
+    The error is the half-width of the normal `confidence` interval of the mean.
+    """
+
+    rng = numpy.random.default_rng(seed)
+    log_pp, log_np = numpy.zeros(num_samples), numpy.zeros(num_samples)
+
+    for dist, support in zip(value_dists, supportiveness):
+        dist = numpy.asarray(dist, dtype=numpy.float64)
+        indices = rng.choice(len(dist), size=num_samples, p=dist / dist.sum())
+        log_s, log_not_s = _logs(numpy.asarray(support, dtype=numpy.float64))
+        log_pp += log_s[indices]
+        log_np += log_not_s[indices]
+
+    posterior = _posterior(log_pp, log_np)
+    z = NormalDist().inv_cdf((1. + confidence) / 2.)
+
+    return MarginalizationResult(
+        score=float(posterior.mean()),
+        method="monte-carlo",
+        error=float(z * posterior.std(ddof=1) / math.sqrt(num_samples)) if num_samples > 1 else math.inf
+    )
+
+
+def marginalize(
+    value_dists: List[numpy.ndarray],
+    supportiveness: List[numpy.ndarray],
+    budget: int = 2 ** 16,
+    num_samples: int = 10000,
+    confidence: float = .95,
+    seed: Optional[int] = None
+) -> MarginalizationResult:
+    """ Marginalize exactly if there are at most `budget` joint assignments,
+    and by Monte Carlo sampling otherwise.
+    """
+
+    if num_assignments(value_dists) <= budget:
+        return MarginalizationResult(
+            score=marginalize_exact(value_dists, supportiveness),
+            method="exact",
+            error=0.
+        )
+
+    return marginalize_monte_carlo(
+        value_dists,
+        supportiveness,
+        num_samples=num_samples,
+        confidence=confidence,
+        seed=seed
+    )
+
+
+def pad_batch(
+    value_dists: List[List[numpy.ndarray]],
+    supportiveness: List[List[numpy.ndarray]]
+) -> Tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]:
+    """ Pad per-scenario factor lists into (scenario, factor, value) arrays of
+    value distributions, supportiveness and a mask of the real entries.
+
+    Scenarios with fewer factors are padded with factors that have a single
+    neutral value, which leaves their score unchanged.
+    """
+
+    num_factors = max((len(dists) for dists in value_dists), default=0)
+    num_values = max((len(dist) for dists in value_dists for dist in dists), default=1)
+    shape = (len(value_dists), num_factors, num_values)
+
+    padded_dists, padded_support, mask = numpy.zeros(shape), numpy.full(shape, .5), numpy.zeros(shape, dtype=bool)
+    # padding factors keep all their mass on a single neutral value
+    padded_dists[:, :, 0], mask[:, :, 0] = 1., True
+
+    for sidx, (dists, supports) in enumerate(zip(value_dists, supportiveness)):
+        for fidx, (dist, support) in enumerate(zip(dists, supports)):
+            padded_dists[sidx, fidx, :len(dist)] = dist
+            padded_support[sidx, fidx, :len(support)] = support
+            mask[sidx, fidx, :len(dist)] = True
+
+    return padded_dists, padded_support, mask
+
+
+def marginalize_batch(
+    value_dists: numpy.ndarray,
+    supportiveness: numpy.ndarray,
+    mask: Optional[numpy.ndarray] = None,
+    budget: int = 2 ** 20
+) -> numpy.ndarray:
+    """ Exact scores of a padded batch of scenarios in one vectorized pass.
+
+    value_dists, supportiveness: (scenario, factor, value) arrays, as built by `pad_batch`.
+    mask: the real (factor, value) entries; padded entries get no probability mass.
+    budget: the most (scenario, joint assignment) pairs to materialize at once. The
+    batch is processed in chunks of scenarios that fit it.
+    """
+
+    value_dists = numpy.asarray(value_dists, dtype=numpy.float64)
+    supportiveness = numpy.asarray(supportiveness, dtype=numpy.float64)
+    num_scenarios, num_factors, num_values = value_dists.shape
+
+    if mask is not None:
+        value_dists = numpy.where(mask, value_dists, 0.)
+        supportiveness = numpy.where(mask, supportiveness, .5)
+
+    assignments = num_values ** num_factors
+    if assignments > budget:
+        raise ValueError(
+            f"{assignments} joint assignments per scenario exceed the budget of {budget}, "
+            "marginalize these scenarios one by one instead."
+        )
+
+    log_s, log_not_s = _logs(supportiveness)
+    chunk_size = max(budget // assignments, 1)
+    scores = numpy.empty(num_scenarios)
+
+    for start in range(0, num_scenarios, chunk_size):
+        chunk = slice(start, start + chunk_size)
+        size = len(value_dists[chunk])
+        log_pp, log_np, joint = numpy.zeros((size,) + (1,) * num_factors), numpy.zeros((size,) + (1,) * num_factors), numpy.ones((size,) + (1,) * num_factors)
+
+        for fidx in range(num_factors):
+            shape = [size] + [1] * num_factors
+            shape[fidx + 1] = num_values
+            log_pp = log_pp + log_s[chunk, fidx].reshape(shape)
+            log_np = log_np + log_not_s[chunk, fidx].reshape(shape)
+            joint = joint * value_dists[chunk, fidx].reshape(shape)
+
+        scores[chunk] = numpy.sum((_posterior(log_pp, log_np) * joint).reshape(size, -1), axis=1)
+
+    return scores
@@ -1,37 +1,70 @@
 """ """
 
+import asyncio
+import hashlib
+import math
+import threading
+import time
 import numpy
+from concurrent.futures import FIRST_COMPLETED, wait
 from typing import Annotated, List, Union, TypeVar
 from typing_extensions import TypedDict
-from itertools import product
 try:
     import ujson as json
 except ImportError:
     import json
 from dataclasses import dataclass
 from typing import Union, Text, List, Dict, Optional, Callable, Any, Literal, Tuple
-from dataclasses import asdict
+from dataclasses import asdict, replace
 from overrides import overrides
 from langgraph.graph import StateGraph, START, END
 from langgraph.types import Send
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langchain_core.language_models.base import BaseLanguageModel
 from langchain_core.runnables.base import Runnable
 from langchain_core.runnables import (
     RunnablePassthrough,
     RunnableParallel,
-    RunnableLambda
+    RunnableLambda,
+    RunnableBranch
+)
+from langchain_core.runnables.base import coerce_to_runnable
+from langchain_core.runnables.config import (
+    ContextThreadPoolExecutor,
+    RunnableConfig,
+    ensure_config,
+    merge_configs,
+    run_in_executor
+)
+from langchain_core.callbacks import UsageMetadataCallbackHandler
+from ...instances.instance import Instance
+from ...states.base_states import (
+    BaseState,
+    revise,
+    spanupdate,
+    AppendAggregate,
+    KeyUpdateAggregate,
+    SpanUpdateAggregate
 )
-from ...states.base_states import BaseState, revise, append, keyupdate
 from ...steps.step import Step
+from ...parsers import LabelDistributionResponse, ParsingFailure
+from ...parsers.output_grammar import GuidedDecodingBackend
 from ...steps.bird import (
     BIRDSentenceProposalStep,
     BIRDSummarizeToFactorStep,
     BIRDImplicationCheckStep,
+    BIRDGroupedImplicationCheckStep,
     BIRDReevaluateImplicationStep,
     BIRDSentenceSupportDeterminationStep,
+    BIRDGroupedSentenceSupportDeterminationStep,
     BIRDVerbalizedProbabilityStep
 )
+from ...steps.bird.implication_check_step import BIRDImplicationCheckResponse
+from ...steps.bird.sentence_support_determination_step import BIRDSentenceSupportDeterminationResponse
+from ...memo_stores import MemoStore, InMemoryMemoStore
 from ..interface import Interface
+from .marginalization import marginalize
+from .run_record import BIRDRunRecord, save_records, load_records, rescore_records
 
 
 @dataclass
@@ -52,22 +85,267 @@ class BIRDInternalState(TypedDict, total=True):
     outcome_2: str
     sentences_for_outcome_1: list
     sentences_for_outcome_2: list
-    responses: Annotated[list, append]
-    factors: Annotated[list, append]
-    implied_value_check: Annotated[dict, keyupdate]
-    direction_value_check: Annotated[dict, keyupdate]
+    responses: Annotated[list, AppendAggregate]
+    factors: Annotated[list, AppendAggregate]
+    # value -> P(implied), 1. or 0. unless scored from logprobs
+    implied_value_check: Annotated[dict, KeyUpdateAggregate]
+    direction_value_check: Annotated[dict, KeyUpdateAggregate]
+    # only filled in logprob classification mode
+    support_distribution: Annotated[dict, KeyUpdateAggregate]
     # verbalized_probability: Annotated[Dict[Text, Tuple[float, float]], keyupdate]
     filtered_factor_names: list
     final_score: Optional[float]
+    # "exact" or "monte-carlo", and the half-width of the confidence interval of `final_score`
+    marginalization_method: Optional[str]
+    marginalization_error: Optional[float]
+    run_record: Optional[BIRDRunRecord]
+    # stage -> (start, end) in `time.perf_counter()` seconds, merged over fan-out branches
+    stage_timings: Annotated[dict, SpanUpdateAggregate]
+    speculation_report: Optional["SpeculationReport"]
+    pruning_report: Optional["PruningReport"]
+    
+    
+@dataclass(frozen=True, eq=True)
+class SpeculationReport(Instance):
+    """ What speculative support checks cost and saved in one run. """
+    speculative_checks: int
+    # support checks of values that end up not implied, which only decide whether
+    # their factor is filtered out
+    not_implied_checks: int
+    support_tokens: int
+    not_implied_tokens: int
+    # seconds saved over starting each support check after its implication check
+    latency_saving: float
+    
+    
+@dataclass(frozen=True, eq=True)
+class PruningReport(Instance):
+    """ What adaptive pruning skipped in one run. """
+    # checks that were cancelled before they returned, counting a skipped reevaluation
+    cancelled_checks: int
+    early_exit: bool
+    # bounds on `final_score` when the last pruning decision was made
+    score_bounds: Optional[Tuple[float, float]]
+    
+    
+def _logit(p: float) -> float:
+    return math.log(p / (1. - p))
+
+
+def _sigmoid(x: float) -> float:
+    return 1. / (1. + math.exp(-x))
+    
+    
+def _total_tokens(usage: UsageMetadataCallbackHandler) -> int:
+    return sum(metadata.get("total_tokens", 0) for metadata in usage.usage_metadata.values())
+    
+    
+def _timed(stage: Text, node: Union[Runnable, Callable]) -> Runnable:
+    """ Wrap a graph node so that it reports its (start, end) span under `stage_timings`. """
+    node = coerce_to_runnable(node)
+    
+    def _call(state, config: RunnableConfig) -> dict:
+        start = time.perf_counter()
+        output = node.invoke(state, config)
+        return {**output, "stage_timings": spanupdate(output.get("stage_timings", {}), {stage: (start, time.perf_counter())})}
+    
+    async def _acall(state, config: RunnableConfig) -> dict:
+        start = time.perf_counter()
+        output = await node.ainvoke(state, config)
+        return {**output, "stage_timings": spanupdate(output.get("stage_timings", {}), {stage: (start, time.perf_counter())})}
+    
+    return RunnableLambda(_call, afunc=_acall, name=stage)
     
     
 class BIRDProbInferenceInterface(Interface):
     
+    __SUPPORT_LABEL_INDEX__ = {
+        "1": 0,
+        "2": 1,
+        "Neither": -1
+    }
+    
+    # how much a value supports outcome 1, by support index
+    __SUPPORTIVENESS__ = {
+        0: .75,
+        1: .25,
+        -1: .5
+    }
+    
+    def __init__(
+        self,
+        guided_decoding: Optional[GuidedDecodingBackend] = None,
+        classification_mode: Literal["generate", "logprob"] = "generate",
+        top_logprobs: int = 10,
+        stream_factors: bool = False,
+        pipelined: bool = False,
+        speculative_support: bool = False,
+        prune_tolerance: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        memo_store: Optional[MemoStore] = None,
+        group_threshold: Optional[int] = None,
+        group_size: int = 8,
+        marginalization_budget: int = 2 ** 16,
+        num_samples: int = 10000,
+        confidence: float = .95,
+        record_path: Optional[Text] = None,
+        response_mode: Literal["keep", "reference", "drop"] = "keep",
+        response_store: Optional[MemoStore] = None,
+        checkpointer: Optional[BaseCheckpointSaver] = None
+    ):
+        """ guided_decoding: constrain the steps with rigid output formats
+        to their output grammar on the given backend ("vllm" or "openai").
+        
+        classification_mode: "logprob" scores the implication and support checks
+        from the logprobs of a single label token instead of generating reasoning,
+        so `implied_value_check` holds P(implied) (1. or 0. in "generate" mode) and the
+        support probabilities are marginalized directly (needs a backend that returns
+        `top_logprobs`). The scoring prompts answer their examples with bare labels.
+        
+        stream_factors: stream the factor summary and start each factor's implication
+        checks as soon as it is complete, instead of after the whole summary.
+        
+        pipelined: run the per-value checks as a pipeline in a single node. A value's
+        support check starts as soon as its implication check returns, and only the
+        reevaluation waits for all implication checks. Every value gets a support
+        check, as in the default graph, so the results are the same. Per-stage spans
+        are recorded in `stage_timings` in every mode.
+        
+        speculative_support: like `pipelined`, but the support check of every value
+        starts together with its implication check, since the support direction does
+        not depend on the verdict. A `SpeculationReport` of the tokens spent on
+        values that end up not implied against the latency saved is stored under
+        `speculation_report`.
+        
+        prune_tolerance: like `pipelined`, but pending checks are cancelled per factor
+        once the factor is decided: when the support checks of all its values agree on
+        the direction, the factor is filtered out and its implication checks are
+        cancelled, and when none of its values is implied, its support checks are
+        cancelled and the factor is dropped. The default graph would instead keep such
+        a factor if its values disagree on the direction, weighing them uniformly, so
+        the score can differ from it there. Besides, once the checks still outstanding
+        cannot move `final_score` by more than this tolerance they are all cancelled
+        and the score is computed from what is known (unsettled values count as
+        neutral). As long as a factor is undecided it can move the score by as much as
+        its supportiveness ranges, so this early exit needs large tolerances or many
+        decided factors. A `PruningReport` is stored under `pruning_report`. In sync
+        runs, checks that are already running when they are cancelled still finish in
+        the background (their results are ignored); queued checks are never sent, so
+        pruning saves the most with `max_concurrency`.
+        
+        max_concurrency: cap on the checks in flight at once in the pipelined modes.
+        Queued checks that get pruned are never sent.
+        
+        memo_store: reuse implication verdicts keyed by (scenario, condition, statement)
+        and support verdicts keyed by (scenario, value, outcome_1, outcome_2) across runs,
+        regardless of few-shot examples or whitespace. Memos are tied to the step's
+        `__PROMPT_REVISION__`, the classification mode and the model. Grouped checks
+        store their per-item verdicts under the grouped step (and its revision) as well,
+        and read both those and the verdicts of single checks.
+        
+        group_threshold: when a scenario has at least this many factor values, judge
+        their implications (and, likewise, the support of the implied values)
+        `group_size` items per prompt instead of one per prompt, so the few-shot block,
+        scenario and outcomes are sent once per group. Items a group response leaves
+        out (or the whole group, if it cannot be parsed) fall back to single checks.
+        Only applies to the default graph in "generate" mode.
+        
+        marginalization_budget: the most joint factor value assignments to enumerate
+        when marginalizing. Above it, `final_score` is estimated from `num_samples`
+        assignments sampled from the factor value distributions, and
+        `marginalization_error` holds the half-width of its `confidence` interval.
+        
+        record_path: append a `BIRDRunRecord` of every run (factors, implication and
+        support checks, filtered factors) to this JSON lines file, so that the scores
+        can be recomputed with different parameters by `rescore` without LLM calls.
+        Every run also stores its record under `run_record`. A run resumed from a
+        checkpoint may append its record twice; `load_records` keeps one per scenario,
+        condition and outcomes.
+        
+        response_mode: what the nodes put into `responses`. "keep" stores the raw
+        completions, "reference" stores them in `response_store` (in memory by default)
+        and keeps only their keys, which `dereference` turns back into completions,
+        and "drop" does not store them at all.
+        
+        checkpointer: checkpoint every run (e.g. with a `SQLiteCheckpointSaver`), so
+        that after a crash running the same scenario again resumes it from its last
+        completed node. Runs are kept apart by the model, the prompt revisions and the
+        options above. See `Interface.compile_graph`.
+        """
+        super().__init__(checkpointer=checkpointer)
+        self._guided_decoding = guided_decoding
+        self._classification_mode = classification_mode
+        self._top_logprobs = top_logprobs
+        self._stream_factors = stream_factors
+        self._pipelined = pipelined or speculative_support or prune_tolerance is not None
+        self._speculative_support = speculative_support
+        self._prune_tolerance = prune_tolerance
+        self._max_concurrency = max_concurrency
+        self._memo_store = memo_store
+        self._group_threshold = group_threshold
+        self._group_size = group_size
+        self._marginalization_budget = marginalization_budget
+        self._num_samples = num_samples
+        self._confidence = confidence
+        self._record_path = record_path
+        self._record_lock = threading.Lock()
+        self._response_mode = response_mode
+        self._response_store = response_store if response_store is not None or response_mode != "reference" else InMemoryMemoStore()
+        
+    def dereference(self, keys: List[Text]) -> List[Optional[Text]]:
+        """ The completions behind the `responses` of a run in "reference" mode. """
+        return [
+            (memo or {}).get("messages")
+            for memo in (self._response_store.lookup(key) for key in keys)
+        ]
+        
+    @classmethod
+    def rescore(
+        cls,
+        records: Union[Text, List[BIRDRunRecord]],
+        supportiveness: Optional[Dict[int, float]] = None,
+        smoothing: float = 1e-6,
+        budget: int = 2 ** 16
+    ) -> List[float]:
+        """ Recompute `final_score` of stored runs (a list of records or the path of a
+        `record_path` file) with another supportiveness mapping from support index
+        (`__SUPPORTIVENESS__` by default) or implication smoothing.
+        """
+        if isinstance(records, str):
+            records = load_records(records)
+        
+        return rescore_records(
+            records,
+            supportiveness=supportiveness if supportiveness is not None else cls.__SUPPORTIVENESS__,
+            label_index=cls.__SUPPORT_LABEL_INDEX__,
+            smoothing=smoothing,
+            budget=budget
+        )
+    
     @overrides
     def get_runnable(self, llm: BaseLanguageModel) -> Runnable:
         """ """
         
-        json_llm = llm.bind(
+        # under guided decoding the JSON steps bind their own schema instead
+        def _handle_responses(output: dict) -> dict:
+            if "responses" not in output:
+                return output
+            if self._response_mode == "drop":
+                return {key: value for key, value in output.items() if key != "responses"}
+            
+            keys = []
+            for response in output['responses'] if isinstance(output['responses'], list) else [output['responses']]:
+                key = hashlib.sha256(response.encode("utf-8")).hexdigest()
+                self._response_store.update(key, {"messages": response})
+                keys.append(key)
+            return {**output, "responses": keys}
+        
+        def _node(stage: Text, node: Union[Runnable, Callable]) -> Runnable:
+            if self._response_mode == "keep":
+                return _timed(stage, node)
+            return _timed(stage, node) | RunnableLambda(_handle_responses)
+        
+        json_llm = llm if self._guided_decoding is not None else llm.bind(
             response_format={
                 "type": "json_object",
             }
@@ -98,8 +376,8 @@ class BIRDProbInferenceInterface(Interface):
         )
         
         graph_builder = StateGraph(BIRDInternalState)
-        graph_builder.add_node("sentence_sampling_o1", _call_sentence_sampling_o1)
-        graph_builder.add_node("sentence_sampling_o2", _call_sentence_sampling_o2)
+        graph_builder.add_node("sentence_sampling_o1", _node("sentence_sampling_o1", _call_sentence_sampling_o1))
+        graph_builder.add_node("sentence_sampling_o2", _node("sentence_sampling_o2", _call_sentence_sampling_o2))
         graph_builder.add_edge(START, "sentence_sampling_o1")
         graph_builder.add_edge(START, "sentence_sampling_o2")
         
@@ -112,120 +390,832 @@ class BIRDProbInferenceInterface(Interface):
             sentences_2_fomatted = "\n".join([f"#{sidx + 1} {sentence}" for sidx, sentence in enumerate(state['sentences_for_outcome_2'])])
             return f"Outcome 1: {outcome_1}\nSentences:\n{sentences_1_fomatted}\nOutcome 2: {outcome_2}\nSentences:\n{sentences_2_fomatted}"
         
-        _call_sentence_summarization = BIRDSummarizeToFactorStep().induce_stated_callable(
-            json_llm,
-            parse_input=lambda state: {
+        def _summarization_inputs(state) -> Dict[Text, Any]:
+            return {
                 "scenario": state['scenario'],
                 "description": _prepare_description(state)
-            },
-            parse_output=lambda response: {
-                "factors": [Factor(name=k, values=[Value(name=vv) for vv in v]) for k, v in response.factor_dict.items()],
-                "responses": response.messages
             }
-        )
         
-        graph_builder.add_node("sentence_summarization", _call_sentence_summarization)
-        graph_builder.add_edge(
-            ["sentence_sampling_o1", "sentence_sampling_o2"],
-            "sentence_summarization"
-        )
+        def _implication_inputs(state, statement: Text) -> Dict[Text, Any]:
+            return {
+                "scenario": state['scenario'],
+                "condition": state['condition'],
+                "statement": statement
+            }
         
-        # implication check step
-        def _check_all_implied_values(state) -> list:
-            """ """
-            factors = state['factors']
+        def _is_implied(state, value_name: Text) -> bool:
+            return state['implied_value_check'][value_name] >= .5
+        
+        def _one_sided(state, factor: Factor) -> bool:
+            """ Every value of the factor has a support verdict, all in the same direction,
+            so the factor is filtered out whatever its values imply.
+            """
+            directions = {state['direction_value_check'].get(value.name) for value in factor.values}
+            return len(directions) == 1 and None not in directions
+        
+        def _not_implied(state, factor: Factor) -> bool:
+            """ Every value of the factor has an implication verdict and none is implied. """
+            return all(
+                value.name in state['implied_value_check'] and not _is_implied(state, value.name)
+                for value in factor.values
+            )
+        
+        def _implied_score(response) -> float:
+            """ P(implied) in logprob mode, 1. or 0. otherwise, so that
+            `implied_value_check` holds floats in every mode.
+            """
+            if isinstance(response, LabelDistributionResponse):
+                return response.distribution["true"]
+            return float(response.implied)
+        
+        def _grouped(items: List[Any]) -> bool:
+            return (
+                self._group_threshold is not None
+                and self._classification_mode == "generate"
+                and len(items) >= self._group_threshold
+            )
+        
+        def _memo_namespace(step: Step) -> Text:
+            # verdicts are only shared between runs of the same step revision, mode and model
+            model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+            return f"{step.__class__.__name__}@{step.__PROMPT_REVISION__}:{self._classification_mode}:{model}"
+        
+        def _memoized(chain: Runnable, step: Step, response_class: type) -> Runnable:
+            if self._memo_store is None:
+                return chain
+            return self._memo_store.memoize(chain, _memo_namespace(step), response_class)
+        
+        def _grouped_check(
+            grouped_step: Step,
+            grouped_chain: Runnable,
+            single_chain: Runnable,
+            items_key: Text,
+            single_inputs: Callable[[Dict[Text, Any], Text], Dict[Text, Any]],
+            item_outputs: Callable[[Text, Any], dict],
+            single_step: Step,
+            response_class: type
+        ) -> Runnable:
+            """ A node that checks the items under `items_key` with a single call to
+            `grouped_chain`. Items the grouped response leaves out, or all of them if it
+            cannot be parsed, fall back to `single_chain`. `item_outputs` turns the
+            single-item response of each item into its state update.
             
-            return [
-                Send(
-                    "implication_check",
-                    {
-                        "scenario": state['scenario'],
-                        "condition": state['condition'],
-                        "statement": value.name
-                    }
-                ) for factor in factors for value in factor.values
-            ]
-        
-        _call_implication_check = RunnableParallel(
-            {
-                "passthrough": RunnablePassthrough(),
-                "responses": BIRDImplicationCheckStep().chain_llm(llm)
-            }) | RunnableLambda(
-                lambda output: {
-                "implied_value_check": {
-                    output['passthrough']['statement']: output['responses'].implied,
-                },
-                "responses": output['responses'].messages
-            })
-
-        graph_builder.add_node("implication_check", _call_implication_check)
-        graph_builder.add_conditional_edges(
-            "sentence_summarization",
-            _check_all_implied_values,
-            ["implication_check"]
-        )
+            With a memo store, the items are looked up one by one, among the verdicts of
+            earlier groups and those of the single checks of `single_step`
+            (`response_class`), only the misses are sent as a group, and the verdicts of
+            the group are stored per item. A grouped verdict comes from another prompt,
+            so it is stored under the grouped step, not as a single check.
+            """
+            namespace = f"{_memo_namespace(single_step)}/{grouped_step.__class__.__name__}@{grouped_step.__PROMPT_REVISION__}"
+            
+            def _memos(inputs) -> Dict[Text, Any]:
+                if self._memo_store is None:
+                    return {}
+                memos = {}
+                for item in inputs[items_key]:
+                    for item_namespace in (namespace, _memo_namespace(single_step)):
+                        memo = self._memo_store.lookup_response(item_namespace, single_inputs(inputs, item), response_class)
+                        if memo is not None:
+                            memos[item] = memo
+                            break
+                return memos
+            
+            def _remember(inputs, response):
+                if self._memo_store is None or response is None:
+                    return
+                for item in inputs[items_key]:
+                    item_response = response.response_for(item)
+                    if item_response is not None:
+                        self._memo_store.update_response(namespace, single_inputs(inputs, item), item_response)
+            
+            def _misses(inputs, memos: Dict[Text, Any]) -> Dict[Text, Any]:
+                return {**inputs, items_key: [item for item in inputs[items_key] if item not in memos]}
+            
+            def _grouped_inputs(inputs) -> Dict[Text, Any]:
+                return {**inputs, items_key: json.dumps(inputs[items_key])}
+            
+            def _unjudged(inputs, response) -> List[Text]:
+                return [
+                    item for item in inputs[items_key]
+                    if response is None or response.response_for(item) is None
+                ]
+            
+            def _outputs(inputs, response, fallbacks: Dict[Text, Any], memos: Dict[Text, Any]) -> dict:
+                outputs = {
+                    "responses": (
+                        ([] if response is None else [response.messages])
+                        + [fallback.messages for fallback in fallbacks.values()]
+                        # items judged by one group share its completion
+                        + list(dict.fromkeys(memo.messages for memo in memos.values()))
+                    )
+                }
+                for item in inputs[items_key]:
+                    judged = memos.get(item) or fallbacks.get(item) or response.response_for(item)
+                    for key, value in item_outputs(item, judged).items():
+                        if key != "responses":
+                            outputs[key] = {**outputs.get(key, {}), **value}
+                return outputs
+            
+            def _call(inputs) -> dict:
+                memos = _memos(inputs)
+                misses, response = _misses(inputs, memos), None
+                if misses[items_key]:
+                    try:
+                        response = grouped_chain.invoke(_grouped_inputs(misses))
+                    except ParsingFailure:
+                        response = None
+                    _remember(misses, response)
+                
+                unjudged = _unjudged(misses, response)
+                fallbacks = single_chain.batch([single_inputs(inputs, item) for item in unjudged]) if unjudged else []
+                return _outputs(inputs, response, dict(zip(unjudged, fallbacks)), memos)
+            
+            async def _acall(inputs) -> dict:
+                memos = await run_in_executor(None, _memos, inputs)
+                misses, response = _misses(inputs, memos), None
+                if misses[items_key]:
+                    try:
+                        response = await grouped_chain.ainvoke(_grouped_inputs(misses))
+                    except ParsingFailure:
+                        response = None
+                    await run_in_executor(None, _remember, misses, response)
+                
+                unjudged = _unjudged(misses, response)
+                fallbacks = await single_chain.abatch([single_inputs(inputs, item) for item in unjudged]) if unjudged else []
+                return _outputs(inputs, response, dict(zip(unjudged, fallbacks)), memos)
+            
+            return RunnableLambda(_call, afunc=_acall)
+        
+        implication_check_step = BIRDImplicationCheckStep()
+        if self._classification_mode == "logprob":
+            _implication_check_chain = _memoized(
+                implication_check_step.chain_llm_scoring(llm, top_logprobs=self._top_logprobs),
+                implication_check_step,
+                LabelDistributionResponse
+            )
+        else:
+            _implication_check_chain = _memoized(
+                implication_check_step.chain_llm(llm, guided_decoding=self._guided_decoding),
+                implication_check_step,
+                BIRDImplicationCheckResponse
+            )
         
+        if self._stream_factors:
+            # the implication checks of a factor are started as soon as the factor
+            # closes in the summarization stream, overlapping with the rest of the stream
+            summarize_step = BIRDSummarizeToFactorStep()
+            summarize_parser = summarize_step.get_output_parser()
+            summarize_stream = summarize_step._named(summarize_step.get_prompt_template() | (
+                summarize_step.get_output_grammar().bind(llm, self._guided_decoding)
+                if self._guided_decoding is not None else json_llm
+            ))
+            
+            def _summarized_and_checked(factors: List[Factor], summary: Text, checked: Dict[Text, Any]) -> dict:
+                return {
+                    "factors": factors,
+                    "implied_value_check": {statement: _implied_score(response) for statement, response in checked.items()},
+                    "responses": [summary] + [response.messages for response in checked.values()]
+                }
+            
+            def _summarize_and_check(state) -> dict:
+                factors, futures, pieces = [], {}, []
+                
+                def _tee(chunks):
+                    for chunk in chunks:
+                        pieces.append(chunk.content)
+                        yield chunk
+                
+                # checks run in the context of the node, so they inherit its callbacks and metadata
+                with ContextThreadPoolExecutor() as executor:
+                    for name, values in summarize_parser.iter_members(_tee(summarize_stream.stream(_summarization_inputs(state)))):
+                        factors.append(Factor(name=name, values=[Value(name=value) for value in values]))
+                        for value in values:
+                            if value not in futures:
+                                futures[value] = executor.submit(_implication_check_chain.invoke, _implication_inputs(state, value))
+                    
+                    return _summarized_and_checked(factors, "".join(pieces), {value: future.result() for value, future in futures.items()})
+                
+            async def _asummarize_and_check(state) -> dict:
+                factors, tasks, pieces = [], {}, []
+                
+                async def _tee(chunks):
+                    async for chunk in chunks:
+                        pieces.append(chunk.content)
+                        yield chunk
+                
+                async for name, values in summarize_parser.aiter_members(_tee(summarize_stream.astream(_summarization_inputs(state)))):
+                    factors.append(Factor(name=name, values=[Value(name=value) for value in values]))
+                    for value in values:
+                        if value not in tasks:
+                            tasks[value] = asyncio.ensure_future(_implication_check_chain.ainvoke(_implication_inputs(state, value)))
+                
+                responses = await asyncio.gather(*tasks.values())
+                return _summarized_and_checked(factors, "".join(pieces), dict(zip(tasks.keys(), responses)))
+            
+            graph_builder.add_node("sentence_summarization", _node("sentence_summarization", RunnableLambda(_summarize_and_check, afunc=_asummarize_and_check)))
+            graph_builder.add_edge(
+                ["sentence_sampling_o1", "sentence_sampling_o2"],
+                "sentence_summarization"
+            )
+            
+        else:
+            _call_sentence_summarization = BIRDSummarizeToFactorStep().induce_stated_callable(
+                json_llm,
+                parse_input=_summarization_inputs,
+                parse_output=lambda response: {
+                    "factors": [Factor(name=k, values=[Value(name=vv) for vv in v]) for k, v in response.factor_dict.items()],
+                    "responses": response.messages
+                },
+                guided_decoding=self._guided_decoding
+            )
+            
+            graph_builder.add_node("sentence_summarization", _node("sentence_summarization", _call_sentence_summarization))
+            graph_builder.add_edge(
+                ["sentence_sampling_o1", "sentence_sampling_o2"],
+                "sentence_summarization"
+            )
+            
         # add the second-pass filtering
-        _call_reevaluate_implication = BIRDReevaluateImplicationStep().induce_stated_callable(
-            llm=json_llm,
-            parse_input=lambda state: {
+        def _reevaluation_inputs(state) -> Dict[Text, Any]:
+            return {
                 "scenario": state['scenario'],
                 "implication_dict": json.dumps({
                     factor.name: [
-                        value.name for value in factor.values if state['implied_value_check'][value.name]
+                        value.name for value in factor.values
+                        # pruning may have cancelled the checks of factors that are filtered out anyway
+                        if value.name in state['implied_value_check'] and _is_implied(state, value.name)
                     ] for factor in state['factors']
                 })
-            },
-            parse_output=lambda response, state: {
+            }
+        
+        def _reevaluation_outputs(response, state) -> dict:
+            return {
                 "implied_value_check": {
-                    value.name: value.name in response.implication_dict[factor.name]
+                    # values that survive keep their (possibly soft) score
+                    value.name: state['implied_value_check'][value.name] if value.name in response.implication_dict[factor.name] else 0.
                     for factor in state['factors'] if factor.name in response.implication_dict
-                    for value in factor.values if (value.name in state['implied_value_check'] and state['implied_value_check'][value.name])
+                    for value in factor.values if (value.name in state['implied_value_check'] and _is_implied(state, value.name))
                 },
                 "responses": response.messages
             }
-        )
-        
-        graph_builder.add_node("reevaluate_implication", _call_reevaluate_implication)
-        graph_builder.add_edge("implication_check", "reevaluate_implication")
         
         # Then, further filter the factors down to only those that support single outcome
-        def _check_all_single_side_support(state) -> list:
-            """ """
-            return [
-                Send("single_side_support_check", {
-                    "scenario": state['scenario'],
-                    "condition": value_name,
-                    "outcome_1": state['outcome_1'],
-                    "outcome_2": state['outcome_2'],
-                }) for value_name in state['implied_value_check']
-            ]
-            
-        _call_single_side_support_check = RunnableParallel(
-            {
-                "passthrough": RunnablePassthrough(),
-                "processed": BIRDSentenceSupportDeterminationStep().chain_llm(llm)
-            }) | RunnableLambda(
-                lambda output: {
-                "direction_value_check": {
-                    output['passthrough']['condition']: output['processed'].support_index
-                },
-                "responses": output['processed'].messages
-            })
+        def _support_inputs(state, value_name: Text) -> Dict[Text, Any]:
+            return {
+                "scenario": state['scenario'],
+                "condition": value_name,
+                "outcome_1": state['outcome_1'],
+                "outcome_2": state['outcome_2'],
+            }
         
-        graph_builder.add_node("single_side_support_check", _call_single_side_support_check)
-        graph_builder.add_conditional_edges("reevaluate_implication", _check_all_single_side_support, ["single_side_support_check"])
+        def _support_outputs(value_name: Text, response) -> dict:
+            if isinstance(response, LabelDistributionResponse):
+                return {
+                    "direction_value_check": {value_name: self.__SUPPORT_LABEL_INDEX__[response.label]},
+                    "support_distribution": {value_name: response.distribution},
+                    "responses": response.messages
+                }
+            return {
+                "direction_value_check": {value_name: response.support_index},
+                "responses": response.messages
+            }
+        
+        def _supportiveness(state, value_name: Text) -> float:
+            if value_name in state['support_distribution']:
+                # expected supportiveness under the scored label distribution
+                return sum(
+                    self.__SUPPORTIVENESS__[self.__SUPPORT_LABEL_INDEX__[label]] * prob
+                    for label, prob in state['support_distribution'][value_name].items()
+                )
+            return self.__SUPPORTIVENESS__[state['direction_value_check'].get(value_name, -1)]
+        
+        support_check_step = BIRDSentenceSupportDeterminationStep()
+        if self._classification_mode == "logprob":
+            _support_check_chain = _memoized(
+                support_check_step.chain_llm_scoring(llm, top_logprobs=self._top_logprobs),
+                support_check_step,
+                LabelDistributionResponse
+            )
+        else:
+            _support_check_chain = _memoized(
+                support_check_step.chain_llm(llm, guided_decoding=self._guided_decoding),
+                support_check_step,
+                BIRDSentenceSupportDeterminationResponse
+            )
+        
+        if self._pipelined:
+            # per value, the support check starts as soon as its implication check returns
+            # (or right away when speculating); only the reevaluation waits for
+            # all the implication checks, and it runs while the support checks are still in flight.
+            _reevaluation_chain = BIRDReevaluateImplicationStep().chain_llm(json_llm, guided_decoding=self._guided_decoding)
+            
+            def _value_names(state) -> List[Text]:
+                return list(dict.fromkeys(value.name for factor in state['factors'] for value in factor.values))
+            
+            # every call is traced as (response, (start, end), total tokens)
+            def _traced_invoke(chain: Runnable, inputs: Dict[Text, Any]) -> Tuple[Any, Tuple[float, float], int]:
+                usage = UsageMetadataCallbackHandler()
+                start = time.perf_counter()
+                # add to the callbacks of the run rather than replace them
+                response = chain.invoke(inputs, merge_configs(ensure_config(), {"callbacks": [usage]}))
+                return response, (start, time.perf_counter()), _total_tokens(usage)
+            
+            async def _atraced_invoke(chain: Runnable, inputs: Dict[Text, Any]) -> Tuple[Any, Tuple[float, float], int]:
+                usage = UsageMetadataCallbackHandler()
+                start = time.perf_counter()
+                response = await chain.ainvoke(inputs, merge_configs(ensure_config(), {"callbacks": [usage]}))
+                return response, (start, time.perf_counter()), _total_tokens(usage)
+            
+            def _with_implications(state, implications: Dict[Text, Tuple[Any, Tuple[float, float]]]) -> dict:
+                return {
+                    **state,
+                    "implied_value_check": {
+                        **state['implied_value_check'],
+                        **{value_name: _implied_score(response) for value_name, (response, *_) in implications.items()}
+                    }
+                }
+            
+            def _settled_state(state, implications, supports, reevaluation) -> dict:
+                """ The state as far as the checks that returned so far settle it. Values
+                whose support check has not returned are missing from `direction_value_check`.
+                """
+                checked_state = _with_implications(state, implications)
+                implied_value_check = checked_state['implied_value_check']
+                responses = [response.messages for response, *_ in implications.values()]
+                
+                if reevaluation is not None:
+                    reevaluated = _reevaluation_outputs(reevaluation[0], checked_state)
+                    implied_value_check = {**implied_value_check, **reevaluated['implied_value_check']}
+                    responses.append(reevaluated['responses'])
+                
+                settled = {
+                    **checked_state,
+                    "implied_value_check": implied_value_check,
+                    "direction_value_check": {},
+                    "support_distribution": {},
+                    "responses": responses
+                }
+                for value_name, (response, *_) in supports.items():
+                    support_outputs = _support_outputs(value_name, response)
+                    settled['direction_value_check'].update(support_outputs['direction_value_check'])
+                    settled['support_distribution'].update(support_outputs.get('support_distribution', {}))
+                    settled['responses'].append(support_outputs['responses'])
+                
+                return settled
+            
+            def _score_bounds(settled, final: bool) -> Tuple[float, float]:
+                """ Bounds on `final_score` over every way the unsettled checks can still turn out.
+                
+                The score is the expectation, over the factors' value distributions, of
+                sigmoid(sum of logit(supportiveness)), which is monotone in each factor's
+                supportiveness. Factors known to be filtered out (one-sided or not implied)
+                count as .5, settled factors enter with their exact distribution, and each
+                unsettled factor at its lowest (highest) possible supportiveness, where a
+                factor that may still be filtered out can also count as .5. The support of
+                values that are not implied still decides whether their factor is filtered.
+                
+                The settled factors are marginalized like `final_score`, so above the
+                marginalization budget the bounds are Monte Carlo estimates, widened by
+                their confidence interval.
+                """
+                lowest, highest = 0., 0.
+                value_dists, supportiveness = [], []
+                for factor in settled['factors']:
+                    if _one_sided(settled, factor) or _not_implied(settled, factor):
+                        continue
+                    
+                    value_names = [value.name for value in factor.values]
+                    unsettled = [value_name for value_name in value_names if value_name not in settled['direction_value_check']]
+                    if final and not unsettled:
+                        weights = numpy.array([settled['implied_value_check'].get(value_name, 0.) for value_name in value_names], dtype=numpy.float64) + 1e-6
+                        value_dists.append(weights / numpy.sum(weights))
+                        supportiveness.append(numpy.array([_supportiveness(settled, value_name) for value_name in value_names]))
+                        continue
+                    
+                    candidates = [_supportiveness(settled, value_name) for value_name in value_names if value_name not in unsettled] + [.5]
+                    if unsettled:
+                        candidates += [self.__SUPPORTIVENESS__[0], self.__SUPPORTIVENESS__[1]]
+                    lowest += _logit(min(candidates))
+                    highest += _logit(max(candidates))
+                
+                bounds = []
+                # the unsettled factors enter as one more factor with a single value
+                for offset in (lowest, highest):
+                    bounds.append(marginalize(
+                        value_dists + [numpy.ones(1)],
+                        supportiveness + [numpy.array([_sigmoid(offset)])],
+                        budget=self._marginalization_budget,
+                        num_samples=self._num_samples,
+                        confidence=self._confidence,
+                        seed=0
+                    ))
+                
+                return max(bounds[0].score - bounds[0].error, 0.), min(bounds[1].score + bounds[1].error, 1.)
+            
+            def _unneeded_checks(settled) -> Tuple[set, set]:
+                """ The values whose implication (support) checks can no longer change the
+                score: once a factor's values all support the same outcome it is filtered
+                out whatever they imply, and once none of them is implied it is dropped
+                whatever they support. A value shared by factors is needed by any of them.
+                """
+                value_names = set(_value_names(settled))
+                needed_implications, needed_supports = set(), set()
+                for factor in settled['factors']:
+                    if _one_sided(settled, factor):
+                        continue
+                    needed_implications.update(value.name for value in factor.values)
+                    if not _not_implied(settled, factor):
+                        needed_supports.update(value.name for value in factor.values)
+                
+                return value_names - needed_implications, value_names - needed_supports
+            
+            def _prune(state, implications, supports, reevaluation, implication_checks, support_checks) -> Tuple[bool, Tuple[float, float]]:
+                """ Cancel the pending checks no factor still needs, and tell whether the
+                remaining checks can no longer move the score beyond the tolerance.
+                """
+                settled = _settled_state(state, implications, supports, reevaluation)
+                unneeded_implications, unneeded_supports = _unneeded_checks(settled)
+                for checks, unneeded in [(implication_checks, unneeded_implications), (support_checks, unneeded_supports)]:
+                    for value_name, check in list(checks.items()):
+                        if value_name in unneeded and not check.done():
+                            check.cancel()
+                
+                bounds = _score_bounds(settled, final=reevaluation is not None)
+                return bool(bounds[1] - bounds[0] <= self._prune_tolerance), bounds
+            
+            def _pipelined_outputs(state, implications, reevaluation, supports, pruning_report) -> dict:
+                settled = _settled_state(state, implications, supports, reevaluation)
+                outputs = {
+                    key: settled[key]
+                    for key in ["implied_value_check", "direction_value_check", "support_distribution", "responses"]
+                }
+                outputs['stage_timings'] = {}
+                for stage, traced in [
+                    ("implication_check", implications.values()),
+                    ("reevaluate_implication", [reevaluation] if reevaluation is not None else []),
+                    ("single_side_support_check", supports.values())
+                ]:
+                    for _, span, _ in traced:
+                        outputs['stage_timings'] = spanupdate(outputs['stage_timings'], {stage: span})
+                
+                if self._speculative_support:
+                    outputs['speculation_report'] = _speculation_report(implications, reevaluation, supports, settled['implied_value_check'])
+                if pruning_report is not None:
+                    outputs['pruning_report'] = pruning_report
+                
+                return outputs
+            
+            def _speculation_report(implications, reevaluation, supports, implied_value_check) -> SpeculationReport:
+                # without speculation a value's support check could only have started once
+                # its implication check returned, and the node ends at the later of that and
+                # the reevaluation
+                barrier_end = reevaluation[1][1] if reevaluation is not None else max(
+                    [span[1] for _, span, _ in implications.values()], default=0.
+                )
+                speculative_end = max([barrier_end] + [span[1] for _, span, _ in supports.values()])
+                sequential_end = max([barrier_end] + [
+                    (implications[value_name][1][1] if value_name in implications else span[0]) + span[1] - span[0]
+                    for value_name, (_, span, _) in supports.items()
+                ])
+                not_implied = [value_name for value_name in supports if implied_value_check.get(value_name, 0.) < .5]
+                
+                return SpeculationReport(
+                    speculative_checks=len(supports),
+                    not_implied_checks=len(not_implied),
+                    support_tokens=sum(tokens for *_, tokens in supports.values()),
+                    not_implied_tokens=sum(supports[value_name][2] for value_name in not_implied),
+                    latency_saving=sequential_end - speculative_end
+                )
+            
+            def _pruning_report(checks: List[Any], outstanding: int, skipped_reevaluation: bool, bounds) -> Optional[PruningReport]:
+                if self._prune_tolerance is None:
+                    return None
+                
+                return PruningReport(
+                    cancelled_checks=sum(check.cancelled() for check in checks) + int(skipped_reevaluation),
+                    early_exit=outstanding > 0 or skipped_reevaluation,
+                    score_bounds=bounds
+                )
+            
+            # checks are either futures (sync) or tasks (async), by value name
+            def _pending(checks: Dict[Text, Any]) -> List[Any]:
+                return [check for check in list(checks.values()) if not check.done()]
+            
+            def _collect(checks: Dict[Text, Any], results: Dict[Text, Any]):
+                """ Add the results of the checks that returned since the last call. """
+                results.update({
+                    value_name: check.result() for value_name, check in list(checks.items())
+                    if check.done() and not check.cancelled() and value_name not in results
+                })
+            
+            def _check_order(state) -> List[Tuple[Text, Text]]:
+                """ (kind, value name) of the checks in the order they are queued. Implication
+                checks go first, and their support checks follow as they return. Speculative
+                support checks are queued factor by factor ahead of the factor's implication
+                checks, since they alone can tell that the factor is filtered out. Values whose
+                implication is known get their support check right away.
+                """
+                known = state['implied_value_check']
+                if not self._speculative_support:
+                    value_names = _value_names(state)
+                    return [("implication", value_name) for value_name in value_names if value_name not in known] + [
+                        ("support", value_name) for value_name in value_names if value_name in known
+                    ]
+                
+                order, seen = [], set()
+                for factor in state['factors']:
+                    value_names = [value.name for value in factor.values if value.name not in seen]
+                    seen.update(value_names)
+                    order.extend(("support", value_name) for value_name in value_names)
+                    order.extend(("implication", value_name) for value_name in value_names if value_name not in known)
+                return order
+            
+            def _pipelined_checks(state) -> dict:
+                value_names = _value_names(state)
+                implications, supports, reevaluation = {}, {}, None
+                implication_futures, support_futures = {}, {}
+                exited, bounds = False, None
+                
+                # by default every value can have an implication and a support check in flight
+                executor = ContextThreadPoolExecutor(max_workers=self._max_concurrency or 2 * len(value_names) or 1)
+                
+                def _start_support(value_name: Text):
+                    # implication checks still running after an early exit start nothing
+                    if exited:
+                        return
+                    support_futures[value_name] = executor.submit(_traced_invoke, _support_check_chain, _support_inputs(state, value_name))
+                
+                def _implication_then_support(value_name: Text):
+                    implication = _traced_invoke(_implication_check_chain, _implication_inputs(state, value_name))
+                    if not self._speculative_support:
+                        _start_support(value_name)
+                    return implication
+                
+                def _prune_or_exit() -> bool:
+                    nonlocal bounds
+                    if self._prune_tolerance is None:
+                        return False
+                    _collect(support_futures, supports)
+                    exit_early, bounds = _prune(state, implications, supports, reevaluation, implication_futures, support_futures)
+                    return exit_early
+                
+                try:
+                    # queued checks can still be cancelled by pruning
+                    for kind, value_name in _check_order(state):
+                        if kind == "support":
+                            _start_support(value_name)
+                        else:
+                            implication_futures[value_name] = executor.submit(_implication_then_support, value_name)
+                    
+                    # support checks returning can decide a factor as well
+                    while not exited and _pending(implication_futures):
+                        wait(_pending(implication_futures) + _pending(support_futures), return_when=FIRST_COMPLETED)
+                        _collect(implication_futures, implications)
+                        exited = _prune_or_exit()
+                    
+                    if not exited:
+                        reevaluation = _traced_invoke(_reevaluation_chain, _reevaluation_inputs(_with_implications(state, implications)))
+                        exited = _prune_or_exit()
+                    
+                    # no support checks are started after the implication checks are done
+                    while not exited and _pending(support_futures):
+                        wait(_pending(support_futures), return_when=FIRST_COMPLETED)
+                        exited = _prune_or_exit()
+                        
+                finally:
+                    outstanding = _pending(implication_futures) + _pending(support_futures) if exited else []
+                    for future in outstanding:
+                        future.cancel()
+                    # checks already running finish in the background, queued ones are dropped
+                    executor.shutdown(wait=not exited, cancel_futures=exited)
+                
+                supports = {
+                    value_name: future.result() for value_name, future in support_futures.items()
+                    if future.done() and not future.cancelled()
+                }
+                pruning_report = _pruning_report([*implication_futures.values(), *support_futures.values()], len(outstanding), reevaluation is None, bounds)
+                
+                return _pipelined_outputs(state, implications, reevaluation, supports, pruning_report)
+            
+            async def _apipelined_checks(state) -> dict:
+                implications, supports, reevaluation = {}, {}, None
+                implication_tasks, support_tasks = {}, {}
+                exited, bounds = False, None
+                
+                semaphore = asyncio.Semaphore(self._max_concurrency) if self._max_concurrency else None
+                
+                async def _ainvoke(chain: Runnable, inputs: Dict[Text, Any]):
+                    if semaphore is None:
+                        return await _atraced_invoke(chain, inputs)
+                    async with semaphore:
+                        return await _atraced_invoke(chain, inputs)
+                
+                def _start_support(value_name: Text):
+                    support_tasks[value_name] = asyncio.ensure_future(_ainvoke(_support_check_chain, _support_inputs(state, value_name)))
+                
+                async def _implication_then_support(value_name: Text):
+                    implication = await _ainvoke(_implication_check_chain, _implication_inputs(state, value_name))
+                    if not self._speculative_support:
+                        _start_support(value_name)
+                    return implication
+                
+                def _prune_or_exit() -> bool:
+                    nonlocal bounds
+                    if self._prune_tolerance is None:
+                        return False
+                    _collect(support_tasks, supports)
+                    exit_early, bounds = _prune(state, implications, supports, reevaluation, implication_tasks, support_tasks)
+                    return exit_early
+                
+                try:
+                    # queued checks can still be cancelled by pruning
+                    for kind, value_name in _check_order(state):
+                        if kind == "support":
+                            _start_support(value_name)
+                        else:
+                            implication_tasks[value_name] = asyncio.ensure_future(_implication_then_support(value_name))
+                    
+                    # support checks returning can decide a factor as well
+                    while not exited and _pending(implication_tasks):
+                        await asyncio.wait(_pending(implication_tasks) + _pending(support_tasks), return_when=asyncio.FIRST_COMPLETED)
+                        _collect(implication_tasks, implications)
+                        exited = _prune_or_exit()
+                    
+                    if not exited:
+                        reevaluation = await _ainvoke(_reevaluation_chain, _reevaluation_inputs(_with_implications(state, implications)))
+                        exited = _prune_or_exit()
+                    
+                    while not exited and _pending(support_tasks):
+                        await asyncio.wait(_pending(support_tasks), return_when=asyncio.FIRST_COMPLETED)
+                        exited = _prune_or_exit()
+                    
+                finally:
+                    outstanding = _pending(implication_tasks) + _pending(support_tasks) if exited else []
+                    for task in outstanding:
+                        task.cancel()
+                    # let the cancellations (also those of pruned factors) go through before reading the tasks
+                    await asyncio.gather(
+                        *[task for task in [*implication_tasks.values(), *support_tasks.values()] if task.cancelling()],
+                        return_exceptions=True
+                    )
+                
+                supports = {
+                    value_name: task.result() for value_name, task in support_tasks.items()
+                    if task.done() and not task.cancelled()
+                }
+                pruning_report = _pruning_report([*implication_tasks.values(), *support_tasks.values()], len(outstanding), reevaluation is None, bounds)
+                
+                return _pipelined_outputs(state, implications, reevaluation, supports, pruning_report)
+            
+            graph_builder.add_node("pipelined_checks", _node("pipelined_checks", RunnableLambda(_pipelined_checks, afunc=_apipelined_checks)))
+            graph_builder.add_edge("sentence_summarization", "pipelined_checks")
+            
+        else:
+            if not self._stream_factors:
+                # implication check step
+                def _check_all_implied_values(state) -> list:
+                    """ """
+                    factors = state['factors']
+                    statements = [value.name for factor in factors for value in factor.values]
+                    
+                    if _grouped(statements):
+                        return [
+                            Send(
+                                "implication_check",
+                                {
+                                    "scenario": state['scenario'],
+                                    "condition": state['condition'],
+                                    "statements": statements[sidx:sidx + self._group_size]
+                                }
+                            ) for sidx in range(0, len(statements), self._group_size)
+                        ]
+                    
+                    return [
+                        Send(
+                            "implication_check",
+                            _implication_inputs(state, statement)
+                        ) for statement in statements
+                    ]
+                
+                grouped_implication_check_step = BIRDGroupedImplicationCheckStep()
+                _grouped_implication_check_chain = grouped_implication_check_step.chain_llm(
+                    json_llm,
+                    guided_decoding=self._guided_decoding
+                )
+                
+                _call_single_implication_check = RunnableParallel(
+                    {
+                        "passthrough": RunnablePassthrough(),
+                        "responses": _implication_check_chain
+                    }) | RunnableLambda(
+                        lambda output: {
+                        "implied_value_check": {
+                            output['passthrough']['statement']: _implied_score(output['responses']),
+                        },
+                        "responses": output['responses'].messages
+                    })
+                
+                _call_implication_check = RunnableBranch(
+                    (
+                        lambda inputs: "statements" in inputs,
+                        _grouped_check(
+                            grouped_implication_check_step,
+                            _grouped_implication_check_chain,
+                            _implication_check_chain,
+                            "statements",
+                            _implication_inputs,
+                            lambda statement, response: {"implied_value_check": {statement: _implied_score(response)}},
+                            implication_check_step,
+                            BIRDImplicationCheckResponse
+                        )
+                    ),
+                    _call_single_implication_check
+                )
+
+                graph_builder.add_node("implication_check", _node("implication_check", _call_implication_check))
+                graph_builder.add_conditional_edges(
+                    "sentence_summarization",
+                    _check_all_implied_values,
+                    ["implication_check"]
+                )
+            
+            _call_reevaluate_implication = BIRDReevaluateImplicationStep().induce_stated_callable(
+                llm=json_llm,
+                parse_input=_reevaluation_inputs,
+                parse_output=_reevaluation_outputs,
+                guided_decoding=self._guided_decoding
+            )
+            
+            graph_builder.add_node("reevaluate_implication", _node("reevaluate_implication", _call_reevaluate_implication))
+            graph_builder.add_edge("sentence_summarization" if self._stream_factors else "implication_check", "reevaluate_implication")
+            
+            def _check_all_single_side_support(state) -> list:
+                """ """
+                value_names = list(state['implied_value_check'])
+                
+                if _grouped(value_names):
+                    return [
+                        Send(
+                            "single_side_support_check",
+                            {
+                                "scenario": state['scenario'],
+                                "outcome_1": state['outcome_1'],
+                                "outcome_2": state['outcome_2'],
+                                "conditions": value_names[vidx:vidx + self._group_size]
+                            }
+                        ) for vidx in range(0, len(value_names), self._group_size)
+                    ]
+                
+                return [
+                    Send("single_side_support_check", _support_inputs(state, value_name))
+                    for value_name in value_names
+                ]
+            
+            grouped_support_check_step = BIRDGroupedSentenceSupportDeterminationStep()
+            _grouped_support_check_chain = grouped_support_check_step.chain_llm(
+                json_llm,
+                guided_decoding=self._guided_decoding
+            )
+                
+            _call_single_side_support_check = RunnableBranch(
+                (
+                    lambda inputs: "conditions" in inputs,
+                    _grouped_check(
+                        grouped_support_check_step,
+                        _grouped_support_check_chain,
+                        _support_check_chain,
+                        "conditions",
+                        _support_inputs,
+                        _support_outputs,
+                        support_check_step,
+                        BIRDSentenceSupportDeterminationResponse
+                    )
+                ),
+                RunnableParallel(
+                    {
+                        "passthrough": RunnablePassthrough(),
+                        "processed": _support_check_chain
+                    }) | RunnableLambda(
+                        lambda output: _support_outputs(output['passthrough']['condition'], output['processed'])
+                    )
+            )
+            
+            graph_builder.add_node("single_side_support_check", _node("single_side_support_check", _call_single_side_support_check))
+            graph_builder.add_conditional_edges("reevaluate_implication", _check_all_single_side_support, ["single_side_support_check"])
         
         # finally using all the filtered factors to calculate verbal probability.
         def _filter_factors(state) -> dict:
             return {
                 "filtered_factor_names": [
-                    factor.name for factor in state['factors'] if len({state['direction_value_check'][value.name] for value in factor.values}) > 1
+                    factor.name for factor in state['factors']
+                    if len({state['direction_value_check'].get(value.name, -1) for value in factor.values}) > 1
+                    # with pruning, the support checks of factors with no implied value are cancelled
+                    and not (self._prune_tolerance is not None and _not_implied(state, factor))
                 ]
             }
             
         graph_builder.add_node("filter_factors", RunnableLambda(_filter_factors))
-        graph_builder.add_edge("single_side_support_check", "filter_factors")
+        graph_builder.add_edge("pipelined_checks" if self._pipelined else "single_side_support_check", "filter_factors")
         
         # # then finally we evaluate the verbalized probabilities
         # def _calculate_all_verbalized_probabilities(state) -> list:
@@ -257,54 +1247,65 @@ class BIRDProbInferenceInterface(Interface):
         # now finally we marginalize all factors that are filtered.
         def _marginalize(state) -> dict:
             """ """
-            global np
-            iterators = [range(len(factor.values)) for factor in state['factors'] if factor.name in state['filtered_factor_names']]
-
-            factor_value_dists = [
-                numpy.array([state['implied_value_check'][value.name] for value in factor.values], dtype=numpy.float32) + 1e-6
-                for factor in state['factors'] if factor.name in state['filtered_factor_names']
-            ]
-            
-            # normalize the dist over the values
-            factor_value_dists = [
-                factor_dist / numpy.sum(factor_dist)
-                for factor_dist in factor_value_dists
-            ]
-            
-            translate = {
-                0: .75,
-                1: .25,
-                -1: .5
-            }
+            run_record = BIRDRunRecord.from_state(state)
+            factor_value_dists, supportiveness = run_record.to_arrays(self.__SUPPORTIVENESS__, self.__SUPPORT_LABEL_INDEX__)
             
-            supportiveness = [
-                numpy.array([translate[state['direction_value_check'][value.name]] for value in factor.values], dtype=numpy.float32) for factor in state['factors'] if factor.name in state['filtered_factor_names']
-            ]
+            marginalized = marginalize(
+                factor_value_dists,
+                supportiveness,
+                budget=self._marginalization_budget,
+                num_samples=self._num_samples,
+                confidence=self._confidence
+            )
             
-            marginalized = 0.
-
-            for indices in product(*iterators):
-                # calculate the joint probability
-                probs = numpy.array([sp[index] for index, sp in zip(indices, supportiveness)])
-                pp = numpy.prod(probs)
-                np = numpy.prod(1 - probs)
-
-                po_given_f = pp / (pp + np)
-                pf_given_c = numpy.prod(numpy.array([factor_dist[index] for index, factor_dist in zip(indices, factor_value_dists)]))
-                
-                marginalized += po_given_f * pf_given_c
+            run_record = replace(run_record, final_score=marginalized.score)
+            if self._record_path is not None:
+                with self._record_lock:
+                    save_records([run_record], self._record_path)
                 
             return {
-                "final_score": marginalized
+                "final_score": marginalized.score,
+                "marginalization_method": marginalized.method,
+                "marginalization_error": marginalized.error,
+                "run_record": run_record
             }
             
         graph_builder.add_node("marginalize", RunnableLambda(_marginalize))
         graph_builder.add_edge("filter_factors", "marginalize")
         graph_builder.add_edge("marginalize", END)
         
-        compiled_graph = graph_builder.compile()
-
-        return RunnableLambda(
+        # checkpointed runs are only resumed by the same model, prompts and options
+        namespace = self.checkpoint_namespace(
+            llm,
+            prompt_revisions={
+                step_class.__name__: step_class.__PROMPT_REVISION__
+                for step_class in [
+                    BIRDSentenceProposalStep,
+                    BIRDSummarizeToFactorStep,
+                    BIRDImplicationCheckStep,
+                    BIRDGroupedImplicationCheckStep,
+                    BIRDReevaluateImplicationStep,
+                    BIRDSentenceSupportDeterminationStep,
+                    BIRDGroupedSentenceSupportDeterminationStep
+                ]
+            },
+            guided_decoding=self._guided_decoding,
+            classification_mode=self._classification_mode,
+            top_logprobs=self._top_logprobs,
+            stream_factors=self._stream_factors,
+            pipelined=self._pipelined,
+            speculative_support=self._speculative_support,
+            prune_tolerance=self._prune_tolerance,
+            group_threshold=self._group_threshold,
+            group_size=self._group_size,
+            marginalization_budget=self._marginalization_budget,
+            num_samples=self._num_samples,
+            confidence=self._confidence,
+            response_mode=self._response_mode
+        )
+        
+        return self.compile_graph(
+            graph_builder,
             lambda input: BIRDInternalState(
                 scenario=input['scenario'],
                 condition=input['condition'],
@@ -316,7 +1317,15 @@ class BIRDProbInferenceInterface(Interface):
                 factors=[],
                 implied_value_check={},
                 direction_value_check={},
+                support_distribution={},
+                stage_timings={},
+                speculation_report=None,
+                pruning_report=None,
                 filtered_factor_names=[],
-                final_score=None
-            )
-        ) | compiled_graph
\ No newline at end of file
+                final_score=None,
+                marginalization_method=None,
+                marginalization_error=None,
+                run_record=None
+            ),
+            namespace
+        )
\ No newline at end of file
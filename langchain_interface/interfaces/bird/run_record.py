@@ -0,0 +1,152 @@
+""" What a BIRD run needs to recompute `final_score` without calling the LLM,
+stored one JSON line per scenario, and a vectorized re-scoring of such records.
+"""
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+import numpy
+from collections import defaultdict
+from dataclasses import dataclass, asdict, is_dataclass
+from typing import Any, Dict, Iterable, List, Optional, Text, Tuple
+from ...instances.instance import Instance
+from .marginalization import marginalize, marginalize_batch, pad_batch
+
+
+@dataclass(frozen=True, eq=True)
+class BIRDRunRecord(Instance):
+    scenario: Text
+    condition: Text
+    outcome_1: Text
+    outcome_2: Text
+    # {"name": ..., "values": [...]} in the order of the run's `factors`
+    factors: List[Dict[Text, Any]]
+    # P(implied), 1. or 0. unless scored from logprobs (older records hold bools)
+    implied_value_check: Dict[Text, float]
+    direction_value_check: Dict[Text, int]
+    filtered_factor_names: List[Text]
+    support_distribution: Dict[Text, Dict[Text, float]]
+    final_score: Optional[float]
+
+    @classmethod
+    def from_state(cls, state) -> "BIRDRunRecord":
+        return cls(
+            scenario=state['scenario'],
+            condition=state['condition'],
+            outcome_1=state['outcome_1'],
+            outcome_2=state['outcome_2'],
+            factors=[asdict(factor) if is_dataclass(factor) else factor for factor in state['factors']],
+            implied_value_check=dict(state['implied_value_check']),
+            direction_value_check=dict(state['direction_value_check']),
+            filtered_factor_names=list(state['filtered_factor_names']),
+            support_distribution=dict(state.get('support_distribution') or {}),
+            final_score=state.get('final_score')
+        )
+
+    @classmethod
+    def from_dict(cls, record: Dict[Text, Any]) -> "BIRDRunRecord":
+        return cls(**record)
+
+    @property
+    def key(self) -> Tuple[Text, Text, Text, Text]:
+        """ The inputs of the run, which a resumed or repeated run writes again. """
+        return (self.scenario, self.condition, self.outcome_1, self.outcome_2)
+
+    def supportiveness(
+        self,
+        value_name: Text,
+        supportiveness: Dict[int, float],
+        label_index: Dict[Text, int]
+    ) -> float:
+        """ How much a value supports outcome 1 under the given mapping from
+        support index. Scored support labels count by their expectation.
+        """
+        if value_name in self.support_distribution:
+            return sum(
+                supportiveness[label_index[label]] * prob
+                for label, prob in self.support_distribution[value_name].items()
+            )
+        return supportiveness[self.direction_value_check.get(value_name, -1)]
+
+    def to_arrays(
+        self,
+        supportiveness: Dict[int, float],
+        label_index: Dict[Text, int],
+        smoothing: float = 1e-6
+    ) -> Tuple[List[numpy.ndarray], List[numpy.ndarray]]:
+        """ The value distributions and supportiveness of the filtered factors, as
+        marginalized into `final_score`. `smoothing` is added to the implication
+        scores before they are normalized over each factor's values.
+        """
+        filtered_factors = [factor for factor in self.factors if factor['name'] in self.filtered_factor_names]
+
+        value_dists = []
+        for factor in filtered_factors:
+            weights = numpy.array([self.implied_value_check.get(value['name'], 0.) for value in factor['values']], dtype=numpy.float64) + smoothing
+            value_dists.append(weights / numpy.sum(weights))
+
+        return value_dists, [
+            numpy.array([self.supportiveness(value['name'], supportiveness, label_index) for value in factor['values']], dtype=numpy.float64)
+            for factor in filtered_factors
+        ]
+
+
+def save_records(records: Iterable[BIRDRunRecord], path: Text, append: bool = True):
+    with open(path, "a" if append else "w", encoding="utf-8") as file_:
+        for record in records:
+            file_.write(json.dumps(record.to_dict(), ensure_ascii=False) + "\n")
+
+
+def load_records(path: Text) -> List[BIRDRunRecord]:
+    """ The records in `path`, one per run `key`. Runs resumed from a checkpoint
+    (or repeated) append their record again, and the last one is kept, in the
+    place of the first.
+    """
+    records: Dict[Tuple[Text, Text, Text, Text], BIRDRunRecord] = {}
+    with open(path, "r", encoding="utf-8") as file_:
+        for line in file_:
+            if line.strip():
+                record = BIRDRunRecord.from_dict(json.loads(line))
+                records[record.key] = record
+    return list(records.values())
+
+
+def rescore_records(
+    records: List[BIRDRunRecord],
+    supportiveness: Dict[int, float],
+    label_index: Dict[Text, int],
+    smoothing: float = 1e-6,
+    budget: int = 2 ** 16,
+    num_samples: int = 10000,
+    seed: Optional[int] = None
+) -> List[float]:
+    """ Recompute `final_score` for every record with the given parameters.
+
+    Records are marginalized exactly in padded batches of the same factor count.
+    Records with more than `budget` joint assignments are estimated by Monte Carlo
+    sampling, as in the run itself.
+    """
+
+    arrays = [record.to_arrays(supportiveness, label_index, smoothing=smoothing) for record in records]
+    scores: List[Optional[float]] = [None] * len(records)
+
+    buckets = defaultdict(list)
+    for ridx, (value_dists, _) in enumerate(arrays):
+        buckets[len(value_dists)].append(ridx)
+
+    for num_factors, indices in buckets.items():
+        num_values = max((len(dist) for ridx in indices for dist in arrays[ridx][0]), default=1)
+        if num_values ** num_factors <= budget:
+            batch_scores = marginalize_batch(*pad_batch(
+                [arrays[ridx][0] for ridx in indices],
+                [arrays[ridx][1] for ridx in indices]
+            ))
+            for ridx, score in zip(indices, batch_scores):
+                scores[ridx] = float(score)
+            continue
+
+        for ridx in indices:
+            scores[ridx] = marginalize(*arrays[ridx], budget=budget, num_samples=num_samples, seed=seed).score
+
+    return scores
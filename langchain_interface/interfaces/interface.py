@@ -3,6 +3,14 @@
 
 import abc
 import asyncio
+import dataclasses
+import hashlib
+import os
+import time
+try:
+    import ujson as json
+except ImportError:
+    import json
 from registrable import Registrable
 from typing import (
     Union,
@@ -15,22 +23,135 @@ from typing import (
     Iterable,
     AsyncGenerator,
     Awaitable,
-    Tuple
+    Tuple,
+    TYPE_CHECKING
 )
 from langchain_core.runnables.config import RunnableConfig
-from langchain_core.runnables.base import Runnable
+from langchain_core.runnables.base import Runnable, RunnableLambda
 from langchain_core.language_models.base import BaseLanguageModel
-from langgraph.graph.state import CompiledStateGraph
-from langgraph.graph import Graph
-from tqdm import tqdm
-from ..states.base_states import BaseState
 from ..instances.instance import Instance, LLMResponse
 
+if TYPE_CHECKING:
+    # only needed for annotations, the subclasses import langgraph to build their graphs
+    from langgraph.graph import StateGraph
+    from langgraph.checkpoint.base import BaseCheckpointSaver
+    from ..states.base_states import BaseState
+
+
+_EXHAUSTED = object()
+
+
+@dataclasses.dataclass(frozen=True, eq=True)
+class DatasetRunReport:
+    num_inputs: int
+    num_failed: int
+    # wall-clock seconds and inputs per second of the whole run
+    elapsed: float
+    throughput: float
+
+
+def _iterate_inputs(inputs: Union[Iterable[Dict[Text, Any]], Text, os.PathLike]) -> Iterable[Dict[Text, Any]]:
+    """ Inputs as given, or read lazily from a JSON lines file. """
+    if not isinstance(inputs, (str, os.PathLike)):
+        yield from inputs
+        return
+    with open(inputs, "r", encoding="utf-8") as file_:
+        for line in file_:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _to_jsonable(value: Any) -> Any:
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "tolist"):
+        # numpy scalars and arrays
+        return value.tolist()
+    return str(value)
+
+
+def llm_fingerprint(llm: BaseLanguageModel) -> Text:
+    """ What tells the completions of `llm` apart from another model's: its
+    class and parameters, as in LangChain's LLM cache key.
+    """
+    if hasattr(llm, "_get_llm_string"):
+        return llm._get_llm_string()
+    return json.dumps(llm.dict(), sort_keys=True, default=str)
+
+
+def _count_lines(path: Text) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as file_:
+        return sum(1 for line in file_ if line.strip())
+
 
 class Interface(Registrable, abc.ABC):
     
-    def __init__(self):
+    def __init__(self, checkpointer: Optional["BaseCheckpointSaver"] = None):
         super().__init__()
+        self._checkpointer = checkpointer
+        
+    def compile_graph(
+        self,
+        graph_builder: "StateGraph",
+        to_state: Callable[[Dict[Text, Any]], Dict[Text, Any]],
+        namespace: Text
+    ) -> Runnable:
+        """ Compile `graph_builder` with the interface's checkpointer (if any) behind
+        `to_state`, which turns an input into the initial graph state.
+        
+        With a checkpointer every input runs as its own thread, named by the
+        `thread_id` in the config or else by a hash of `namespace` and the input.
+        Running an input again resumes its graph from the last completed node, or
+        returns its final state right away if the run had finished. `namespace` must
+        change with everything else that changes the run (the model, prompts and
+        options, see `checkpoint_namespace`), or runs of another configuration are
+        resumed or returned as they are.
+        """
+        compiled_graph = graph_builder.compile(checkpointer=self._checkpointer)
+        
+        if self._checkpointer is None:
+            return RunnableLambda(to_state) | compiled_graph
+        
+        def _thread_config(input: Dict[Text, Any], config: RunnableConfig) -> RunnableConfig:
+            configurable = config.get("configurable", {})
+            if "thread_id" in configurable:
+                return config
+            thread_id = hashlib.sha256(json.dumps([namespace, input], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+            return {**config, "configurable": {**configurable, "thread_id": thread_id}}
+        
+        def _call(input: Dict[Text, Any], config: RunnableConfig) -> Dict[Text, Any]:
+            config = _thread_config(input, config)
+            snapshot = compiled_graph.get_state(config)
+            if snapshot.next:
+                return compiled_graph.invoke(None, config)
+            if snapshot.values:
+                return snapshot.values
+            return compiled_graph.invoke(to_state(input), config)
+        
+        async def _acall(input: Dict[Text, Any], config: RunnableConfig) -> Dict[Text, Any]:
+            config = _thread_config(input, config)
+            snapshot = await compiled_graph.aget_state(config)
+            if snapshot.next:
+                return await compiled_graph.ainvoke(None, config)
+            if snapshot.values:
+                return snapshot.values
+            return await compiled_graph.ainvoke(to_state(input), config)
+        
+        return RunnableLambda(_call, afunc=_acall)
+    
+    def checkpoint_namespace(self, llm: Optional[BaseLanguageModel], **options) -> Text:
+        """ A `compile_graph` namespace from the interface class, `llm` and the
+        `options` (JSON-able values, e.g. constructor arguments and prompt revisions)
+        that shape the run.
+        """
+        fingerprint = {
+            "llm": llm_fingerprint(llm) if llm is not None else None,
+            "options": options
+        }
+        digest = hashlib.sha256(json.dumps(fingerprint, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return f"{self.__class__.__name__}:{digest}"
     
     @abc.abstractmethod
     def get_runnable(
@@ -38,4 +159,122 @@ class Interface(Registrable, abc.ABC):
         llm: BaseLanguageModel,
     ) -> Runnable:
         # Important: We return a graph that should be compiled by the end user
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+    
+    async def arun_dataset(
+        self,
+        llm: BaseLanguageModel,
+        inputs: Union[Iterable[Dict[Text, Any]], Text, os.PathLike],
+        output_path: Optional[Text] = None,
+        on_result: Optional[Callable[[int, Optional[Any], Optional[BaseException]], None]] = None,
+        output_fn: Optional[Callable[[Dict[Text, Any]], Any]] = None,
+        max_concurrency: int = 16,
+        max_pending: Optional[int] = None,
+        config: Optional[RunnableConfig] = None,
+        resume: bool = False,
+        total: Optional[int] = None,
+        progress: bool = True
+    ) -> DatasetRunReport:
+        """ Run `get_runnable(llm)` over a dataset without holding it in memory.
+        
+        inputs: an iterable of inputs, or the path of a JSON lines file of inputs.
+            Either is consumed lazily.
+        output_path: a JSON lines file that receives `{"index": ..., "output": ...}`
+            (or `{"index": ..., "error": ...}` if the input failed) per input, in
+            input order, as soon as all earlier inputs are done.
+        on_result: called with (index, output, error) in the same order.
+        output_fn: maps a final state to what is written, e.g. a few of its keys.
+        max_concurrency: the most inputs running at once.
+        max_pending: the most inputs read but not yet written (4 * max_concurrency
+            by default). A slow input holds back the reading of new ones once the
+            results after it fill this window, so memory stays flat however long
+            the dataset is.
+        resume: skip as many inputs as `output_path` already has lines for, and
+            append to it.
+        total: the number of inputs, if known, for the progress bar.
+        
+        Every input runs with its index as `row` in the metadata of its config.
+        """
+        
+        from tqdm import tqdm
+        
+        runnable = self.get_runnable(llm)
+        max_pending = max(max_pending or 4 * max_concurrency, max_concurrency)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        start_index = _count_lines(output_path) if resume and output_path is not None else 0
+        iterator = iter(_iterate_inputs(inputs))
+        for _ in range(start_index):
+            if next(iterator, _EXHAUSTED) is _EXHAUSTED:
+                break
+        
+        async def _run(index: int, input: Dict[Text, Any]) -> Tuple[Optional[Any], Optional[BaseException]]:
+            row_config = {**(config or {}), "metadata": {**((config or {}).get("metadata") or {}), "row": index}}
+            async with semaphore:
+                try:
+                    output = await runnable.ainvoke(input, config=row_config)
+                except Exception as e:
+                    return None, e
+                return (output_fn(output) if output_fn is not None else output), None
+        
+        pending: Dict[int, asyncio.Task] = {}
+        next_read, next_write, num_failed = start_index, start_index, 0
+        exhausted = False
+        output_file = open(output_path, "a" if resume else "w", encoding="utf-8") if output_path is not None else None
+        progress_bar = tqdm(
+            total=total - start_index if total is not None else None,
+            unit="input",
+            disable=not progress
+        )
+        start_time = time.perf_counter()
+        
+        try:
+            while True:
+                while not exhausted and len(pending) < max_pending:
+                    input = next(iterator, _EXHAUSTED)
+                    if input is _EXHAUSTED:
+                        exhausted = True
+                        break
+                    pending[next_read] = asyncio.ensure_future(_run(next_read, input))
+                    next_read += 1
+                
+                if not pending:
+                    break
+                
+                # results are written in order, so only the oldest input frees the window
+                await asyncio.wait([pending[next_write]])
+                
+                while next_write in pending and pending[next_write].done():
+                    output, error = pending.pop(next_write).result()
+                    num_failed += error is not None
+                    if output_file is not None:
+                        record = {"index": next_write, "output": output} if error is None else {"index": next_write, "error": repr(error)}
+                        output_file.write(json.dumps(record, ensure_ascii=False, default=_to_jsonable) + "\n")
+                    if on_result is not None:
+                        on_result(next_write, output, error)
+                    next_write += 1
+                    progress_bar.update(1)
+                
+                if output_file is not None:
+                    output_file.flush()
+                progress_bar.set_postfix(failed=num_failed, pending=len(pending))
+        finally:
+            for task in pending.values():
+                task.cancel()
+            if output_file is not None:
+                output_file.close()
+            progress_bar.close()
+        
+        elapsed = time.perf_counter() - start_time
+        num_inputs = next_write - start_index
+        
+        return DatasetRunReport(
+            num_inputs=num_inputs,
+            num_failed=num_failed,
+            elapsed=elapsed,
+            throughput=num_inputs / elapsed if elapsed > 0 else 0.
+        )
+    
+    def run_dataset(self, *args, **kwargs) -> DatasetRunReport:
+        """ `arun_dataset` on a new event loop (so not from inside a running one). """
+        return asyncio.run(self.arun_dataset(*args, **kwargs))
@@ -0,0 +1,3 @@
+from .memo_store import MemoStore, normalize_text
+from .in_memory_memo_store import InMemoryMemoStore
+from .sqlite_memo_store import SQLiteMemoStore
@@ -0,0 +1,22 @@
+""" """
+
+from typing import Any, Dict, Optional, Text
+from overrides import overrides
+from .memo_store import MemoStore
+
+
+@MemoStore.register("in-memory")
+class InMemoryMemoStore(MemoStore):
+    """ Memos that live as long as the store object. """
+
+    def __init__(self):
+        super().__init__()
+        self._memos: Dict[Text, Dict[Text, Any]] = {}
+
+    @overrides
+    def lookup(self, key: Text) -> Optional[Dict[Text, Any]]:
+        return self._memos.get(key)
+
+    @overrides
+    def update(self, key: Text, value: Dict[Text, Any]):
+        self._memos[key] = value
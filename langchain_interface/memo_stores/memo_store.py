@@ -0,0 +1,99 @@
+""" Memoize step verdicts by their semantic inputs, so that they are reused
+across runs (and graphs) that share them, independently of raw prompt caching.
+"""
+
+import abc
+import hashlib
+import unicodedata
+try:
+    import ujson as json
+except ImportError:
+    import json
+from registrable import Registrable
+from typing import Any, Dict, Optional, Text, Type
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_core.runnables.config import run_in_executor
+from ..instances.instance import LLMResponse
+from ..instrumentation import increment
+
+
+def normalize_text(text: Text) -> Text:
+    """ Make superficially different renderings of the same input compare equal. """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+class MemoStore(Registrable, abc.ABC):
+    """ A key-value store of step responses keyed by their normalized inputs.
+
+    Keys are namespaced by the step, its `__PROMPT_REVISION__` and anything else
+    that changes the meaning of a verdict (e.g. the model), so that bumping the
+    revision of a step invalidates its memos.
+
+    Async callers look memos up and store them from worker threads, so stores have
+    to be thread-safe.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    @abc.abstractmethod
+    def lookup(self, key: Text) -> Optional[Dict[Text, Any]]:
+        """ """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def update(self, key: Text, value: Dict[Text, Any]):
+        """ """
+        raise NotImplementedError
+
+    @staticmethod
+    def make_key(namespace: Text, inputs: Dict[Text, Any]) -> Text:
+        normalized = sorted(
+            (name, normalize_text(value) if isinstance(value, str) else value)
+            for name, value in inputs.items()
+        )
+        return hashlib.sha256(json.dumps([namespace, normalized]).encode("utf-8")).hexdigest()
+
+    def lookup_response(
+        self,
+        namespace: Text,
+        inputs: Dict[Text, Any],
+        response_class: Type[LLMResponse]
+    ) -> Optional[LLMResponse]:
+        """ The response memoized for `inputs` in `namespace`, rebuilt as `response_class`. """
+        memo = self.lookup(self.make_key(namespace, inputs))
+        increment("cache_lookups_total", cache="memo", result="hit" if memo is not None else "miss")
+        return response_class(**memo) if memo is not None else None
+
+    def update_response(self, namespace: Text, inputs: Dict[Text, Any], response: LLMResponse):
+        self.update(self.make_key(namespace, inputs), response.to_dict())
+
+    def memoize(
+        self,
+        runnable: Runnable,
+        namespace: Text,
+        response_class: Type[LLMResponse]
+    ) -> Runnable:
+        """ Wrap a chained step so that it is only called for inputs not seen before
+        in `namespace`. Responses are stored as their fields and rebuilt as
+        `response_class`.
+        """
+
+        def _call(inputs: Dict[Text, Any]) -> LLMResponse:
+            response = self.lookup_response(namespace, inputs, response_class)
+            if response is not None:
+                return response
+            response = runnable.invoke(inputs)
+            self.update_response(namespace, inputs, response)
+            return response
+
+        async def _acall(inputs: Dict[Text, Any]) -> LLMResponse:
+            # store calls may block (e.g. on a shared SQLite file), so they stay off the event loop
+            response = await run_in_executor(None, self.lookup_response, namespace, inputs, response_class)
+            if response is not None:
+                return response
+            response = await runnable.ainvoke(inputs)
+            await run_in_executor(None, self.update_response, namespace, inputs, response)
+            return response
+
+        return RunnableLambda(_call, afunc=_acall)
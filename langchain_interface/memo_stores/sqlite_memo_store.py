@@ -0,0 +1,56 @@
+""" """
+
+import sqlite3
+import threading
+import time
+try:
+    import ujson as json
+except ImportError:
+    import json
+from typing import Any, Dict, Optional, Text
+from overrides import overrides
+from .memo_store import MemoStore
+
+
+def enable_wal(connection: sqlite3.Connection, timeout: float):
+    """ Switch the database of `connection` to WAL mode. Unlike other statements,
+    the switch does not wait for the database lock, so processes that open a new
+    database at once retry it for up to `timeout` seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            return
+        except sqlite3.OperationalError as error:
+            if "locked" not in str(error) or time.monotonic() > deadline:
+                raise
+            time.sleep(.01)
+
+
+@MemoStore.register("sqlite")
+class SQLiteMemoStore(MemoStore):
+    """ Memos persisted in a SQLite database, shared across processes and runs.
+
+    The database is in WAL mode, so that processes sharing it read while another
+    one writes, and writers wait up to `timeout` seconds for each other.
+    """
+
+    def __init__(self, database_path: Text, timeout: float = 30.):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(database_path, check_same_thread=False, timeout=timeout)
+        enable_wal(self._connection, timeout)
+        with self._lock, self._connection:
+            self._connection.execute("CREATE TABLE IF NOT EXISTS memos (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    @overrides
+    def lookup(self, key: Text) -> Optional[Dict[Text, Any]]:
+        with self._lock:
+            row = self._connection.execute("SELECT value FROM memos WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    @overrides
+    def update(self, key: Text, value: Dict[Text, Any]):
+        with self._lock, self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO memos (key, value) VALUES (?, ?)", (key, json.dumps(value)))
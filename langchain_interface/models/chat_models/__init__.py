@@ -1,2 +1,3 @@
 from .chat_openai_patch import ChatOpenAIWithBatchAPI
-from .chat_openai_patch import BatchedAPIConfig
\ No newline at end of file
+from .chat_openai_patch import BatchedAPIConfig
+from .replay_chat_model import ReplayChatModel, RecordingChatModel, prompt_key
@@ -0,0 +1,200 @@
+""" Deterministic chat models for offline benchmarks and tests.
+
+`ReplayChatModel` answers every prompt with the completion recorded for it,
+keyed by `prompt_key` (a hash of the role and content of the messages), so a
+step or a whole graph runs without network access and with the same outputs
+every time. `RecordingChatModel` wraps a real model and records its
+completions in the same format, to produce such recordings.
+
+Recordings are stored one JSON line per prompt:
+
+    {"key": ..., "messages": [[role, content], ...], "completion": ...}
+
+where `messages` is only kept to make the file readable.
+"""
+
+import asyncio
+import hashlib
+# not ujson, which escapes differently: keys have to be the same everywhere
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Text
+from pydantic import Field, PrivateAttr
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+def _serialize_messages(messages: List[BaseMessage]) -> List[List[Any]]:
+    return [[message.type, message.content] for message in messages]
+
+
+def prompt_key(messages: List[BaseMessage]) -> Text:
+    """ The key of a prompt in a recording. Message ids, names and metadata
+    do not count.
+    """
+    serialized = json.dumps(_serialize_messages(messages), ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _num_tokens(text: Text) -> int:
+    """ A rough count (4 characters per token), enough to exercise token accounting. """
+    return max(1, len(text) // 4)
+
+
+def _content_text(messages: List[BaseMessage]) -> Text:
+    return "".join(message.content if isinstance(message.content, str) else json.dumps(message.content) for message in messages)
+
+
+def load_recordings(path: Text) -> Dict[Text, Text]:
+    with open(path, "r", encoding="utf-8") as file_:
+        return {
+            record["key"]: record["completion"]
+            for record in (json.loads(line) for line in file_ if line.strip())
+        }
+
+
+class ReplayChatModel(BaseChatModel):
+    """ Replays `recordings` (prompt key -> completion).
+
+    Prompts without a recording get one of `responses`, picked by their key, if
+    any are given, and raise a `ValueError` otherwise. `latency` seconds are
+    slept per call (without holding the event loop in async calls) to stand in
+    for the network.
+    """
+
+    recordings: Dict[Text, Text] = Field(default_factory=dict)
+    responses: List[Text] = Field(default_factory=list)
+    latency: float = 0.
+    model_name: Text = "replay"
+    num_misses: int = 0
+    _digest: Optional[Text] = PrivateAttr(default=None)
+
+    @classmethod
+    def from_file(cls, path: Text, **kwargs) -> "ReplayChatModel":
+        return cls(recordings=load_recordings(path), **kwargs)
+
+    @property
+    def _llm_type(self) -> Text:
+        return "replay-chat-model"
+
+    @property
+    def _identifying_params(self) -> Dict[Text, Any]:
+        # replay models differ by what they replay, e.g. in checkpoint namespaces
+        if self._digest is None:
+            self._digest = hashlib.sha256(
+                json.dumps([self.recordings, self.responses], sort_keys=True).encode("utf-8")
+            ).hexdigest()
+        return {"model_name": self.model_name, "recordings": self._digest}
+
+    def _completion(self, messages: List[BaseMessage]) -> Text:
+        key = prompt_key(messages)
+        if key in self.recordings:
+            return self.recordings[key]
+        self.num_misses += 1
+        if not self.responses:
+            raise ValueError(f"No recorded completion for prompt {key}.")
+        return self.responses[int(key, 16) % len(self.responses)]
+
+    def _result(self, messages: List[BaseMessage], completion: Text) -> ChatResult:
+        input_tokens, output_tokens = _num_tokens(_content_text(messages)), _num_tokens(completion)
+        message = AIMessage(
+            content=completion,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens
+            },
+            response_metadata={"model_name": self.model_name}
+        )
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={
+                "model_name": self.model_name,
+                "token_usage": {
+                    "prompt_tokens": input_tokens,
+                    "completion_tokens": output_tokens,
+                    "total_tokens": input_tokens + output_tokens
+                }
+            }
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[Text]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        completion = self._completion(messages)
+        if self.latency:
+            time.sleep(self.latency)
+        return self._result(messages, completion)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[Text]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        completion = self._completion(messages)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._result(messages, completion)
+
+
+class RecordingChatModel(BaseChatModel):
+    """ Calls `llm` and records every completion it returns, for `save` to
+    write out as a recording for `ReplayChatModel`.
+    """
+
+    llm: BaseChatModel
+    _records: Dict[Text, Dict[Text, Any]] = PrivateAttr(default_factory=dict)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> Text:
+        return "recording-chat-model"
+
+    @property
+    def records(self) -> List[Dict[Text, Any]]:
+        return list(self._records.values())
+
+    def _record(self, messages: List[BaseMessage], result: ChatResult) -> ChatResult:
+        key = prompt_key(messages)
+        with self._lock:
+            self._records[key] = {
+                "key": key,
+                "messages": _serialize_messages(messages),
+                "completion": result.generations[0].message.content
+            }
+        return result
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[Text]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        return self._record(messages, self.llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[Text]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        return self._record(messages, await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs))
+
+    def save(self, path: Text):
+        """ Write the records, sorted by key so that re-recording the same
+        prompts gives the same file.
+        """
+        with open(path, "w", encoding="utf-8") as file_:
+            for record in sorted(self.records, key=lambda record: record["key"]):
+                file_.write(json.dumps(record, ensure_ascii=False) + "\n")
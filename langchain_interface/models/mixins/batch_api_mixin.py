@@ -7,6 +7,7 @@ import os
 import warnings
 import uuid
 import tempfile
+import time
 from langchain_core.load import dumps, dumpd
 from langchain_core.caches import BaseCache
 from langchain.globals import get_llm_cache
@@ -23,6 +24,7 @@ from dataclasses import dataclass
 from langchain_core.outputs import ChatResult
 from langchain_core.outputs import LLMResult
 from langchain_openai.chat_models.base import _convert_dict_to_message
+from ...instrumentation import increment, observe, record_usage
 from typing import (
     TYPE_CHECKING,
     List,
@@ -55,6 +57,7 @@ class BatchedAPIMixin:
         **kwargs: Optional[Any],
     ):
 
+        configs = config if isinstance(config, list) else [config] * len(inputs)
         batch_file_dir = config[0]['configurable'].get("batch_file_dir", None) if isinstance(config, list) else config['configurable'].get("batch_file_dir", None)
         max_abatch_size = config[0]['configurable'].get("max_abatch_size", None) if isinstance(config, list) else config['configurable'].get("max_abatch_size", None)
         
@@ -87,7 +90,12 @@ class BatchedAPIMixin:
             **kwargs
         )
         
-        return [generations[0].message for generations in llm_results.generations]
+        messages = [generations[0].message for generations in llm_results.generations]
+        # no callbacks run for the batch, so usage is reported directly
+        for message, input_config in zip(messages, configs):
+            record_usage(message, input_config.get("metadata"))
+        
+        return messages
         
     async def agenerate_prompt(
         self,
@@ -212,8 +220,11 @@ class BatchedAPIMixin:
                 raise ValueError(msg)
             
         # perform cache val operations
-        processed = [ChatResult(generations=cache_val) if isinstance(cache_val, list) else None for cache_val in cache_vals]
+        processed = [ChatResult(generations=self._convert_cached_generations(cache_val)) if isinstance(cache_val, list) else None for cache_val in cache_vals]
         need_process_index = [i for i, cache_val in enumerate(cache_vals) if cache_val is None]
+        if check_cache and llm_cache:
+            increment("cache_lookups_total", len(message_batches) - len(need_process_index), cache="llm", result="hit")
+            increment("cache_lookups_total", len(need_process_index), cache="llm", result="miss")
         
         filtered_message_batches = [message_batches[i] for i in need_process_index]
 
@@ -269,6 +280,7 @@ class BatchedAPIMixin:
                 
                 batch_request_id = batch_obj.id
                 batch_output_file_id = None
+                batch_submitted = time.perf_counter()
 
                 # manual remove of tempfile
                 # even if the removal failed, we'll ignore it
@@ -292,6 +304,8 @@ class BatchedAPIMixin:
                         sleeping_window = min(sleeping_window * 2, 300)
                     elif batch_obj.status == "completed":
                         batch_output_file_id = batch_obj.output_file_id
+                        observe("batch_wait_seconds", time.perf_counter() - batch_submitted)
+                        increment("batch_requests_total", len(current_payloads))
                         break
                     else:
                         raise ValueError(f"Batch request failed with status: {batch_obj.status}")
@@ -330,11 +344,12 @@ class BatchedAPIMixin:
             for nr, npindex in zip(new_results, need_process_index):
                 processed[npindex] = nr
                 
-            for r in processed:
+            for r in new_results:
                 if len(r.generations) == 1:
-                    r.generations[0].message.repsonse_metadata = {
+                    r.generations[0].message.response_metadata = {
                         **(r.llm_output if r.llm_output else {}),
                         **r.generations[0].message.response_metadata,
+                        "batch_api": True,
                     }
 
             if check_cache and llm_cache:
@@ -394,9 +409,10 @@ class BatchedAPIMixin:
 
             for r in new_results:
                 if len(r.generations) == 1:
-                    r.generations[0].message.repsonse_metadata = {
+                    r.generations[0].message.response_metadata = {
                         **(r.llm_output if r.llm_output else {}),
                         **r.generations[0].message.response_metadata,
+                        "batch_api": True,
                     }
                     
             llm_cache = self.cache if isinstance(self.cache, BaseCache) else get_llm_cache()
@@ -0,0 +1,23 @@
+from .fenced_blocks import (
+    FencedBlock,
+    find_fenced_blocks,
+    first_fenced_block
+)
+from .parsing_failure import ParsingFailure
+from .parse_result import ParseResult
+from .bulk_parsing_mixin import BulkParsingMixin
+from .json_parsing import (
+    loads_many,
+    IncrementalJSONObjectParser,
+    StreamingJSONObjectMixin
+)
+from .output_grammar import (
+    OutputGrammar,
+    ChoiceGrammar,
+    RegexGrammar,
+    JSONSchemaGrammar
+)
+from .label_logprob_parser import (
+    LabelDistributionResponse,
+    LabelLogprobOutputParser
+)
@@ -0,0 +1,138 @@
+""" A mixin that allows output parsers to parse a whole batch of responses at once. """
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, Generation
+from langchain_core.output_parsers import BaseOutputParser
+from langchain_core.runnables.config import (
+    RunnableConfig,
+    run_in_executor
+)
+from typing import (
+    Any,
+    List,
+    Optional,
+    Text,
+    Union
+)
+from .parsing_failure import ParsingFailure
+from .parse_result import ParseResult
+
+
+def _parse_chunk(parser: "BulkParsingMixin", inputs: List[Union[Text, BaseMessage]]) -> List[Any]:
+    """ Module level so that it can be shipped to worker processes. """
+    return parser._parse_inputs(inputs)
+
+
+class BulkParsingMixin:
+    """ Adds `parse_many` to a `BaseOutputParser` subclass, and routes
+    `batch` / `abatch` through it, so that `Step.chain_llm(...).batch(...)`
+    parses the whole batch in one call instead of once per element.
+
+    Failures never abort the batch: `parse_many` and `try_parse` return a
+    `ParseResult` for every item, in its original position.
+    """
+
+    # below this many texts a process pool costs more than it saves
+    __PROCESS_POOL_THRESHOLD__ = 1024
+
+    def try_parse(self, text: Union[Text, BaseMessage]) -> ParseResult:
+        """ Parse a single response without raising. """
+        return ParseResult.from_output(self._parse_inputs([text])[0])
+
+    def parse_many(
+        self,
+        texts: List[Union[Text, BaseMessage]],
+        max_workers: Optional[int] = None
+    ) -> List[ParseResult]:
+        """ Parse all `texts` (strings or messages), optionally sharding
+        large batches across `max_workers` processes.
+        """
+
+        if not texts:
+            return []
+
+        if max_workers is None or max_workers <= 1 or len(texts) < self.__PROCESS_POOL_THRESHOLD__:
+            return [ParseResult.from_output(output) for output in self._parse_inputs(texts)]
+
+        chunk_size = -(-len(texts) // (max_workers * 4))
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            return [
+                ParseResult.from_output(output)
+                for chunk in executor.map(_parse_chunk, repeat(self), chunks)
+                for output in chunk
+            ]
+
+    def _parse_many(self, texts: List[Text]) -> List[Union[Any, ParsingFailure]]:
+        """ Subclasses can override this to share work across the batch. """
+        return [self._parse_or_fail(text) for text in texts]
+
+    def _parse_or_fail(self, text: Text) -> Union[Any, ParsingFailure]:
+        try:
+            return self.parse(text)
+        except ParsingFailure as e:
+            return e
+        except Exception as e:
+            return ParsingFailure(f"{type(e).__name__}: {e}", text_to_parse=text)
+
+    def _parse_inputs(self, inputs: List[Union[Text, BaseMessage]]) -> List[Union[Any, ParsingFailure]]:
+        """ Parse the raw inputs a `batch` call receives (strings or messages). """
+
+        if type(self).parse_result is BaseOutputParser.parse_result:
+            # `parse_result` only looks at the text, so the bulk path is equivalent
+            return self._parse_many([
+                input_ if isinstance(input_, str) else ChatGeneration(message=input_).text
+                for input_ in inputs
+            ])
+
+        # the parser reads more than the text (e.g. message kwargs), keep its own logic
+        results = []
+        for input_ in inputs:
+            generation = ChatGeneration(message=input_) if isinstance(input_, BaseMessage) else Generation(text=input_)
+            try:
+                results.append(self.parse_result([generation]))
+            except ParsingFailure as e:
+                results.append(e)
+            except Exception as e:
+                results.append(ParsingFailure(f"{type(e).__name__}: {e}", text_to_parse=generation.text))
+
+        return results
+
+    def batch(
+        self,
+        inputs: List[Union[Text, BaseMessage]],
+        config: Optional[Union[RunnableConfig, List[RunnableConfig]]] = None,
+        *,
+        return_exceptions: bool = False,
+        **kwargs: Optional[Any],
+    ) -> List[Any]:
+        return self._batch_with_config(
+            self._parse_inputs,
+            inputs,
+            config,
+            return_exceptions=return_exceptions,
+            run_type="parser",
+        )
+
+    async def abatch(
+        self,
+        inputs: List[Union[Text, BaseMessage]],
+        config: Optional[Union[RunnableConfig, List[RunnableConfig]]] = None,
+        *,
+        return_exceptions: bool = False,
+        **kwargs: Optional[Any],
+    ) -> List[Any]:
+
+        async def _aparse_inputs(inputs_):
+            return await run_in_executor(None, self._parse_inputs, inputs_)
+
+        return await self._abatch_with_config(
+            _aparse_inputs,
+            inputs,
+            config,
+            return_exceptions=return_exceptions,
+            run_type="parser",
+        )
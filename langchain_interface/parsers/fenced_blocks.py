@@ -0,0 +1,70 @@
+""" Shared extraction of ``` fenced ``` blocks from LLM responses.
+
+All fences are located in a single pass with a precompiled pattern,
+and the result is cached for the most recent response texts, so that
+parsers which look at the same completion several times (or several
+parsers looking at the same completion) only pay for the scan once.
+"""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional, Text, Tuple
+
+
+FENCE_PATTERN = re.compile(r"```(.*?)```", re.DOTALL)
+# an info string is only recognized when it sits alone on the first line, e.g. ```python\n
+_INFO_STRING_PATTERN = re.compile(r"([A-Za-z_][\w+\-]*)[ \t]*\n")
+
+
+class FencedBlock(NamedTuple):
+    """ A single ``` fenced ``` block.
+
+    content: everything between the fences, untouched.
+    language: the info string of the fence (e.g. "python"), empty if there is none.
+    body: content with the info string line removed.
+    start / end: span of the whole block (fences included) in the original text.
+    """
+    content: Text
+    language: Text
+    body: Text
+    start: int
+    end: int
+
+
+# the cache holds on to whole completions, and parsers reuse a scan right away,
+# so only the last few are kept
+@lru_cache(maxsize=128)
+def find_fenced_blocks(text: Text) -> Tuple[FencedBlock, ...]:
+    """ Return all fenced blocks in `text`, in order of appearance. """
+
+    blocks = []
+
+    for match in FENCE_PATTERN.finditer(text):
+        content = match.group(1)
+        info_match = _INFO_STRING_PATTERN.match(content)
+        if info_match is not None:
+            language, body = info_match.group(1), content[info_match.end():]
+        else:
+            language, body = "", content
+
+        blocks.append(
+            FencedBlock(
+                content=content,
+                language=language,
+                body=body,
+                start=match.start(),
+                end=match.end()
+            )
+        )
+
+    return tuple(blocks)
+
+
+def first_fenced_block(text: Text, language: Optional[Text] = None) -> Optional[FencedBlock]:
+    """ Return the first fenced block (optionally with a given info string), or None. """
+
+    for block in find_fenced_blocks(text):
+        if language is None or block.language == language:
+            return block
+
+    return None
@@ -0,0 +1,141 @@
+""" JSON helpers shared by the JSON-emitting steps. """
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Text,
+    Tuple,
+    Union
+)
+from langchain_core.messages import BaseMessage
+from .parsing_failure import ParsingFailure
+
+
+def loads_many(texts: List[Text]) -> Optional[List[Any]]:
+    """ Decode a batch of JSON objects with a single decoder call.
+
+    The texts are spliced into one JSON array, which avoids paying the
+    per-call decoder overhead for every element. Returns None when the
+    batch cannot be decoded as a whole (one malformed element, or an
+    element that is not a single JSON object), in which case callers
+    should fall back to decoding the texts one by one.
+    """
+
+    if not texts:
+        return []
+
+    try:
+        decoded = json.loads("[" + ",".join(text.strip() for text in texts) + "]")
+    except ValueError:
+        return None
+
+    if len(decoded) != len(texts) or not all(isinstance(item, dict) for item in decoded):
+        return None
+
+    return decoded
+
+
+class IncrementalJSONObjectParser:
+    """ Parse a single top-level JSON object as it is being generated.
+
+    `feed` takes the next chunk of text and returns the top-level members
+    (key, value) that were completed by it, so consumers can act on each
+    member as soon as it closes instead of waiting for the whole object.
+    Anything before the opening brace (e.g. a ```json fence) is skipped.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._member_start: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: Text) -> List[Tuple[Text, Any]]:
+        self._text += chunk
+        members = []
+
+        while self._pos < len(self._text) and not self.done:
+            char = self._text[self._pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+
+            elif self._depth == 0:
+                if char == "{":
+                    self._depth = 1
+                    self._member_start = self._pos + 1
+
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    members.extend(self._close_member())
+                    self.done = True
+            elif char == "," and self._depth == 1:
+                members.extend(self._close_member())
+                self._member_start = self._pos + 1
+
+            self._pos += 1
+
+        return members
+
+    @property
+    def text(self) -> Text:
+        return self._text
+
+    def _close_member(self) -> List[Tuple[Text, Any]]:
+        member = self._text[self._member_start:self._pos]
+        if not member.strip():
+            return []
+
+        try:
+            return list(json.loads("{" + member + "}").items())
+        except ValueError as e:
+            raise ParsingFailure(f"Malformed JSON member: {e}", text_to_parse=self._text)
+
+
+def _chunk_text(chunk: Union[Text, BaseMessage]) -> Text:
+    return chunk if isinstance(chunk, str) else chunk.content
+
+
+class StreamingJSONObjectMixin:
+    """ Lets a parser of single JSON objects consume a token stream and
+    yield each top-level (key, value) member as soon as it is complete.
+    """
+
+    def iter_members(self, chunks: Iterable[Union[Text, BaseMessage]]) -> Iterator[Tuple[Text, Any]]:
+        parser = IncrementalJSONObjectParser()
+        for chunk in chunks:
+            yield from parser.feed(_chunk_text(chunk))
+
+        if not parser.done:
+            raise ParsingFailure("The JSON object was not closed.", text_to_parse=parser.text)
+
+    async def aiter_members(self, chunks: AsyncIterable[Union[Text, BaseMessage]]) -> AsyncIterator[Tuple[Text, Any]]:
+        parser = IncrementalJSONObjectParser()
+        async for chunk in chunks:
+            for member in parser.feed(_chunk_text(chunk)):
+                yield member
+
+        if not parser.done:
+            raise ParsingFailure("The JSON object was not closed.", text_to_parse=parser.text)
@@ -0,0 +1,87 @@
+""" Score a fixed set of labels from the logprobs of a single answer token,
+instead of parsing a generated answer.
+"""
+
+import math
+from dataclasses import dataclass
+from overrides import overrides
+from typing import Dict, List, Optional, Text, Tuple
+from langchain_core.output_parsers import BaseOutputParser
+from langchain_core.outputs import ChatGeneration, Generation
+from ..instances.instance import LLMResponse
+from .bulk_parsing_mixin import BulkParsingMixin
+from .parsing_failure import ParsingFailure
+
+
+@dataclass(frozen=True, eq=True)
+class LabelDistributionResponse(LLMResponse):
+    """ A normalized distribution over the candidate labels. """
+    distribution: Dict[Text, float]
+
+    @property
+    def label(self) -> Text:
+        return max(self.distribution, key=self.distribution.get)
+
+
+class LabelLogprobOutputParser(BulkParsingMixin, BaseOutputParser[LabelDistributionResponse]):
+    """ Read `top_logprobs` of the first generated token and turn them into a
+    distribution over `labels`.
+
+    A token counts towards a label when one is a prefix of the other after
+    stripping and lower-casing (so " True", "true" and "Ent" all count), which
+    is why the labels must differ in their first token. Probability mass of
+    tokens matching no label is dropped and the rest is renormalized after
+    temperature scaling (`temperature` > 1 flattens, < 1 sharpens).
+    """
+
+    labels: Tuple[Text, ...]
+    temperature: float = 1.0
+
+    @overrides
+    def parse_result(self, result: List[Generation], *, partial: bool = False) -> LabelDistributionResponse:
+
+        generation = result[0]
+        if not isinstance(generation, ChatGeneration):
+            raise ParsingFailure("Label scoring needs a chat generation.", text_to_parse=generation.text)
+
+        logprobs = generation.message.response_metadata.get("logprobs") or {}
+        content = logprobs.get("content") or []
+        if not content:
+            raise ParsingFailure("No logprobs in the response, is the model bound with `logprobs=True`?", text_to_parse=generation.text)
+
+        mass = [0.] * len(self.labels)
+        for candidate in content[0].get("top_logprobs") or [content[0]]:
+            index = self._match_label(candidate["token"])
+            if index is not None:
+                mass[index] += math.exp(candidate["logprob"])
+
+        if not any(mass):
+            raise ParsingFailure(f"None of the top tokens matches a label in {self.labels}.", text_to_parse=generation.text)
+
+        scaled = [m ** (1. / self.temperature) for m in mass]
+        total = sum(scaled)
+
+        return LabelDistributionResponse(
+            messages=generation.text,
+            distribution={label: s / total for label, s in zip(self.labels, scaled)}
+        )
+
+    @overrides
+    def parse(self, text: Text) -> LabelDistributionResponse:
+        raise ParsingFailure("Label scoring reads token logprobs, not the response text.", text_to_parse=text)
+
+    def _match_label(self, token: Text) -> Optional[int]:
+        token = token.strip().lower()
+        if not token:
+            return None
+
+        matches = [
+            index for index, label in enumerate(self.labels)
+            if label.lower().startswith(token) or token.startswith(label.lower())
+        ]
+
+        return matches[0] if len(matches) == 1 else None
+
+    @property
+    def _type(self) -> str:
+        return "label-logprob"
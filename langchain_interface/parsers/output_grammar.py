@@ -0,0 +1,142 @@
+""" Declarative output grammars for constrained (guided) decoding.
+
+A step with a rigid output format can declare its grammar, and
+`Step.chain_llm(llm, guided_decoding=...)` will then ask the server to
+only generate strings in that grammar:
+
+- "vllm": sent as vLLM guided-decoding parameters (`guided_choice`,
+  `guided_regex`, `guided_json`) through `extra_body`.
+- "openai": sent as a structured-outputs `response_format`. Choice and
+  regex grammars are wrapped in a single-field JSON object, which is
+  unwrapped again before the step's output parser sees the response.
+"""
+
+import abc
+try:
+    import ujson as json
+except ImportError:
+    import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Literal, Text, Tuple
+from langchain_core.language_models.base import BaseLanguageModel
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable, RunnableLambda
+
+
+GuidedDecodingBackend = Literal["vllm", "openai"]
+
+
+class OutputGrammar(abc.ABC):
+    """ """
+
+    __ANSWER_FIELD__ = "answer"
+
+    @abc.abstractmethod
+    def to_guided_decoding_params(self) -> Dict[Text, Any]:
+        """ vLLM guided-decoding parameters. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def to_json_schema(self) -> Dict[Text, Any]:
+        """ JSON schema for OpenAI structured outputs. """
+        raise NotImplementedError
+
+    def normalize(self, text: Text) -> Text:
+        """ Map a structured-outputs response back to the raw format the parser expects. """
+        if not self.wrapped:
+            return text
+        try:
+            return json.loads(text)[self.__ANSWER_FIELD__]
+        except (ValueError, KeyError, TypeError):
+            return text
+
+    @property
+    def strict(self) -> bool:
+        return True
+
+    @property
+    def wrapped(self) -> bool:
+        """ Whether structured outputs wrap the answer in an "answer" field. """
+        return True
+
+    def bind(self, llm: BaseLanguageModel, backend: GuidedDecodingBackend) -> Runnable:
+        """ Bind the grammar to `llm` for the given serving backend. """
+
+        if backend == "vllm":
+            return llm.bind(extra_body=self.to_guided_decoding_params())
+
+        if backend == "openai":
+            bound = llm.bind(
+                response_format={
+                    "type": "json_schema",
+                    "json_schema": {
+                        "name": "step_output",
+                        "strict": self.strict,
+                        "schema": self.to_json_schema(),
+                    }
+                }
+            )
+            # unwrapped outputs skip the normalizer so that they can still be streamed
+            return bound | RunnableLambda(self._normalize_message) if self.wrapped else bound
+
+        raise ValueError(f"Unknown guided decoding backend: {backend}")
+
+    def _normalize_message(self, message: BaseMessage) -> BaseMessage:
+        return message.model_copy(update={"content": self.normalize(message.content)})
+
+    def _wrap(self, answer_schema: Dict[Text, Any]) -> Dict[Text, Any]:
+        return {
+            "type": "object",
+            "properties": {self.__ANSWER_FIELD__: answer_schema},
+            "required": [self.__ANSWER_FIELD__],
+            "additionalProperties": False,
+        }
+
+
+@dataclass(frozen=True, eq=True)
+class ChoiceGrammar(OutputGrammar):
+    """ The output must be exactly one of `choices`. """
+    choices: Tuple[Text, ...]
+
+    def to_guided_decoding_params(self) -> Dict[Text, Any]:
+        return {"guided_choice": list(self.choices)}
+
+    def to_json_schema(self) -> Dict[Text, Any]:
+        return self._wrap({"type": "string", "enum": list(self.choices)})
+
+
+@dataclass(frozen=True, eq=True)
+class RegexGrammar(OutputGrammar):
+    """ The output must fully match `pattern`. """
+    pattern: Text
+
+    def to_guided_decoding_params(self) -> Dict[Text, Any]:
+        return {"guided_regex": self.pattern}
+
+    def to_json_schema(self) -> Dict[Text, Any]:
+        return self._wrap({"type": "string", "pattern": f"^{self.pattern}$"})
+
+
+@dataclass(frozen=True, eq=True)
+class JSONSchemaGrammar(OutputGrammar):
+    """ The output must be a JSON document valid under `schema`.
+
+    Set `strict_schema=False` for schemas OpenAI strict mode cannot express
+    (e.g. objects with free-form keys).
+    """
+    schema: Dict[Text, Any] = field(hash=False)
+    strict_schema: bool = True
+
+    def to_guided_decoding_params(self) -> Dict[Text, Any]:
+        return {"guided_json": self.schema}
+
+    def to_json_schema(self) -> Dict[Text, Any]:
+        return self.schema
+
+    @property
+    def strict(self) -> bool:
+        return self.strict_schema
+
+    @property
+    def wrapped(self) -> bool:
+        return False
@@ -0,0 +1,34 @@
+""" A uniform, non-raising result type for output parsing. """
+
+from dataclasses import dataclass
+from typing import Any, Optional, Text
+from ..instances.instance import Instance
+from .parsing_failure import ParsingFailure
+
+
+@dataclass(frozen=True, eq=True)
+class ParseResult(Instance):
+    """ Either a parsed response (ok=True, value set) or a failure
+    (ok=False, reason set). `text` keeps the raw completion in both cases
+    and `attempts` counts how many times the model had to be asked.
+    """
+    ok: bool
+    value: Optional[Any] = None
+    reason: Optional[Text] = None
+    text: Optional[Text] = None
+    attempts: int = 1
+
+    @classmethod
+    def success(cls, value: Any, text: Optional[Text] = None, attempts: int = 1) -> "ParseResult":
+        return cls(ok=True, value=value, text=text, attempts=attempts)
+
+    @classmethod
+    def failure(cls, failure: ParsingFailure, attempts: int = 1) -> "ParseResult":
+        return cls(ok=False, reason=failure.reason, text=failure.text_to_parse, attempts=attempts)
+
+    @classmethod
+    def from_output(cls, output: Any, attempts: int = 1) -> "ParseResult":
+        """ Wrap either a parsed response or a `ParsingFailure`. """
+        if isinstance(output, ParsingFailure):
+            return cls.failure(output, attempts=attempts)
+        return cls.success(output, text=getattr(output, "messages", None), attempts=attempts)
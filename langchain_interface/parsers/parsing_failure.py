@@ -0,0 +1,24 @@
+""" Structured parsing failure shared by all output parsers. """
+
+from typing import Text
+from langchain_core.exceptions import OutputParserException
+
+
+class ParsingFailure(OutputParserException):
+    """ Raised (or returned, in bulk parsing) when a response cannot be parsed.
+
+    reason: a short, human readable explanation of what went wrong.
+    text_to_parse: the raw completion that failed to parse.
+    """
+    def __init__(
+        self,
+        message: Text,
+        text_to_parse: Text
+    ):
+        super().__init__(message, llm_output=text_to_parse)
+        self.reason = message
+        self.text_to_parse = text_to_parse
+
+    def __reduce__(self):
+        # keep failures picklable so that they can cross process boundaries
+        return (self.__class__, (self.reason, self.text_to_parse))
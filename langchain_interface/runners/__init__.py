@@ -0,0 +1,3 @@
+from .sharded_runner import run_sharded
+from .work_queue_runner import WorkQueueRunner
+from .work_queues import WorkQueue, SQLiteWorkQueue
@@ -0,0 +1,152 @@
+""" Run an interface over a dataset in several worker processes.
+
+Prompt rendering, parsing, state merging and marginalization all run in the
+Python process that drives the graph, so a single process is GIL-bound long
+before a local model server saturates. `run_sharded` splits the dataset
+round-robin across processes, each of which builds its own interface and model
+and streams its shard with `Interface.run_dataset` into a shard file. The shard
+files are then merged back into input order.
+"""
+
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import time
+try:
+    import ujson as json
+except ImportError:
+    import json
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Text, Tuple, Union
+from langchain_core.language_models.base import BaseLanguageModel
+from langchain_core.runnables.config import RunnableConfig
+from tqdm import tqdm
+from ..interfaces.interface import Interface, DatasetRunReport
+
+
+def _read_shard(path: Union[Text, os.PathLike], shard: int, num_shards: int) -> Iterable[Dict[Text, Any]]:
+    """ Every `num_shards`-th input of a JSON lines file starting from `shard`.
+    Only the lines of the shard are parsed.
+    """
+    with open(path, "r", encoding="utf-8") as file_:
+        for line in itertools.islice((line for line in file_ if line.strip()), shard, None, num_shards):
+            yield json.loads(line)
+
+
+def _run_shard(
+    factory: Callable[[], Tuple[Interface, BaseLanguageModel]],
+    inputs: Union[List[Dict[Text, Any]], Text, os.PathLike],
+    shard: int,
+    num_shards: int,
+    shard_path: Text,
+    run_kwargs: Dict[Text, Any]
+) -> DatasetRunReport:
+    """ `inputs` is either the shard itself or the path of the whole dataset. """
+    interface, llm = factory()
+    if isinstance(inputs, (str, os.PathLike)):
+        inputs = _read_shard(inputs, shard, num_shards)
+    return interface.run_dataset(
+        llm,
+        inputs,
+        output_path=shard_path,
+        progress=False,
+        **run_kwargs
+    )
+
+
+def _merge_shards(shard_paths: List[Text], output_path: Text):
+    """ Interleave the shard files back into input order, rewriting each record's
+    shard-local index to its index in the dataset.
+    """
+    num_shards = len(shard_paths)
+    files = [open(path, "r", encoding="utf-8") for path in shard_paths]
+    try:
+        with open(output_path, "w", encoding="utf-8") as output_file:
+            for lines in itertools.zip_longest(*files):
+                for shard, line in enumerate(lines):
+                    if line is None or not line.strip():
+                        continue
+                    record = json.loads(line)
+                    record['index'] = record['index'] * num_shards + shard
+                    output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        for file_ in files:
+            file_.close()
+
+
+def run_sharded(
+    factory: Callable[[], Tuple[Interface, BaseLanguageModel]],
+    inputs: Union[Sequence[Dict[Text, Any]], Text, os.PathLike],
+    output_path: Text,
+    num_workers: Optional[int] = None,
+    output_fn: Optional[Callable[[Dict[Text, Any]], Any]] = None,
+    max_concurrency: int = 16,
+    max_pending: Optional[int] = None,
+    config: Optional[RunnableConfig] = None,
+    resume: bool = False,
+    keep_shards: bool = False,
+    start_method: Text = "spawn",
+    progress: bool = True
+) -> DatasetRunReport:
+    """ Run a dataset through `num_workers` processes (one per CPU by default) and
+    write the merged outputs to `output_path`, as `Interface.run_dataset` would.
+
+    factory: builds the (interface, llm) pair in each worker. It has to be picklable,
+        e.g. a module-level function or a `functools.partial` of one. To share a
+        cache, have it give each interface a `SQLiteMemoStore` on the same database
+        file; two workers may still both compute a verdict that neither had stored.
+    inputs: a path to a JSON lines file, which every worker reads its own shard of,
+        or a sequence of inputs, which is sliced here so that each worker is sent
+        only its own shard.
+    max_concurrency, max_pending: the window of each worker.
+    resume: continue the shard files an interrupted run left behind.
+    keep_shards: keep the `{output_path}.shard-{idx}` files after merging.
+    """
+
+    num_workers = num_workers or os.cpu_count() or 1
+    shard_paths = [f"{output_path}.shard-{shard}" for shard in range(num_workers)]
+    run_kwargs = {
+        "output_fn": output_fn,
+        "max_concurrency": max_concurrency,
+        "max_pending": max_pending,
+        "config": config,
+        "resume": resume,
+    }
+
+    start_time = time.perf_counter()
+    reports: List[DatasetRunReport] = []
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=multiprocessing.get_context(start_method)
+    ) as executor:
+        futures = [
+            executor.submit(
+                _run_shard,
+                factory,
+                # only the shard is pickled to the worker
+                inputs if isinstance(inputs, (str, os.PathLike)) else list(inputs[shard::num_workers]),
+                shard,
+                num_workers,
+                shard_path,
+                run_kwargs
+            )
+            for shard, shard_path in enumerate(shard_paths)
+        ]
+        for future in tqdm(concurrent.futures.as_completed(futures), total=num_workers, unit="shard", disable=not progress):
+            reports.append(future.result())
+
+    _merge_shards(shard_paths, output_path)
+    if not keep_shards:
+        for shard_path in shard_paths:
+            os.remove(shard_path)
+
+    elapsed = time.perf_counter() - start_time
+    num_inputs = sum(report.num_inputs for report in reports)
+
+    return DatasetRunReport(
+        num_inputs=num_inputs,
+        num_failed=sum(report.num_failed for report in reports),
+        elapsed=elapsed,
+        throughput=num_inputs / elapsed if elapsed > 0 else 0.
+    )
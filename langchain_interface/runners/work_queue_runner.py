@@ -0,0 +1,197 @@
+""" Run step or interface pipelines from a shared queue of work items, so that
+any number of workers (on any number of machines that reach the queue) can
+pull from one job.
+
+Inputs and results are serialized with `InstanceCodec`, so states and step
+responses made of `Instance`s round-trip. Items are keyed by their content:
+submitting work that is already queued or done is a no-op, and the results of
+an interrupted job are kept when it is submitted again. Verdicts that are
+shared between different items are deduplicated by giving the pipeline a
+`memo_store` that all workers share (e.g. a `SQLiteMemoStore`).
+"""
+
+import asyncio
+import hashlib
+import itertools
+import os
+import socket
+import time
+import uuid
+try:
+    import ujson as json
+except ImportError:
+    import json
+from typing import Any, Dict, Iterable, Iterator, Optional, Text, Tuple
+from langchain_core.runnables.base import Runnable
+from langchain_core.runnables.config import RunnableConfig, run_in_executor
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from tqdm import tqdm
+from ..instances.codec import InstanceCodec
+from ..interfaces.interface import DatasetRunReport, _to_jsonable
+from .work_queues import WorkQueue, WorkItem
+
+
+class WorkQueueRunner:
+    """ Submits inputs to a `WorkQueue`, works them off with a runnable, and reads
+    back the results.
+
+    namespace: part of every item key. Use a different one for work that should
+        not be deduplicated against earlier results for the same input, e.g.
+        another model or pipeline.
+    lease_seconds: how long a worker may go without renewing its lease on an item
+        before the item is handed to another worker. Workers renew their leases
+        every third of it while they run.
+    max_attempts: how often an item is claimed before it is failed, whether it
+        raised or its lease ran out (e.g. because it killed its worker).
+    """
+
+    def __init__(
+        self,
+        queue: WorkQueue,
+        namespace: Text = "",
+        codec: Optional[SerializerProtocol] = None,
+        lease_seconds: float = 600.,
+        max_attempts: int = 3
+    ):
+        self._queue = queue
+        self._namespace = namespace
+        self._codec = codec if codec is not None else InstanceCodec()
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+
+    def make_key(self, input: Dict[Text, Any]) -> Text:
+        return hashlib.sha256(json.dumps([self._namespace, input], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def submit(self, inputs: Iterable[Dict[Text, Any]], batch_size: int = 1000) -> int:
+        """ Queue the inputs that are neither queued nor done yet, and return how
+        many were queued.
+        """
+        inputs = iter(inputs)
+        num_queued = 0
+        while batch := list(itertools.islice(inputs, batch_size)):
+            num_queued += self._queue.put([(self.make_key(input), *self._codec.dumps_typed(input)) for input in batch])
+        return num_queued
+
+    async def awork(
+        self,
+        runnable: Runnable,
+        max_concurrency: int = 16,
+        config: Optional[RunnableConfig] = None,
+        worker_id: Optional[Text] = None,
+        wait: bool = True,
+        poll_interval: float = 1.,
+        progress: bool = True
+    ) -> DatasetRunReport:
+        """ Claim and run items until the queue is drained.
+
+        runnable: e.g. `interface.get_runnable(llm)` or `step.chain_llm(llm)`.
+        max_concurrency: the most items this worker leases at once.
+        wait: keep polling while other workers hold leases, to pick up their items
+            if they die, rather than returning once nothing is claimable.
+
+        The report counts the items this worker finished, i.e. acked or failed for
+        good. Items given back for a retry are not counted. Queue calls run in the
+        default executor, so a slow queue does not hold up the event loop (e.g. the
+        heartbeat that renews the leases).
+        """
+
+        worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        in_flight: Dict[Text, asyncio.Task] = {}
+        num_processed, num_failed = 0, 0
+
+        async def _process(item: WorkItem) -> Optional[bool]:
+            """ Whether the item finished, or None if it was given back for a retry. """
+            input = self._codec.loads_typed((item.type_, item.payload))
+            try:
+                output = await runnable.ainvoke(input, config=config)
+            except Exception as e:
+                failed = await run_in_executor(None, self._queue.nack, worker_id, item.key, repr(e), self._max_attempts)
+                return False if failed else None
+            await run_in_executor(None, self._queue.ack, worker_id, item.key, *self._codec.dumps_typed(output))
+            return True
+
+        async def _heartbeat():
+            while True:
+                await asyncio.sleep(self._lease_seconds / 3)
+                if in_flight:
+                    await run_in_executor(None, self._queue.renew, worker_id, list(in_flight), self._lease_seconds)
+
+        heartbeat = asyncio.ensure_future(_heartbeat())
+        progress_bar = tqdm(unit="item", disable=not progress)
+        start_time = time.perf_counter()
+
+        try:
+            while True:
+                if len(in_flight) < max_concurrency:
+                    claimed = await run_in_executor(
+                        None,
+                        self._queue.claim,
+                        worker_id,
+                        max_concurrency - len(in_flight),
+                        self._lease_seconds,
+                        self._max_attempts
+                    )
+                    for item in claimed:
+                        in_flight[item.key] = asyncio.ensure_future(_process(item))
+
+                if not in_flight:
+                    if not wait or await run_in_executor(None, self._queue.num_unfinished) == 0:
+                        break
+                    await asyncio.sleep(poll_interval)
+                    continue
+
+                done, _ = await asyncio.wait(in_flight.values(), timeout=poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                for key in [key for key, task in in_flight.items() if task in done]:
+                    finished = in_flight.pop(key).result()
+                    if finished is None:
+                        continue
+                    num_failed += not finished
+                    num_processed += 1
+                    progress_bar.update(1)
+                progress_bar.set_postfix(failed=num_failed, in_flight=len(in_flight))
+        finally:
+            heartbeat.cancel()
+            for task in in_flight.values():
+                task.cancel()
+            progress_bar.close()
+
+        elapsed = time.perf_counter() - start_time
+
+        return DatasetRunReport(
+            num_inputs=num_processed,
+            num_failed=num_failed,
+            elapsed=elapsed,
+            throughput=num_processed / elapsed if elapsed > 0 else 0.
+        )
+
+    def work(self, *args, **kwargs) -> DatasetRunReport:
+        """ `awork` on a new event loop. """
+        return asyncio.run(self.awork(*args, **kwargs))
+
+    def results(self) -> Iterator[Tuple[Text, Optional[Any], Optional[Text]]]:
+        """ (key, output, error) of the finished items in submission order. """
+        for result in self._queue.results():
+            yield (
+                result.key,
+                self._codec.loads_typed((result.type_, result.payload)) if result.payload is not None else None,
+                result.error
+            )
+
+    def lookup(self, input: Dict[Text, Any]) -> Optional[Tuple[Optional[Any], Optional[Text]]]:
+        """ (output, error) of an input, if it is finished. """
+        result = self._queue.lookup(self.make_key(input))
+        if result is None:
+            return None
+        return (
+            self._codec.loads_typed((result.type_, result.payload)) if result.payload is not None else None,
+            result.error
+        )
+
+    def export(self, output_path: Text):
+        """ Write the results as JSON lines of `{"key": ..., "output": ...}` (or
+        `{"key": ..., "error": ...}`), in submission order.
+        """
+        with open(output_path, "w", encoding="utf-8") as file_:
+            for key, output, error in self.results():
+                record = {"key": key, "output": output} if error is None else {"key": key, "error": error}
+                file_.write(json.dumps(record, ensure_ascii=False, default=_to_jsonable) + "\n")
@@ -0,0 +1,2 @@
+from .work_queue import WorkQueue, WorkItem, WorkResult
+from .sqlite_work_queue import SQLiteWorkQueue
@@ -0,0 +1,159 @@
+""" """
+
+import sqlite3
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional, Text, Tuple
+from overrides import overrides
+from ...memo_stores.sqlite_memo_store import enable_wal
+from .work_queue import WorkQueue, WorkItem, WorkResult
+
+
+@WorkQueue.register("sqlite")
+class SQLiteWorkQueue(WorkQueue):
+    """ A queue and output store in one SQLite file, a local stand-in for a broker.
+
+    Every claim runs in its own write transaction, so processes sharing the file
+    never lease the same item at once.
+    """
+
+    def __init__(self, database_path: Text, timeout: float = 30.):
+        super().__init__()
+        self._lock = threading.Lock()
+        # transactions are managed explicitly, see `claim`
+        self._connection = sqlite3.connect(database_path, check_same_thread=False, timeout=timeout, isolation_level=None)
+        enable_wal(self._connection, timeout)
+        with self._lock:
+            self._connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS items (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT UNIQUE NOT NULL,
+                    type TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    worker TEXT,
+                    lease_until REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    result_type TEXT,
+                    result BLOB,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS items_status ON items (status, seq);
+                """
+            )
+
+    def close(self):
+        self._connection.close()
+
+    @overrides
+    def put(self, items: Iterable[Tuple[Text, Text, bytes]]) -> int:
+        with self._lock:
+            before = self._connection.total_changes
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.executemany("INSERT OR IGNORE INTO items (key, type, payload) VALUES (?, ?, ?)", items)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+            return self._connection.total_changes - before
+
+    @overrides
+    def claim(self, worker_id: Text, num_items: int, lease_seconds: float, max_attempts: Optional[int] = None) -> List[WorkItem]:
+        now = time.time()
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                if max_attempts is not None:
+                    self._connection.execute(
+                        "UPDATE items SET status = 'failed', "
+                        "error = 'Lease expired after ' || attempts || ' attempts, the worker died or hung.' "
+                        "WHERE status = 'leased' AND lease_until < ? AND attempts >= ?",
+                        (now, max_attempts)
+                    )
+                rows = self._connection.execute(
+                    "SELECT seq, key, type, payload, attempts FROM items "
+                    "WHERE status = 'queued' OR (status = 'leased' AND lease_until < ?) ORDER BY seq LIMIT ?",
+                    (now, num_items)
+                ).fetchall()
+                self._connection.executemany(
+                    "UPDATE items SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE seq = ?",
+                    [(worker_id, now + lease_seconds, row[0]) for row in rows]
+                )
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+        return [
+            WorkItem(key=key, seq=seq, type_=type_, payload=payload, attempts=attempts + 1)
+            for seq, key, type_, payload, attempts in rows
+        ]
+
+    @overrides
+    def renew(self, worker_id: Text, keys: List[Text], lease_seconds: float):
+        with self._lock:
+            self._connection.executemany(
+                "UPDATE items SET lease_until = ? WHERE key = ? AND worker = ? AND status = 'leased'",
+                [(time.time() + lease_seconds, key, worker_id) for key in keys]
+            )
+
+    @overrides
+    def ack(self, worker_id: Text, key: Text, type_: Text, payload: bytes):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE items SET status = 'done', worker = ?, result_type = ?, result = ?, error = NULL "
+                "WHERE key = ? AND status != 'done'",
+                (worker_id, type_, payload, key)
+            )
+
+    @overrides
+    def nack(self, worker_id: Text, key: Text, error: Text, max_attempts: int) -> bool:
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                # nothing changes if the lease went to another worker in the meantime
+                changed = self._connection.execute(
+                    "UPDATE items SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, error = ? "
+                    "WHERE key = ? AND worker = ? AND status = 'leased'",
+                    (max_attempts, error, key, worker_id)
+                ).rowcount
+                failed = changed > 0 and self._connection.execute(
+                    "SELECT status FROM items WHERE key = ?", (key,)
+                ).fetchone()[0] == "failed"
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+            return failed
+
+    @overrides
+    def lookup(self, key: Text) -> Optional[WorkResult]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT seq, result_type, result, error FROM items WHERE key = ? AND status IN ('done', 'failed')",
+                (key,)
+            ).fetchone()
+        return WorkResult(key, *row) if row is not None else None
+
+    @overrides
+    def num_unfinished(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM items WHERE status IN ('queued', 'leased')").fetchone()[0]
+
+    @overrides
+    def results(self) -> Iterator[WorkResult]:
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self._connection.execute(
+                    "SELECT key, seq, result_type, result, error FROM items "
+                    "WHERE status IN ('done', 'failed') AND seq > ? ORDER BY seq LIMIT 1000",
+                    (last_seq,)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield WorkResult(*row)
+            last_seq = rows[-1][1]
@@ -0,0 +1,89 @@
+""" A queue of serialized work items that workers lease, and the store their
+results are acked into.
+"""
+
+import abc
+from dataclasses import dataclass
+from registrable import Registrable
+from typing import Iterable, Iterator, List, Optional, Text, Tuple
+
+
+@dataclass(frozen=True, eq=True)
+class WorkItem:
+    key: Text
+    # position in submission order
+    seq: int
+    type_: Text
+    payload: bytes
+    attempts: int
+
+
+@dataclass(frozen=True, eq=True)
+class WorkResult:
+    key: Text
+    seq: int
+    # None when the item failed
+    type_: Optional[Text]
+    payload: Optional[bytes]
+    error: Optional[Text]
+
+
+class WorkQueue(Registrable, abc.ABC):
+    """ Items are identified by a content key, so submitting the same work twice
+    queues it once. A claimed item is leased to a worker until it is acked,
+    nacked, or the lease runs out (e.g. because the worker died), after which
+    any worker can claim it again.
+
+    Implementations are called from worker threads (`WorkQueueRunner.awork` runs
+    them in an executor), so they have to be thread-safe.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+    @abc.abstractmethod
+    def put(self, items: Iterable[Tuple[Text, Text, bytes]]) -> int:
+        """ Queue (key, type, payload) items whose key is not known yet, and
+        return how many were queued.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def claim(self, worker_id: Text, num_items: int, lease_seconds: float, max_attempts: Optional[int] = None) -> List[WorkItem]:
+        """ Lease up to `num_items` queued or expired items to `worker_id`. Expired
+        items that were claimed `max_attempts` times already are failed instead, so
+        that an item that kills its workers is not leased forever.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def renew(self, worker_id: Text, keys: List[Text], lease_seconds: float):
+        """ Extend the leases `worker_id` still holds on `keys`. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def ack(self, worker_id: Text, key: Text, type_: Text, payload: bytes):
+        """ Store the result of an item. The first ack of an item wins. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def nack(self, worker_id: Text, key: Text, error: Text, max_attempts: int) -> bool:
+        """ Give an item back, or fail it once it was tried `max_attempts` times.
+        Return whether it failed for good.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def lookup(self, key: Text) -> Optional[WorkResult]:
+        """ The result of an item, if it is done or failed. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def num_unfinished(self) -> int:
+        """ Items that are queued or leased. """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def results(self) -> Iterator[WorkResult]:
+        """ Results of done and failed items in submission order. """
+        raise NotImplementedError
@@ -1,5 +1,6 @@
-from typing import Annotated, List, Union, TypeVar
+from typing import Annotated, Callable, List, Optional, Sequence, Union, TypeVar
 from typing_extensions import TypedDict
+from langgraph.channels.binop import BinaryOperatorAggregate
 # from langgraph.graph.message import add_messages
 from ..instances.instance import Instance
 
@@ -7,14 +8,17 @@ from ..instances.instance import Instance
 _T = TypeVar('_T')
 
 
+# The reducers never update the value they merge into: LangGraph shares a
+# channel's value between the checkpoints it copies (e.g. to route conditional
+# edges on the writes of a step before applying them), so an update merged in
+# place would show up twice.
+
+
 def append(item_list: Union[List[_T], List[List[_T]]], value: Union[_T, List[_T]]) -> List[_T]:
     if not isinstance(value, list):
-        item_list.append(value)
+        return [*item_list, value]
         
-    else:
-        item_list.extend(value)
-            
-    return item_list
+    return [*item_list, *value]
 
 
 def revise(item_list: _T, value: _T) -> _T:
@@ -25,12 +29,85 @@ def keyupdate(item_dict: dict, value: dict) -> dict:
     return {**item_dict, **value}
 
 
+def spanupdate(span_dict: dict, value: dict) -> dict:
+    """ Merge (start, end) spans by key, keeping the earliest start and the latest end. """
+    span_dict = dict(span_dict)
+    _spanupdate_into(span_dict, value)
+    return span_dict
+
+
+def _append_into(merged: list, value) -> None:
+    if not isinstance(value, list):
+        merged.append(value)
+    else:
+        merged.extend(value)
+
+
+def _keyupdate_into(merged: dict, value: dict) -> None:
+    merged.update(value)
+
+
+def _spanupdate_into(merged: dict, value: dict) -> None:
+    for key, (start, end) in value.items():
+        if key in merged:
+            start, end = min(start, merged[key][0]), max(end, merged[key][1])
+        merged[key] = (start, end)
+
+
+class OnePassAggregate(BinaryOperatorAggregate):
+    """ A reducer channel that merges all the writes of a step in one pass. Folding
+    them with the reducer copies the growing value once per write, which is
+    quadratic in the fan-out width; here the value is copied once per step and the
+    writes are merged into that copy (`merge_into`). The value itself is left
+    alone, as the reducers leave it.
+    
+    Annotate a state key with a subclass, e.g. `Annotated[list, AppendAggregate]`.
+    """
+    
+    __slots__ = ()
+    
+    reducer: Callable = None
+    merge_into: Callable = None
+    
+    def __init__(self, typ: type, operator: Optional[Callable] = None):
+        super().__init__(typ, operator or type(self).reducer)
+    
+    def update(self, values: Sequence) -> bool:
+        if not values:
+            return False
+        
+        try:
+            merged = self.value.copy()
+        except AttributeError:
+            merged = self.typ()
+        for value in values:
+            type(self).merge_into(merged, value)
+        self.value = merged
+        
+        return True
+
+
+class AppendAggregate(OnePassAggregate):
+    reducer = staticmethod(append)
+    merge_into = staticmethod(_append_into)
+
+
+class KeyUpdateAggregate(OnePassAggregate):
+    reducer = staticmethod(keyupdate)
+    merge_into = staticmethod(_keyupdate_into)
+
+
+class SpanUpdateAggregate(OnePassAggregate):
+    reducer = staticmethod(spanupdate)
+    merge_into = staticmethod(_spanupdate_into)
+
+
 class BaseState(TypedDict):
-    responses: Annotated[list, append]
+    responses: Annotated[list, AppendAggregate]
 
 
 class WithInputState(BaseState):
-    inputs: Annotated[list, append]
+    inputs: Annotated[list, AppendAggregate]
     
 class WithTagState(BaseState):
-    tags: Annotated[list, append]
\ No newline at end of file
+    tags: Annotated[list, AppendAggregate]
\ No newline at end of file
@@ -1,10 +1,19 @@
-from .step import (
-    Step,
-    FewShotStep
-)
-from .decomposition_step import DecompositionStep
-from .decontextualization_step import DecontextualizationStep
-from .evidential_support_step import EvidentialSupportStep
-from .anchored_clustering_step import AnchoredClusteringStep
-from .quiz_question_step import QuizQuestionStep
-from .distinct_cluster_identification import DistinctClusterIdentificationStep
\ No newline at end of file
+""" Steps are imported when first used: the classes below on first access, and
+any registered step on its first `Step.by_name` (see `manifest.STEP_MODULES`).
+"""
+
+from .._lazy import lazy_attributes
+
+_LAZY_ATTRIBUTES = {
+    "Step": ".step",
+    "FewShotStep": ".step",
+    "DecompositionStep": ".decomposition_step",
+    "DecontextualizationStep": ".decontextualization_step",
+    "EvidentialSupportStep": ".evidential_support_step",
+    "AnchoredClusteringStep": ".anchored_clustering_step",
+    "QuizQuestionStep": ".quiz_question_step",
+    "DistinctClusterIdentificationStep": ".distinct_cluster_identification",
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
+__all__ = list(_LAZY_ATTRIBUTES)
@@ -20,6 +20,10 @@ from .step import (
     FewShotStep
 )
 from ..instances.instance import LLMResponse
+from ..parsers import BulkParsingMixin
+
+
+_SHORT_ANSWER_PATTERN = re.compile(r"```\n(.*)\n```", re.DOTALL)
 
 
 @dataclass(frozen=True, eq=True)
@@ -27,12 +31,12 @@ class AnswerShorteningResponse(LLMResponse):
     short_answer: Text
     
     
-class AnswerShorteningOutputParser(BaseOutputParser[AnswerShorteningResponse]):
+class AnswerShorteningOutputParser(BulkParsingMixin, BaseOutputParser[AnswerShorteningResponse]):
     """ """
 
     @overrides
     def parse(self, text: Text) -> LLMResponse:
-        matched = re.search(r"```\n(.*)\n```", text, re.DOTALL)
+        matched = _SHORT_ANSWER_PATTERN.search(text)
         try:
             return AnswerShorteningResponse(
                 short_answer=matched.group(1).strip(),
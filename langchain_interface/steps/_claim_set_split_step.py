@@ -18,6 +18,7 @@ import re
 from ..example_selectors import ConstantExampleSelector, ExampleSelector
 from .step import Step, FewShotStep
 from ..instances.instance import LLMResponse
+from ..parsers import first_fenced_block, BulkParsingMixin
 
 
 @dataclass(frozen=True, eq=True)
@@ -25,15 +26,15 @@ class ClaimSetSplitResponse(LLMResponse):
     general_response: Text
 
 
-class ClaimSetSplitOutputParser(BaseOutputParser):
+class ClaimSetSplitOutputParser(BulkParsingMixin, BaseOutputParser):
     """ """
     
     @overrides
     def parse(self, text: Text) -> LLMResponse:
         """ """
         clean_text = text.strip()
-        matched = re.search(r"```(.*?)```", clean_text, re.DOTALL)
-        return ClaimSetSplitResponse(general_response=matched.group(1).strip(), messages=text)
+        block = first_fenced_block(clean_text)
+        return ClaimSetSplitResponse(general_response=block.content.strip(), messages=text)
     
     @property
     def _type(self) -> Text:
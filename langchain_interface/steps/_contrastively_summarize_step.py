@@ -17,13 +17,14 @@ from langchain_core.output_parsers import BaseOutputParser
 from ..example_selectors import ConstantExampleSelector, ExampleSelector
 from .step import Step, FewShotStep
 from ..instances.instance import LLMResponse
+from ..parsers import BulkParsingMixin
 
 
 @dataclass(frozen=True, eq=True)
 class ContrastivelySummarizeResponse(LLMResponse):
     contrasting_summary: Text
     
-class ContrastivelySummarizeOutputParser(BaseOutputParser):
+class ContrastivelySummarizeOutputParser(BulkParsingMixin, BaseOutputParser):
     """ """
     
     @overrides
@@ -18,9 +18,10 @@ import re
 from ..example_selectors import ConstantExampleSelector, ExampleSelector
 from .step import Step, FewShotStep
 from ..instances.instance import LLMResponse
+from ..parsers import BulkParsingMixin
 
 
-class ExplainDiffOutputParser(BaseOutputParser[LLMResponse]):
+class ExplainDiffOutputParser(BulkParsingMixin, BaseOutputParser[LLMResponse]):
     @overrides
     def parse(self, text: Text) -> LLMResponse:
         return LLMResponse(messages=text)
@@ -17,6 +17,10 @@ import re
 from ..example_selectors import ConstantExampleSelector, ExampleSelector
 from .step import Step, FewShotStep
 from ..instances.instance import LLMResponse
+from ..parsers import find_fenced_blocks, BulkParsingMixin, ParsingFailure
+
+
+_REFINEMENT_FLAG = "**Need Further Refinement**: "
 
 
 @dataclass(frozen=True, eq=True)
@@ -25,7 +29,7 @@ class GeneralClaimFeedbackResponse(LLMResponse):
     need_further_refinement: bool
 
     
-class GeneralClaimFeedbackOutputParser(BaseOutputParser):
+class GeneralClaimFeedbackOutputParser(BulkParsingMixin, BaseOutputParser):
     """ """
     
     @overrides
@@ -47,9 +51,11 @@ class GeneralClaimFeedbackOutputParser(BaseOutputParser):
         #     elif matched.group(1) == "Improvement":
         #         output_dict["improvement"] = matched.group(2)
         
-        match = re.match(r"(.*?)```\*\*Need Further Refinement\*\*: (.*?)```", text, re.DOTALL)
-        verbal_feedback = match.group(1).strip()
-        need_further_refinement = match.group(2).strip() == "True"
+        block = next((block for block in find_fenced_blocks(text) if block.content.startswith(_REFINEMENT_FLAG)), None)
+        if block is None:
+            raise ParsingFailure(f"Expected a fenced block starting with \"{_REFINEMENT_FLAG.strip()}\".", text_to_parse=text)
+        verbal_feedback = text[:block.start].strip()
+        need_further_refinement = block.content[len(_REFINEMENT_FLAG):].strip() == "True"
 
         return GeneralClaimFeedbackResponse(verbal_feedback=verbal_feedback, need_further_refinement=need_further_refinement, messages=text)
     
@@ -17,6 +17,10 @@ import re
 from ..example_selectors import ConstantExampleSelector, ExampleSelector
 from .step import Step, FewShotStep
 from ..instances.instance import LLMResponse
+from ..parsers import first_fenced_block, BulkParsingMixin
+
+
+_PLACEHOLDER_PATTERN = re.compile(r"PLACEHOLDER = (.*)", re.DOTALL)
 
 
 @dataclass(frozen=True, eq=True)
@@ -26,13 +30,13 @@ class TestOnQuizResponse(LLMResponse):
     infill: Text
 
 
-class TestOnQuizOutputParser(BaseOutputParser[TestOnQuizResponse]):
+class TestOnQuizOutputParser(BulkParsingMixin, BaseOutputParser[TestOnQuizResponse]):
     """ """
     @overrides
     def parse(self, text: Text) -> TestOnQuizResponse:
         
-        code_block = re.search(r"```(.*?)```", text, re.DOTALL).group(1).strip()
-        infill = re.match(f"PLACEHOLDER = (.*)", code_block, re.DOTALL).group(1).strip().strip("\"'")
+        code_block = first_fenced_block(text).content.strip()
+        infill = _PLACEHOLDER_PATTERN.match(code_block).group(1).strip().strip("\"'")
         
         return TestOnQuizResponse(
             block=code_block,
@@ -17,6 +17,7 @@ import re
 from ..example_selectors import ConstantExampleSelector, ExampleSelector
 from .step import Step, FewShotStep
 from ..instances.instance import LLMResponse
+from ..parsers import first_fenced_block, BulkParsingMixin
 
 
 @dataclass(frozen=True, eq=True)
@@ -26,18 +27,18 @@ class VagueAnswerResponse(LLMResponse):
     general_answer: Text
     
     
-class VagueAnswerOutputParser(BaseOutputParser[VagueAnswerResponse]):
+class VagueAnswerOutputParser(BulkParsingMixin, BaseOutputParser[VagueAnswerResponse]):
     """Parse the output of the decontextualization model.
     """
     def parse(self, text: Text) -> VagueAnswerResponse:
         cleaned_text = text.strip()
 
         # find the text wrapped by the code block
-        match = re.search(r"```(.*?)```", cleaned_text, re.DOTALL)
-        if match is None:
+        block = first_fenced_block(cleaned_text)
+        if block is None:
             general_answer = None
         else:
-            general_answer = match.group(1).strip()
+            general_answer = block.content.strip()
             
         return VagueAnswerResponse(messages=text, general_answer=general_answer)
     
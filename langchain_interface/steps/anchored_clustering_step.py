@@ -25,6 +25,11 @@ from .step import (
     FewShotStep
 )
 from ..instances.instance import LLMResponse
+from ..parsers import find_fenced_blocks, BulkParsingMixin, ParsingFailure
+
+
+_INCREMENTS_PATTERN = re.compile(r"increments = (\[.*?\])\s", re.DOTALL)
+_LIST_PATTERN = re.compile(r"\[.*?\]\s", re.DOTALL)
 
 
 @dataclass(frozen=True, eq=True)
@@ -32,19 +37,22 @@ class AnchoredClusteringResponse(LLMResponse):
     increments: List[Text]
     
     
-class AnchoredClusteringOutputParser(BaseOutputParser[AnchoredClusteringResponse]):
+class AnchoredClusteringOutputParser(BulkParsingMixin, BaseOutputParser[AnchoredClusteringResponse]):
     """ """
     
     @overrides
     def parse(self, text: Text) -> LLMResponse:
         
-        all_matched = re.findall(r"```python(.*?)```", text, re.DOTALL)
+        all_matched = [
+            block.content[len("python"):] for block in find_fenced_blocks(text)
+            if block.content.startswith("python")
+        ]
 
         items = None
         
         for matched in all_matched:
             try:
-                submatch = re.search(r"increments = (\[.*?\])\s", matched, re.DOTALL)
+                submatch = _INCREMENTS_PATTERN.search(matched)
                 if submatch is not None:
                     items = ast.literal_eval(submatch.group(1))
                 # submatch = re.search(r"(\[.*?\])", matched, re.DOTALL)
@@ -54,12 +62,13 @@ class AnchoredClusteringOutputParser(BaseOutputParser[AnchoredClusteringResponse
                 continue
             
         if items is None:
-            print(all_matched[-1])
-            submatch = re.search(r"\[.*?\]\s", all_matched[-1], re.DOTALL)
+            if not all_matched:
+                raise ParsingFailure("No ```python block found.", text_to_parse=text)
+            submatch = _LIST_PATTERN.search(all_matched[-1])
             try:
                 items = ast.literal_eval(submatch.group(0))
             except Exception:
-                print('=' * 50 + '\n' + text + '\n' + '=' * 50)
+                raise ParsingFailure("Could not recover the `increments` list.", text_to_parse=text)
         
         return AnchoredClusteringResponse(
             increments=items,
@@ -1,6 +1,15 @@
-from .sentence_proposal_step import BIRDSentenceProposalStep
-from .implication_check_step import BIRDImplicationCheckStep
-from .reevaluate_implication_step import BIRDReevaluateImplicationStep
-from .sentence_support_determination_step import BIRDSentenceSupportDeterminationStep
-from .summarize_to_factor_step import BIRDSummarizeToFactorStep
-from .verbalized_probability_step import BIRDVerbalizedProbabilityStep
\ No newline at end of file
+from ..._lazy import lazy_attributes
+
+_LAZY_ATTRIBUTES = {
+    "BIRDSentenceProposalStep": ".sentence_proposal_step",
+    "BIRDImplicationCheckStep": ".implication_check_step",
+    "BIRDGroupedImplicationCheckStep": ".grouped_implication_check_step",
+    "BIRDReevaluateImplicationStep": ".reevaluate_implication_step",
+    "BIRDSentenceSupportDeterminationStep": ".sentence_support_determination_step",
+    "BIRDGroupedSentenceSupportDeterminationStep": ".grouped_sentence_support_determination_step",
+    "BIRDSummarizeToFactorStep": ".summarize_to_factor_step",
+    "BIRDVerbalizedProbabilityStep": ".verbalized_probability_step",
+}
+
+__getattr__, __dir__ = lazy_attributes(__name__, _LAZY_ATTRIBUTES)
+__all__ = list(_LAZY_ATTRIBUTES)
@@ -0,0 +1,188 @@
+""" Judge several statements against the same scenario and condition in one call. """
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+from dataclasses import dataclass
+from overrides import overrides
+from typing import Text, List, Dict, Optional, Any
+
+from langchain_core.runnables.base import Runnable
+from langchain.prompts import (
+    ChatPromptTemplate,
+    FewShotChatMessagePromptTemplate,
+)
+from langchain_core.output_parsers import BaseOutputParser
+from ...example_selectors import ConstantExampleSelector, ExampleSelector
+from ..step import (
+    Step,
+    FewShotStep
+)
+from ...instances.instance import LLMResponse
+from ...parsers import BulkParsingMixin, ParsingFailure, JSONSchemaGrammar, OutputGrammar
+from .implication_check_step import BIRDImplicationCheckResponse
+
+
+def echo_key(item: Text) -> Text:
+    """ Match items echoed back by a grouped step despite case, whitespace and a trailing period. """
+    return " ".join(item.lower().split()).rstrip(".")
+
+
+@dataclass(frozen=True, eq=True)
+class BIRDGroupedImplicationCheckResponse(LLMResponse):
+    # verdicts keyed by the statements as the model echoed them
+    implied: Dict[Text, bool]
+    
+    def verdict(self, statement: Text) -> Optional[bool]:
+        """ The verdict for `statement`, tolerating case, whitespace and a trailing
+        period in the echo. None if the model did not judge it.
+        """
+        if statement in self.implied:
+            return self.implied[statement]
+        
+        keyed = {echo_key(echoed): implied for echoed, implied in self.implied.items()}
+        return keyed.get(echo_key(statement))
+    
+    def response_for(self, statement: Text) -> Optional[BIRDImplicationCheckResponse]:
+        """ The verdict for `statement` as a single implication check response. """
+        implied = self.verdict(statement)
+        return None if implied is None else BIRDImplicationCheckResponse(messages=self.messages, implied=implied)
+    
+    
+class BIRDGroupedImplicationCheckOutputParser(BulkParsingMixin, BaseOutputParser[BIRDGroupedImplicationCheckResponse]):
+    @overrides
+    def parse(self, text: Text) -> BIRDGroupedImplicationCheckResponse:
+        
+        try:
+            results = json.loads(text.strip())["results"]
+            implied = {
+                result["statement"]: result["implied"] in (True, "true")
+                for result in results
+            }
+        except (ValueError, KeyError, TypeError):
+            raise ParsingFailure("Expected a JSON object with a list of statement verdicts under \"results\".", text_to_parse=text)
+        
+        return BIRDGroupedImplicationCheckResponse(
+            messages=text,
+            implied=implied
+        )
+    
+    @property
+    def _type(self) -> str:
+        return "bird-grouped-implication-check"
+    
+    
+@Step.register("bird-grouped-implication-check")
+class BIRDGroupedImplicationCheckStep(FewShotStep):
+    """ Like `BIRDImplicationCheckStep`, but for a JSON list of `statements`, so that
+    the few-shot block and the scenario are only paid for once per group.
+    """
+    
+    def __init__(
+        self,
+        example_selector: Optional[ExampleSelector] = None
+    ):
+        if example_selector is None:
+            example_selector = ConstantExampleSelector()
+            examples = [
+                {
+                    "scenario": (
+                        "Dave was a scientist. Dave wanted to make a great "
+                        "scientific discovery. Dave worked with algae to make electricity. "
+                        "Dave discovered he could make electricity with algae! Dave was "
+                        "awarded for his great discovery."
+                    ),
+                    "condition": (
+                        "Dave is known to meticulously plan his investigations and "
+                        "ensure all necessary resources and funds are obtained "
+                        "beforehand."
+                    ),
+                    "statements": json.dumps([
+                        "Dave tends to plan ahead",
+                        "Dave tends to improvise"
+                    ]),
+                    "results": json.dumps({
+                        "results": [
+                            {
+                                "statement": "Dave tends to plan ahead",
+                                "reasoning": (
+                                    "Dave meticulously plans his investigations and obtains "
+                                    "resources beforehand, so he is proactive and plans ahead."
+                                ),
+                                "implied": True
+                            },
+                            {
+                                "statement": "Dave tends to improvise",
+                                "reasoning": (
+                                    "Meticulous planning is the opposite of improvising, so the "
+                                    "condition does not imply it."
+                                ),
+                                "implied": False
+                            }
+                        ]
+                    })
+                }
+            ]
+            
+            for example in examples:
+                example_selector.add_example(example)
+
+        super().__init__(example_selector)
+        
+    @overrides
+    def get_prompt_template(self) -> Runnable:
+        
+        system_prompt = (
+            "Decide, for each statement in the list, if the scenario with the condition implies the statement. "
+            "Judge every statement independently of the others. Output a JSON object with a \"results\" list "
+            "holding one entry per statement, in order, that copies the statement exactly and gives a short "
+            "\"reasoning\" and an \"implied\" verdict (true or false)."
+        )
+
+        example_prompt = ChatPromptTemplate.from_messages([
+            ("human", "Scenario: {scenario}\nCondition: {condition}\nStatements: {statements}"),
+            ("ai", "{results}")
+        ])
+        
+        fewshot_prompt_template = FewShotChatMessagePromptTemplate(
+            example_prompt=example_prompt,
+            example_selector=self._example_selector
+        )
+
+        return ChatPromptTemplate.from_messages(
+            [
+                ("system", system_prompt),
+                fewshot_prompt_template,
+                ("human", "Scenario: {scenario}\nCondition: {condition}\nStatements: {statements}"),
+            ]
+        )
+        
+    @overrides
+    def get_output_parser(self) -> Runnable:
+        return BIRDGroupedImplicationCheckOutputParser()
+    
+    @overrides
+    def get_output_grammar(self) -> Optional[OutputGrammar]:
+        return JSONSchemaGrammar(
+            schema={
+                "type": "object",
+                "properties": {
+                    "results": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "statement": {"type": "string"},
+                                "reasoning": {"type": "string"},
+                                "implied": {"type": "boolean"}
+                            },
+                            "required": ["statement", "reasoning", "implied"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["results"],
+                "additionalProperties": False
+            }
+        )
@@ -0,0 +1,177 @@
+""" Determine the supported outcome for several conditions in one call. """
+
+try:
+    import ujson as json
+except ImportError:
+    import json
+from dataclasses import dataclass
+from overrides import overrides
+from typing import Text, List, Dict, Optional, Any
+
+from langchain_core.runnables.base import Runnable
+from langchain.prompts import (
+    ChatPromptTemplate,
+    FewShotChatMessagePromptTemplate,
+)
+from langchain_core.output_parsers import BaseOutputParser
+from ...example_selectors import ConstantExampleSelector, ExampleSelector
+from ..step import (
+    Step,
+    FewShotStep
+)
+from ...instances.instance import LLMResponse
+from ...parsers import BulkParsingMixin, ParsingFailure, JSONSchemaGrammar, OutputGrammar
+from .grouped_implication_check_step import echo_key
+from .sentence_support_determination_step import BIRDSentenceSupportDeterminationResponse
+
+
+@dataclass(frozen=True, eq=True)
+class BIRDGroupedSentenceSupportDeterminationResponse(LLMResponse):
+    # support indices keyed by the conditions as the model echoed them
+    support_index: Dict[Text, int]
+    
+    def response_for(self, condition: Text) -> Optional[BIRDSentenceSupportDeterminationResponse]:
+        """ The support index for `condition` as a single support determination
+        response. None if the model did not judge it.
+        """
+        keyed = {echo_key(echoed): index for echoed, index in self.support_index.items()}
+        index = self.support_index.get(condition, keyed.get(echo_key(condition)))
+        return None if index is None else BIRDSentenceSupportDeterminationResponse(messages=self.messages, support_index=index)
+    
+    
+class BIRDGroupedSentenceSupportDeterminationOutputParser(BulkParsingMixin, BaseOutputParser[BIRDGroupedSentenceSupportDeterminationResponse]):
+    
+    __SUPPORT_INDEX_MAP__ = {
+        "outcome 1": 0,
+        "outcome 2": 1
+    }
+    
+    @overrides
+    def parse(self, text: Text) -> BIRDGroupedSentenceSupportDeterminationResponse:
+        
+        try:
+            results = json.loads(text.strip())["results"]
+            support_index = {
+                result["condition"]: self.__SUPPORT_INDEX_MAP__.get(str(result["result"]).strip().lower(), -1)
+                for result in results
+            }
+        except (ValueError, KeyError, TypeError):
+            raise ParsingFailure("Expected a JSON object with a list of condition results under \"results\".", text_to_parse=text)
+        
+        return BIRDGroupedSentenceSupportDeterminationResponse(
+            messages=text,
+            support_index=support_index
+        )
+    
+    @property
+    def _type(self) -> str:
+        return "grouped-sentence-support-determination"
+    
+    
+@Step.register("grouped-sentence-support-determination")
+class BIRDGroupedSentenceSupportDeterminationStep(FewShotStep):
+    """ Like `BIRDSentenceSupportDeterminationStep`, but for a JSON list of `conditions`,
+    so that the few-shot block, scenario and outcomes are only paid for once per group.
+    """
+    
+    def __init__(
+        self,
+        example_selector: Optional[ExampleSelector] = None
+    ):
+        if example_selector is None:
+            example_selector = ConstantExampleSelector()
+            examples = [
+                {
+                    "scenario": "The government is planing the location for building charging stations,",
+                    "outcome_1": "The government should build a chargin station here.",
+                    "outcome_2": "The government should not build a charging station here.",
+                    "conditions": json.dumps([
+                        "The location has a high adoption rate of electric vehicles.",
+                        "The location has no reliable access to the power grid."
+                    ]),
+                    "results": json.dumps({
+                        "results": [
+                            {
+                                "condition": "The location has a high adoption rate of electric vehicles.",
+                                "reasoning": (
+                                    "A high adoption rate indicates a strong demand for charging "
+                                    "infrastructure, which a charging station would help meet."
+                                ),
+                                "result": "Outcome 1"
+                            },
+                            {
+                                "condition": "The location has no reliable access to the power grid.",
+                                "reasoning": (
+                                    "A charging station needs a reliable power supply, so the location "
+                                    "is a poor fit for one."
+                                ),
+                                "result": "Outcome 2"
+                            }
+                        ]
+                    })
+                },
+            ]
+
+            for example in examples:
+                example_selector.add_example(example)
+                
+        super().__init__(example_selector=example_selector)
+
+    @overrides
+    def get_prompt_template(self) -> Runnable:
+        """ """
+        
+        system_prompt = (
+            "A scenario and two outcomes are provided. "
+            "Determine, for each condition in the list, which outcome the condition better supports. "
+            "Judge every condition independently of the others. Output a JSON object with a \"results\" "
+            "list holding one entry per condition, in order, that copies the condition exactly and gives "
+            "a short \"reasoning\" and the \"result\" (\"Outcome 1\" or \"Outcome 2\")."
+        )
+        
+        example_prompt = ChatPromptTemplate.from_messages(
+            [
+                ("human", "Scenario: {scenario}\nOutcome 1: {outcome_1}\nOutcome 2: {outcome_2}\nConditions: {conditions}"),
+                ("ai", "{results}")
+            ]
+        )
+        
+        fewshot_prompt_template = FewShotChatMessagePromptTemplate(
+            example_prompt=example_prompt,
+            example_selector=self._example_selector,
+        )
+
+        return ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            fewshot_prompt_template,
+            ("human", "Scenario: {scenario}\nOutcome 1: {outcome_1}\nOutcome 2: {outcome_2}\nConditions: {conditions}")
+        ])
+        
+    @overrides
+    def get_output_parser(self) -> Runnable:
+        return BIRDGroupedSentenceSupportDeterminationOutputParser()
+    
+    @overrides
+    def get_output_grammar(self) -> Optional[OutputGrammar]:
+        return JSONSchemaGrammar(
+            schema={
+                "type": "object",
+                "properties": {
+                    "results": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "condition": {"type": "string"},
+                                "reasoning": {"type": "string"},
+                                "result": {"type": "string", "enum": ["Outcome 1", "Outcome 2"]}
+                            },
+                            "required": ["condition", "reasoning", "result"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["results"],
+                "additionalProperties": False
+            }
+        )
@@ -7,7 +7,7 @@ except ImportError:
 import ast
 from dataclasses import dataclass
 from overrides import overrides
-from typing import Union, Text, List, Dict, Optional, Callable, Any
+from typing import Union, Text, List, Dict, Optional, Callable, Any, Tuple
 
 from langchain_core.runnables.config import RunnableConfig
 from langchain_core.runnables.base import Runnable
@@ -23,6 +23,7 @@ from ..step import (
     FewShotStep
 )
 from ...instances.instance import LLMResponse
+from ...parsers import first_fenced_block, BulkParsingMixin, ChoiceGrammar, OutputGrammar
 
 
 @dataclass(frozen=True, eq=True)
@@ -30,32 +31,16 @@ class BIRDImplicationCheckResponse(LLMResponse):
     implied: bool
 
     
-class BIRDImplicationCheckOutputParser(BaseOutputParser[BIRDImplicationCheckResponse]):
+class BIRDImplicationCheckOutputParser(BulkParsingMixin, BaseOutputParser[BIRDImplicationCheckResponse]):
     @overrides
     def parse(self, text: Text) -> BIRDImplicationCheckResponse:
 
-        try:
-            answer_span = re.search(r"```(.*?)```", text, re.DOTALL)
-            answer_span.group(1).strip().lower()
-            if answer_span == "true":
-                return BIRDImplicationCheckResponse(
-                    messages=text,
-                    implied=True
-                )
-            elif answer_span == "false":
-                return BIRDImplicationCheckResponse(
-                    messages=text,
-                    implied=False
-                )
-        except Exception:
-            return BIRDImplicationCheckResponse(
-                messages=text,
-                implied=False
-            )
-        
+        answer_block = first_fenced_block(text)
+        answer = answer_block.content.strip().lower() if answer_block is not None else None
+
         return BIRDImplicationCheckResponse(
             messages=text,
-            implied=False
+            implied=answer == "true"
         )
     
     @property
@@ -66,6 +51,9 @@ class BIRDImplicationCheckOutputParser(BaseOutputParser[BIRDImplicationCheckResp
 @Step.register("bird-implication-check")
 class BIRDImplicationCheckStep(FewShotStep):
     
+    # 1: the scoring prompt answers its examples with bare labels
+    __PROMPT_REVISION__ = 1
+    
     def __init__(
         self,
         example_selector: Optional[ExampleSelector] = None
@@ -131,4 +119,20 @@ class BIRDImplicationCheckStep(FewShotStep):
         
     @overrides
     def get_output_parser(self) -> Runnable:
-        return BIRDImplicationCheckOutputParser()
\ No newline at end of file
+        return BIRDImplicationCheckOutputParser()
+    
+    @overrides
+    def get_output_grammar(self) -> Optional[OutputGrammar]:
+        return ChoiceGrammar(choices=("```true```", "```false```"))
+    
+    @overrides
+    def get_label_candidates(self) -> Optional[Tuple[Text, ...]]:
+        return ("true", "false")
+    
+    @overrides
+    def get_scoring_prompt_template(self) -> Runnable:
+        return self._label_prompt_template(
+            f"Decide if the scenario with the condition implies the statement. {self.get_scoring_instruction()}",
+            "Scenario: {scenario}\nCondition: {condition}\nStatement: {statement}",
+            lambda example: example["implied"]
+        )
@@ -23,6 +23,7 @@ from ..step import (
     FewShotStep
 )
 from ...instances.instance import LLMResponse
+from ...parsers import BulkParsingMixin, StreamingJSONObjectMixin, loads_many, JSONSchemaGrammar, OutputGrammar
 
 
 @dataclass(frozen=True, eq=True)
@@ -30,7 +31,7 @@ class BIRDReevaluateImplicationResponse(LLMResponse):
     implication_dict: Dict[Text, List[Text]]
 
     
-class BIRDReevaluateImplicationOutputParser(BaseOutputParser[BIRDReevaluateImplicationResponse]):
+class BIRDReevaluateImplicationOutputParser(StreamingJSONObjectMixin, BulkParsingMixin, BaseOutputParser[BIRDReevaluateImplicationResponse]):
     
     @overrides
     def parse(self, text: Text) -> BIRDReevaluateImplicationResponse:
@@ -40,6 +41,17 @@ class BIRDReevaluateImplicationOutputParser(BaseOutputParser[BIRDReevaluateImpli
             implication_dict=json.loads(text.strip())
         )
     
+    @overrides
+    def _parse_many(self, texts: List[Text]) -> List[Any]:
+        decoded = loads_many(texts)
+        if decoded is None:
+            return super()._parse_many(texts)
+        
+        return [
+            BIRDReevaluateImplicationResponse(messages=text, implication_dict=json_dict)
+            for text, json_dict in zip(texts, decoded)
+        ]
+    
     @property
     def _type(self) -> str:
         return "bird-reevaluate-implication"
@@ -118,4 +130,15 @@ class BIRDReevaluateImplicationStep(FewShotStep):
         
     @overrides
     def get_output_parser(self) -> Runnable:
-        return BIRDReevaluateImplicationOutputParser()
\ No newline at end of file
+        return BIRDReevaluateImplicationOutputParser()
+    
+    @overrides
+    def get_output_grammar(self) -> Optional[OutputGrammar]:
+        # factor names are free-form keys, which OpenAI strict mode cannot express
+        return JSONSchemaGrammar(
+            schema={
+                "type": "object",
+                "additionalProperties": {"type": "array", "items": {"type": "string"}}
+            },
+            strict_schema=False
+        )
\ No newline at end of file
@@ -23,6 +23,10 @@ from ..step import (
     FewShotStep
 )
 from ...instances.instance import LLMResponse
+from ...parsers import BulkParsingMixin
+
+
+_NUMBERED_LINE_PATTERN = re.compile(r"(\d+)?\.* (.*)", re.DOTALL)
 
 
 @dataclass(frozen=True, eq=True)
@@ -30,7 +34,7 @@ class BIRDSentenceProposalResponse(LLMResponse):
     sentences: List[Text]
     
     
-class BIRDSentenceProposalOutputParser(BaseOutputParser[BIRDSentenceProposalResponse]):
+class BIRDSentenceProposalOutputParser(BulkParsingMixin, BaseOutputParser[BIRDSentenceProposalResponse]):
     
     @overrides
     def parse(self, text: Text) -> BIRDSentenceProposalResponse:
@@ -39,7 +43,7 @@ class BIRDSentenceProposalOutputParser(BaseOutputParser[BIRDSentenceProposalResp
         # line may start with # or (\d+). , so we need to check for both and strip these markers
         sentences = []
         for line in lines:
-            match = re.match(r"(\d+)?\.* (.*)", line.strip(), re.DOTALL)
+            match = _NUMBERED_LINE_PATTERN.match(line.strip())
             if match:
                 sentences.append(match.group(2))
             elif line.strip().startswith("#"):
@@ -7,7 +7,7 @@ except ImportError:
 import ast
 from dataclasses import dataclass
 from overrides import overrides
-from typing import Union, Text, List, Dict, Optional, Callable, Any
+from typing import Union, Text, List, Dict, Optional, Callable, Any, Tuple
 
 from langchain_core.runnables.config import RunnableConfig
 from langchain_core.runnables.base import Runnable
@@ -23,6 +23,7 @@ from ..step import (
     FewShotStep
 )
 from ...instances.instance import LLMResponse
+from ...parsers import first_fenced_block, BulkParsingMixin, ChoiceGrammar, OutputGrammar
 
 
 @dataclass(frozen=True, eq=True)
@@ -30,34 +31,23 @@ class BIRDSentenceSupportDeterminationResponse(LLMResponse):
     support_index: int
     
     
-class BIRDSentenceSupportDeterminationOutputParser(BaseOutputParser[BIRDSentenceSupportDeterminationResponse]):
+class BIRDSentenceSupportDeterminationOutputParser(BulkParsingMixin, BaseOutputParser[BIRDSentenceSupportDeterminationResponse]):
+    
+    __SUPPORT_INDEX_MAP__ = {
+        "outcome 1": 0,
+        "outcome 2": 1
+    }
     
     @overrides
     def parse(self, text: Text) -> BIRDSentenceSupportDeterminationResponse:
 
-        try:
-            answer_span = re.search(r"```(.*?)```", text, re.DOTALL)
-            if answer_span.group(1).strip().lower() == "outcome 1":
-                return BIRDSentenceSupportDeterminationResponse(
-                    messages=text,
-                    support_index=0
-                )
-            elif answer_span.group(1).strip().lower() == "outcome 2":
-                return BIRDSentenceSupportDeterminationResponse(
-                    messages=text,
-                    support_index=1
-                )
-            else:
-                return BIRDSentenceSupportDeterminationResponse(
-                    messages=text,
-                    support_index=-1
-                )
-                
-        except Exception:
-            return BIRDSentenceSupportDeterminationResponse(
-                messages=text,
-                support_index=-1
-            )
+        answer_block = first_fenced_block(text)
+        answer = answer_block.content.strip().lower() if answer_block is not None else None
+
+        return BIRDSentenceSupportDeterminationResponse(
+            messages=text,
+            support_index=self.__SUPPORT_INDEX_MAP__.get(answer, -1)
+        )
             
     @property
     def _type(self) -> str:
@@ -68,6 +58,9 @@ class BIRDSentenceSupportDeterminationOutputParser(BaseOutputParser[BIRDSentence
 class BIRDSentenceSupportDeterminationStep(FewShotStep):
     """ Determine which sentence is the support sentence supporting. """
     
+    # 1: the scoring prompt answers its examples with bare labels
+    __PROMPT_REVISION__ = 1
+    
     def __init__(
         self,
         example_selector: Optional[ExampleSelector] = None
@@ -128,4 +121,29 @@ class BIRDSentenceSupportDeterminationStep(FewShotStep):
         
     @overrides
     def get_output_parser(self) -> Runnable:
-        return BIRDSentenceSupportDeterminationOutputParser()
\ No newline at end of file
+        return BIRDSentenceSupportDeterminationOutputParser()
+    
+    @overrides
+    def get_output_grammar(self) -> Optional[OutputGrammar]:
+        return ChoiceGrammar(choices=("```Outcome 1```", "```Outcome 2```"))
+    
+    @overrides
+    def get_label_candidates(self) -> Optional[Tuple[Text, ...]]:
+        # "Outcome 1" and "Outcome 2" share their first token, so we score the numbers
+        return ("1", "2", "Neither")
+    
+    @overrides
+    def get_scoring_instruction(self) -> Text:
+        return (
+            "Do not explain your answer. Reply with only the number of the outcome the condition "
+            "better supports (1 or 2), or Neither if it supports neither."
+        )
+    
+    @overrides
+    def get_scoring_prompt_template(self) -> Runnable:
+        return self._label_prompt_template(
+            f"A scenario and two outcomes are provided. {self.get_scoring_instruction()}",
+            "Scenario: {scenario}\nOutcome 1: {outcome_1}\nOutcome 2: {outcome_2}\nCondition: {condition}",
+            # "Outcome 1" -> "1"
+            lambda example: example["result"].split()[-1]
+        )
@@ -23,6 +23,7 @@ from ..step import (
     FewShotStep
 )
 from ...instances.instance import LLMResponse
+from ...parsers import BulkParsingMixin, StreamingJSONObjectMixin, loads_many, JSONSchemaGrammar, OutputGrammar
 
 
 @dataclass(frozen=True, eq=True)
@@ -30,7 +31,7 @@ class BIRDSummarizeToFactorResponse(LLMResponse):
     factor_dict: Dict[Text, List[Text]]
     
     
-class BIRDSummarizeToFactorOutputParser(BaseOutputParser[BIRDSummarizeToFactorResponse]):
+class BIRDSummarizeToFactorOutputParser(StreamingJSONObjectMixin, BulkParsingMixin, BaseOutputParser[BIRDSummarizeToFactorResponse]):
     # TODO: consider using the JSONParser native to LangChain?
     @overrides
     def parse(self, text: Text) -> BIRDSummarizeToFactorResponse:
@@ -42,6 +43,17 @@ class BIRDSummarizeToFactorOutputParser(BaseOutputParser[BIRDSummarizeToFactorRe
             factor_dict=json_dict
         )
     
+    @overrides
+    def _parse_many(self, texts: List[Text]) -> List[Any]:
+        decoded = loads_many(texts)
+        if decoded is None:
+            return super()._parse_many(texts)
+        
+        return [
+            BIRDSummarizeToFactorResponse(messages=text, factor_dict=json_dict)
+            for text, json_dict in zip(texts, decoded)
+        ]
+    
     @property
     def _type(self) -> str:
         return "bird-summarize-to-factor"
@@ -138,4 +150,15 @@ class BIRDSummarizeToFactorStep(FewShotStep):
     
     @overrides
     def get_output_parser(self) -> Runnable:
-        return BIRDSummarizeToFactorOutputParser()
\ No newline at end of file
+        return BIRDSummarizeToFactorOutputParser()
+    
+    @overrides
+    def get_output_grammar(self) -> Optional[OutputGrammar]:
+        # factor names are free-form keys, which OpenAI strict mode cannot express
+        return JSONSchemaGrammar(
+            schema={
+                "type": "object",
+                "additionalProperties": {"type": "array", "items": {"type": "string"}}
+            },
+            strict_schema=False
+        )
\ No newline at end of file
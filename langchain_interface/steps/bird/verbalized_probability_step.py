@@ -23,6 +23,10 @@ from ..step import (
     FewShotStep
 )
 from ...instances.instance import LLMResponse
+from ...parsers import first_fenced_block, BulkParsingMixin, ParsingFailure, RegexGrammar, OutputGrammar
+
+
+_OPTION_PATTERN = re.compile(r"(Outcome \d+): (.*)", re.DOTALL)
 
 
 @dataclass(frozen=True, eq=True)
@@ -30,7 +34,7 @@ class BIRDVerbalizedProbabilityResponse(LLMResponse):
     verbalized_probability: Tuple[float, float]
 
    
-class BIRDVerbalizedProbabilityOutputParser(BaseOutputParser[BIRDVerbalizedProbabilityResponse]):
+class BIRDVerbalizedProbabilityOutputParser(BulkParsingMixin, BaseOutputParser[BIRDVerbalizedProbabilityResponse]):
     
     __CONVERSION_MAP__ = {
         "very likely": 1.,
@@ -44,30 +48,39 @@ class BIRDVerbalizedProbabilityOutputParser(BaseOutputParser[BIRDVerbalizedProba
     
     @overrides
     def parse(self, text: Text) -> BIRDVerbalizedProbabilityResponse:
-        answer_span = re.search(r"```(.*?)```", text, re.DOTALL)
-        options = answer_span.group(1).strip().split("\n")
+        answer_block = first_fenced_block(text)
+        if answer_block is None:
+            raise ParsingFailure("Expected a fenced block with the likelihood of both outcomes.", text_to_parse=text)
         
-        assert len(options) == 2, f"Expected 2 options, got {len(options)}"
+        options = answer_block.content.strip().split("\n")
+        if len(options) != 2:
+            raise ParsingFailure(f"Expected 2 options, got {len(options)}.", text_to_parse=text)
         
         results = []
 
-        for idx, option in enumerate(options):
-            verbalized_uncertainty = re.match(option, r"(Outcome \d+): (.*)", re.DOTALL)
-            if verbalized_uncertainty:
-                if verbalized_uncertainty.group(1) == "Outcome 1":
-                    results.append((self.__CONVERSION_MAP__[verbalized_uncertainty.group(2)], 1 - self.__CONVERSION_MAP__[verbalized_uncertainty.group(2)]))
-                elif verbalized_uncertainty.group(1) == "Outcome 2":
-                    results.append((1 - self.__CONVERSION_MAP__[verbalized_uncertainty.group(2)], self.__CONVERSION_MAP__[verbalized_uncertainty.group(2)]))
+        for option in options:
+            verbalized_uncertainty = _OPTION_PATTERN.match(option.strip())
+            if verbalized_uncertainty is None or verbalized_uncertainty.group(1) not in ("Outcome 1", "Outcome 2"):
+                raise ParsingFailure(f"Expected \"Outcome 1: <likelihood>\" or \"Outcome 2: <likelihood>\", got \"{option.strip()}\".", text_to_parse=text)
+            
+            phrase = verbalized_uncertainty.group(2).strip().lower()
+            if phrase not in self.__CONVERSION_MAP__:
+                raise ParsingFailure(f"Unknown likelihood \"{phrase}\".", text_to_parse=text)
+            
+            prob = self.__CONVERSION_MAP__[phrase]
+            if verbalized_uncertainty.group(1) == "Outcome 1":
+                results.append((prob, 1 - prob))
+            else:
+                results.append((1 - prob, prob))
                     
         # average the results
-        if results:
-            return BIRDVerbalizedProbabilityResponse(
-                messages=text,
-                verbalized_probability=(
-                    sum([result[0] for result in results]) / len(results),
-                    sum([result[1] for result in results]) / len(results)
-                )
+        return BIRDVerbalizedProbabilityResponse(
+            messages=text,
+            verbalized_probability=(
+                sum([result[0] for result in results]) / len(results),
+                sum([result[1] for result in results]) / len(results)
             )
+        )
     
     @property
     def _type(self) -> str:
@@ -101,7 +114,7 @@ class BIRDVerbalizedProbabilityStep(FewShotStep):
                     "reasoning_and_final_response": (
                         "Given that the user is carrying a portable charger, a shorter cord "
                         "like one foot would indeed be far more manageable, making it easier "
-                        "for the user to move around freely.\n",
+                        "for the user to move around freely.\n"
                         "Given the same conditions, a longer cord like six feet might become "
                         "an impediment, making it more challenging for the user who is "
                         "carrying the charger to move around freely due to the possibility "
@@ -110,7 +123,8 @@ class BIRDVerbalizedProbabilityStep(FewShotStep):
                     )
                 }
             ]
-            example_selector.set_examples(examples)
+            for example in examples:
+                example_selector.add_example(example)
             
         super().__init__(example_selector=example_selector)
 
@@ -147,4 +161,18 @@ class BIRDVerbalizedProbabilityStep(FewShotStep):
                 fewshot_prompt_template,
                 ("human", "Scenario: {scenario}\nCondition: {condition}\nOutcome 1: {outcome_1}\nOutcome 2: {outcome_2}")
             ]
-        )
\ No newline at end of file
+        )
+    
+    @overrides
+    def get_output_parser(self) -> Runnable:
+        return BIRDVerbalizedProbabilityOutputParser()
+    
+    @overrides
+    def get_output_grammar(self) -> Optional[OutputGrammar]:
+        # the few-shot example answers "Likely", the system prompt lists "likely"; the parser accepts either
+        phrases = "|".join(
+            re.escape(variant)
+            for phrase in BIRDVerbalizedProbabilityOutputParser.__CONVERSION_MAP__
+            for variant in (phrase.capitalize(), phrase)
+        )
+        return RegexGrammar(pattern=f"```\nOutcome 1: ({phrases})\nOutcome 2: ({phrases})\n```")
\ No newline at end of file
@@ -17,13 +17,14 @@ from langchain_core.output_parsers import BaseOutputParser
 from ..example_selectors import ConstantExampleSelector, ExampleSelector
 from .step import Step, FewShotStep
 from ..instances.instance import LLMResponse, Instance
+from ..parsers import BulkParsingMixin
 
 
 @dataclass(frozen=True, eq=True)
 class DecompositionResponse(LLMResponse):
     claims: Text
 
-class DecompositionOutputParser(BaseOutputParser[DecompositionResponse]):
+class DecompositionOutputParser(BulkParsingMixin, BaseOutputParser[DecompositionResponse]):
     """Parse the output of the decomposition model.
     """
     def parse(self, text: Text) -> Dict:
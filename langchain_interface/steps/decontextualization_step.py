@@ -6,7 +6,6 @@ a single claim from a given context.
 from dataclasses import dataclass
 from overrides import overrides
 from typing import Union, Text, List, Dict, Optional, Callable, Any
-import re
 
 from langchain_core.runnables.config import RunnableConfig
 from langchain_core.runnables.base import Runnable
@@ -23,6 +22,7 @@ from .step import (
     FewShotStep
 )
 from ..instances.instance import LLMResponse
+from ..parsers import first_fenced_block, BulkParsingMixin
 
 
 DECONTEXTUALIZE_PROMPT = """Vague references include but are not limited to:
@@ -46,7 +46,7 @@ class DecontextualizationResponse(LLMResponse):
     revised: Text
     
     
-class DecontextualizationOutputParser(BaseOutputParser[DecontextualizationResponse]):
+class DecontextualizationOutputParser(BulkParsingMixin, BaseOutputParser[DecontextualizationResponse]):
     """Parse the output of the decontextualization model.
     """
     def parse(self, text: Text) -> Dict:
@@ -55,11 +55,11 @@ class DecontextualizationOutputParser(BaseOutputParser[DecontextualizationRespon
         # return {"responses": DecontextualizationResponse(messages=text, claims=[item.replace('- ', "") for item in items])}
 
         # find the text wrapped by the code block
-        match = re.search(r"```(.*?)```", cleaned_text, re.DOTALL)
-        if match is None:
+        block = first_fenced_block(cleaned_text)
+        if block is None:
             revised = None
         else:
-            revised = match.group(1).strip()
+            revised = block.content.strip()
         
         return DecontextualizationResponse(messages=text, revised=revised)
     
@@ -21,6 +21,7 @@ from .step import (
     FewShotStep
 )
 from ..instances.instance import LLMResponse
+from ..parsers import BulkParsingMixin
 
 
 @dataclass(frozen=True, eq=True)
@@ -28,7 +29,7 @@ class DistinctClusterIdentificationResponse(LLMResponse):
     clusters: List[Text]
     
     
-class DistinctClusterIdentificationOutputParser(BaseOutputParser[DistinctClusterIdentificationResponse]):
+class DistinctClusterIdentificationOutputParser(BulkParsingMixin, BaseOutputParser[DistinctClusterIdentificationResponse]):
     
     @overrides
     def parse(self, text: Text) -> DistinctClusterIdentificationResponse:
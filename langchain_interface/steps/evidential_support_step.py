@@ -2,7 +2,7 @@
 
 from dataclasses import dataclass
 from overrides import overrides
-from typing import Union, Text, List, Dict, Optional, Callable, Any, Literal
+from typing import Union, Text, List, Dict, Optional, Callable, Any, Literal, Tuple
 
 from langchain_core.runnables.config import RunnableConfig
 from langchain_core.runnables.base import Runnable
@@ -21,6 +21,10 @@ import re
 from ..example_selectors import ConstantExampleSelector, ExampleSelector
 from .step import Step
 from ..instances.instance import LLMResponse, Instance
+from ..parsers import first_fenced_block, BulkParsingMixin, ParsingFailure, ChoiceGrammar, OutputGrammar
+
+
+_LABEL_PATTERN = re.compile(r"Label: (.*)", re.DOTALL)
 
 
 @dataclass(frozen=True, eq=True)
@@ -31,21 +35,24 @@ class EvidentialSupportResponse(LLMResponse):
     hypothesis: Optional[Text] = None
     
     
-class EvidentialSupportOutputParser(BaseOutputParser[EvidentialSupportResponse]):
+class EvidentialSupportOutputParser(BulkParsingMixin, BaseOutputParser[EvidentialSupportResponse]):
     """Parse the output of the verification model.
     """
     def parse(self, text: Text) -> Dict:
         cleaned_text = text.strip()
         
         # find ``` ``` block
-        match = re.match(r"(.*?)```(.*?)```", cleaned_text, re.DOTALL)
-        reasoning = match.group(1).strip()
-        match_text = match.group(2)
-        submatch = re.search(r"Label: (.*)", match_text.strip(), re.DOTALL)
-        submatch_text = submatch.group(1)
+        block = first_fenced_block(cleaned_text)
+        if block is None:
+            raise ParsingFailure("No ``` block found.", text_to_parse=text)
+        reasoning = cleaned_text[:block.start].strip()
+        submatch = _LABEL_PATTERN.search(block.content.strip())
+        if submatch is None:
+            raise ParsingFailure("No `Label: ...` line found in the ``` block.", text_to_parse=text)
         
-        label = submatch_text.strip()
-        assert label in ["Entailment", "Contradiction", "Neutral"], f"Invalid label: {label}"
+        label = submatch.group(1).strip()
+        if label not in ["Entailment", "Contradiction", "Neutral"]:
+            raise ParsingFailure(f"Invalid label: {label}", text_to_parse=text)
         
         return EvidentialSupportResponse(
             messages=text,
@@ -132,4 +139,22 @@ class EvidentialSupportStep(FewShotStep):
     
     @overrides
     def get_output_parser(self) -> Runnable:
-        return EvidentialSupportOutputParser()
\ No newline at end of file
+        return EvidentialSupportOutputParser()
+    
+    @overrides
+    def get_output_grammar(self) -> Optional[OutputGrammar]:
+        return ChoiceGrammar(choices=tuple(
+            f"```\nLabel: {label}\n```" for label in ["Entailment", "Contradiction", "Neutral"]
+        ))
+    
+    @overrides
+    def get_label_candidates(self) -> Optional[Tuple[Text, ...]]:
+        return ("Entailment", "Contradiction", "Neutral")
+    
+    @overrides
+    def get_scoring_prompt_template(self) -> Runnable:
+        return self._label_prompt_template(
+            f"Does the premise entail the hypothesis? {self.get_scoring_instruction()}",
+            "Premise: {premise}\nHypothesis: {hypothesis}",
+            lambda example: example["label"]
+        )
\ No newline at end of file
@@ -0,0 +1,29 @@
+""" The module of every registered step, so that `Step.by_name` imports only the
+module of the step asked for. Keep it in sync when adding a step; the tests
+check it against the registrations.
+"""
+
+STEP_MODULES = {
+    "anchored-clustering": ".anchored_clustering_step",
+    "answer-shortening": "._answer_shortening_step",
+    "bird-grouped-implication-check": ".bird.grouped_implication_check_step",
+    "bird-implication-check": ".bird.implication_check_step",
+    "bird-reevaluate-implication": ".bird.reevaluate_implication_step",
+    "bird-sentence-proposal": ".bird.sentence_proposal_step",
+    "bird-summarize-to-factor": ".bird.summarize_to_factor_step",
+    "bird-verbalized-probability": ".bird.verbalized_probability_step",
+    "claim-set-split": "._claim_set_split_step",
+    "contrastively-summarize": "._contrastively_summarize_step",
+    "decompose": ".decomposition_step",
+    "decontextualize": ".decontextualization_step",
+    "distinct-cluster-identification": ".distinct_cluster_identification",
+    "evidential-support": ".evidential_support_step",
+    "explain-diff": "._explain_diff_step",
+    "general-claim-feedback": "._general_claim_feedback_step",
+    "grouped-sentence-support-determination": ".bird.grouped_sentence_support_determination_step",
+    "quiz-question": ".quiz_question_step",
+    "refine-claim-set-split": "._claim_set_split_step",
+    "sentence-support-determination": ".bird.sentence_support_determination_step",
+    "test-on-quiz": "._test_out_on_quiz_step",
+    "vague-answer": "._vague_answer_step",
+}
@@ -21,19 +21,10 @@ from langchain_core.output_parsers import BaseOutputParser
 from langchain.prompts import ChatPromptTemplate
 from langchain_interface.steps import Step
 from langchain_interface.instances import LLMResponse
+from langchain_interface.parsers import first_fenced_block, BulkParsingMixin, ParsingFailure, RegexGrammar, OutputGrammar
 
 
-# define our own exception of parsing failure
-class ParsingFailure(Exception):
-    """ """
-    def __init__(
-        self,
-        message: Text,
-        text_to_parse: Text
-    ):
-        """ """
-        super().__init__(message)
-        self.text_to_parse = text_to_parse
+_FRACTION_PATTERN = re.compile(r"\s*(\d+)\s*/\s*(\d+)\s*")
 
 
 @dataclass(frozen=True, eq=True)
@@ -42,7 +33,7 @@ class ReasoningBasedProbResponse(LLMResponse):
     reasoning: Optional[Text]
 
     
-class ReasoningBasedProbOutputParser(BaseOutputParser[ReasoningBasedProbResponse]):
+class ReasoningBasedProbOutputParser(BulkParsingMixin, BaseOutputParser[ReasoningBasedProbResponse]):
     """ """
     
     @overrides
@@ -68,7 +59,7 @@ class ReasoningBasedProbOutputParser(BaseOutputParser[ReasoningBasedProbResponse
         # the probability is surrounded by ``` ```
         
         try:
-            prob_text = re.search(r"```\s*(.*?)\s*```", text).group(1)
+            prob_text = first_fenced_block(text).content.strip()
             prob = float(prob_text)
             if prob > 1:
                 # likely the model is outputting percentages.
@@ -83,13 +74,13 @@ class ReasoningBasedProbOutputParser(BaseOutputParser[ReasoningBasedProbResponse
                     raise ParsingFailure("Failed to extract probability from text. Invalid format.", text_to_parse=text)
             else:
                 # it might be the case that it is expressed in "a / b"
-                splitted_rep = re.search(r"\s*(\d+)\s*/\s*(\d+)\s*", prob_text)
-                if splitted_rep is not None:
-                    try:
-                        prob = float(splitted_rep.group(1)) / float(splitted_rep.group(2))
-                    except ValueError:
-                        raise ParsingFailure("Failed to extract probability from text. Invalid format.", text_to_parse=text)
-                raise ParsingFailure("Failed to extract probability from text. Invalid format.", text_to_parse=text)
+                splitted_rep = _FRACTION_PATTERN.search(prob_text)
+                if splitted_rep is None:
+                    raise ParsingFailure("Failed to extract probability from text. Invalid format.", text_to_parse=text)
+                try:
+                    prob = float(splitted_rep.group(1)) / float(splitted_rep.group(2))
+                except (ValueError, ZeroDivisionError):
+                    raise ParsingFailure("Failed to extract probability from text. Invalid format.", text_to_parse=text)
         
         return ReasoningBasedProbResponse(
             messages=text,
@@ -124,4 +115,9 @@ class ReasoningBasedProbStep(Step):
     @overrides
     def get_output_parser(self) -> Runnable:
         """ """
-        return ReasoningBasedProbOutputParser()
\ No newline at end of file
+        return ReasoningBasedProbOutputParser()
+    
+    @overrides
+    def get_output_grammar(self) -> Optional[OutputGrammar]:
+        """ """
+        return RegexGrammar(pattern=r"```(0(\.\d{1,4})?|1(\.0{1,4})?)```")
\ No newline at end of file
@@ -21,14 +21,20 @@ from langchain_core.output_parsers import BaseOutputParser
 from langchain.prompts import ChatPromptTemplate
 from langchain_interface.steps import Step
 from langchain_interface.instances import LLMResponse
+from langchain_interface.parsers import find_fenced_blocks, BulkParsingMixin
 
 
+_PROBABILITY_PATTERN = re.compile(r"[\d.]+")
+_BOXED_PATTERN = re.compile(r"boxed\{([\d.]+)\}", re.IGNORECASE)
+
+
+@dataclass(frozen=True, eq=True)
 class ProbResponse(LLMResponse):
-    probability = None
+    probability: Optional[float]
     reasoning: Optional[Text]
 
 
-class ProbExtractParser(BaseOutputParser[str]):
+class ProbExtractParser(BulkParsingMixin, BaseOutputParser[ProbResponse]):
     """
     Parser that extracts probability values from LLM output text.
     
@@ -39,29 +45,27 @@ class ProbExtractParser(BaseOutputParser[str]):
     Returns:
         dataclass with 'probability' (float or None) and 'reasoning' (str)
     """
-    def parse(self, text: Text) -> Dict[str, Any]:
-    
-        result = ProbResponse(reasoning=text)
+    def parse(self, text: Text) -> ProbResponse:
 
-        # Try different probability formats
-        patterns = [
-            r"```([\d.]+)```",  # Triple quote format
-            r"boxed\{([\d.]+)\}",  # LaTeX boxed format
+        # Try different probability formats, in order:
+        # triple quote format first, then LaTeX boxed format
+        candidates = [
+            next((block.content for block in find_fenced_blocks(text) if _PROBABILITY_PATTERN.fullmatch(block.content)), None),
+            next((match.group(1) for match in _BOXED_PATTERN.finditer(text)), None),
         ]
         
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                try:
-                    prob = float(match.group(1))
-                    # Validate probability is in [0,1]
-                    if 0 <= prob <= 1:
-                        result.probability = prob
-                        return result
-                except (ValueError, TypeError):
-                    continue
+        for candidate in candidates:
+            if candidate is None:
+                continue
+            try:
+                prob = float(candidate)
+            except (ValueError, TypeError):
+                continue
+            # Validate probability is in [0,1]
+            if 0 <= prob <= 1:
+                return ProbResponse(messages=text, probability=prob, reasoning=text)
         
-        return result
+        return ProbResponse(messages=text, probability=None, reasoning=text)
     
     @property
     def _type(self) -> str:
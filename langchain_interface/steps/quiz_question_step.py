@@ -17,6 +17,11 @@ import re
 from ..example_selectors import ConstantExampleSelector, ExampleSelector
 from .step import Step, FewShotStep
 from ..instances.instance import LLMResponse
+from ..parsers import BulkParsingMixin, ParsingFailure
+
+
+_QUIZ_QUESTION_PATTERN = re.compile(r"\*\*Question\*\*: (.*?)\n")
+_ANSWER_TEMPLATE_PATTERN = re.compile(r"\*\*Answer Template\*\*: (.*)")
 
 
 @dataclass(frozen=True, eq=True)
@@ -29,20 +34,17 @@ class QuizQuestionResponse(LLMResponse):
     place_holder_end: int
 
 
-class QuizQuestionOutputParser(BaseOutputParser[QuizQuestionResponse]):
+class QuizQuestionOutputParser(BulkParsingMixin, BaseOutputParser[QuizQuestionResponse]):
     def parse(self, text: Text) -> QuizQuestionResponse:
         cleaned_text = text.strip()
         
-        # find the text wrapped by the code block
-        try:
-            question = re.search(r"\*\*Question\*\*: (.*?)\n", cleaned_text).group(1).strip()
-            answer_template = re.search(
-                r"\*\*Answer Template\*\*: (.*)", cleaned_text
-            ).group(1).strip()
-        except Exception:
-            print('-' *20)
-            print(f"Error: {cleaned_text}")
-            print('-' *20)
+        question_match = _QUIZ_QUESTION_PATTERN.search(cleaned_text)
+        answer_template_match = _ANSWER_TEMPLATE_PATTERN.search(cleaned_text)
+        if question_match is None or answer_template_match is None:
+            raise ParsingFailure("Missing **Question** or **Answer Template** field.", text_to_parse=text)
+
+        question = question_match.group(1).strip()
+        answer_template = answer_template_match.group(1).strip()
 
         # find the place holder in the answer template
         place_holder_start = answer_template.find("<PLACEHOLDER>")
@@ -3,6 +3,8 @@
 
 import abc
 import asyncio
+import importlib
+from dataclasses import replace
 from registrable import Registrable
 from typing import (
     Callable,
@@ -15,21 +17,89 @@ from typing import (
     Iterable,
     AsyncGenerator,
     Awaitable,
-    Tuple
+    Tuple,
+    TYPE_CHECKING
 )
 # from langchain_openai import ChatOpenAI
 # from langchain_core.runnables.config import RunnableConfig
-from langchain_core.runnables.base import Runnable
+from langchain_core.runnables.base import Runnable, RunnableLambda
+from langchain_core.runnables.config import RunnableConfig
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.language_models.base import BaseLanguageModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.prompt_values import ChatPromptValue
 from ..example_selectors import ExampleSelector
-from ..states.base_states import BaseState
 from ..instances.instance import Instance, LLMResponse
+from ..parsers import BulkParsingMixin, ParseResult, ParsingFailure, OutputGrammar, LabelLogprobOutputParser
+from ..parsers.output_grammar import GuidedDecodingBackend
+from .manifest import STEP_MODULES
+
+if TYPE_CHECKING:
+    # only needed for annotations, the state channels import langgraph
+    from ..states.base_states import BaseState
+
+
+REASK_PROMPT = (
+    "Your previous response could not be parsed ({reason}). "
+    "Please answer again, strictly following the required output format."
+)
+
+SCORING_INSTRUCTION = (
+    "Do not explain your answer. Reply with exactly one of the following and nothing else: {labels}."
+)
+
+
+def _parse_responses(output_parser: Runnable, responses: List[Any], attempts: int) -> List[ParseResult]:
+    """ Turn a batch of LLM responses (or call exceptions) into `ParseResult`s. """
+
+    results: List[Optional[ParseResult]] = [None] * len(responses)
+    succeeded = [idx for idx, response in enumerate(responses) if not isinstance(response, Exception)]
+
+    for idx, response in enumerate(responses):
+        if isinstance(response, Exception):
+            results[idx] = ParseResult(ok=False, reason=f"{type(response).__name__}: {response}", attempts=attempts)
+
+    if isinstance(output_parser, BulkParsingMixin):
+        parsed = output_parser.parse_many([responses[idx] for idx in succeeded])
+    else:
+        parsed = [
+            ParseResult.from_output(output)
+            for output in output_parser.batch([responses[idx] for idx in succeeded], return_exceptions=True)
+        ]
+
+    for idx, result in zip(succeeded, parsed):
+        if not result.ok and result.text is None:
+            result = replace(result, text=responses[idx].content)
+        results[idx] = replace(result, attempts=attempts)
+
+    return results
 
 
 class Step(Registrable, abc.ABC):
+    
+    # bump whenever a change to the prompt or parser changes what the step's
+    # verdicts mean, so that memoized verdicts are not reused across it
+    __PROMPT_REVISION__ = 0
+    
     def __init__(self):
         super().__init__()
 
+    @classmethod
+    def by_name(cls, name: Text) -> type:
+        """ Steps in `STEP_MODULES` are imported (and so registered) here, on
+        first use, rather than with the package.
+        """
+        if cls is Step and name in STEP_MODULES:
+            importlib.import_module(STEP_MODULES[name], __package__)
+        return super().by_name(name)
+
+    @classmethod
+    def list_available(cls) -> List[Text]:
+        available = super().list_available()
+        if cls is Step:
+            available += [name for name in STEP_MODULES if name not in available]
+        return available
+
     @abc.abstractmethod
     def get_prompt_template(self) -> Runnable:
         """ """
@@ -40,19 +110,88 @@ class Step(Registrable, abc.ABC):
         """ """
         raise NotImplementedError   
     
-    def chain_llm(self, llm: BaseLanguageModel) -> Runnable:
-        """ Provided an LLM, chain it with the current step's prompt template and output parser. """
-        return self.get_prompt_template() | llm | self.get_output_parser()
+    def get_output_grammar(self) -> Optional[OutputGrammar]:
+        """ The grammar of the step's final output, if it is rigid enough to
+        be enforced with constrained decoding.
+        """
+        return None
+    
+    def chain_llm(
+        self,
+        llm: BaseLanguageModel,
+        guided_decoding: Optional[GuidedDecodingBackend] = None
+    ) -> Runnable:
+        """ Provided an LLM, chain it with the current step's prompt template and output parser.
+
+        If `guided_decoding` is set ("vllm" or "openai"), generation is constrained
+        to the step's output grammar on that backend.
+        """
+        if guided_decoding is None:
+            return self._named(self.get_prompt_template() | llm | self.get_output_parser())
+
+        grammar = self.get_output_grammar()
+        if grammar is None:
+            raise ValueError(f"{self.__class__.__name__} does not declare an output grammar.")
+
+        return self._named(self.get_prompt_template() | grammar.bind(llm, guided_decoding) | self.get_output_parser())
+
+    def _named(self, chain: Runnable) -> Runnable:
+        """ Run `chain` under the step's class name, which its nested runs inherit
+        as `step` metadata (so that e.g. instrumentation can attribute them).
+        """
+        name = self.__class__.__name__
+        return chain.with_config(run_name=name, metadata={"step": name})
+
+    def get_label_candidates(self) -> Optional[Tuple[Text, ...]]:
+        """ The labels a classification step chooses between, if its answer
+        can be scored from the logprobs of a single token. The labels must
+        differ in their first token.
+        """
+        return None
+
+    def get_scoring_instruction(self) -> Text:
+        """ Ends the instructions of the scoring prompt, to force a bare label. """
+        return SCORING_INSTRUCTION.format(labels=", ".join(self.get_label_candidates()))
+
+    def get_scoring_prompt_template(self) -> Runnable:
+        """ The prompt of scoring mode, after which the label has to be the first
+        token of the answer, so its examples (if any) are answered with bare labels.
+        """
+        raise ValueError(f"{self.__class__.__name__} does not declare a scoring prompt.")
+
+    def chain_llm_scoring(
+        self,
+        llm: BaseLanguageModel,
+        top_logprobs: int = 10,
+        temperature: float = 1.0
+    ) -> Runnable:
+        """ Like `chain_llm`, but instead of generating reasoning and an answer the
+        model emits a single label token, and the chain returns a
+        `LabelDistributionResponse` built from that token's `top_logprobs`.
+
+        `temperature` rescales the distribution for calibration and is unrelated
+        to the sampling temperature.
+        """
+        labels = self.get_label_candidates()
+        if labels is None:
+            raise ValueError(f"{self.__class__.__name__} does not declare label candidates.")
+
+        return self._named(
+            self.get_scoring_prompt_template()
+            | llm.bind(logprobs=True, top_logprobs=top_logprobs, max_tokens=1)
+            | LabelLogprobOutputParser(labels=labels, temperature=temperature)
+        )
     
     def induce_stated_callable(
         self, 
         llm: BaseLanguageModel,
-        parse_input: Callable[[BaseState], Dict[Text, Any]],
-        parse_output: Union[Callable[[LLMResponse], Dict[Text, Any]], Callable[[LLMResponse, BaseState], Dict[Text, Any]]]
-    ) -> Callable[[BaseState], BaseState]:
+        parse_input: Callable[["BaseState"], Dict[Text, Any]],
+        parse_output: Union[Callable[[LLMResponse], Dict[Text, Any]], Callable[[LLMResponse, "BaseState"], Dict[Text, Any]]],
+        guided_decoding: Optional[GuidedDecodingBackend] = None
+    ) -> Callable[["BaseState"], "BaseState"]:
         """ """
         
-        chained_runnable = self.chain_llm(llm)
+        chained_runnable = self.chain_llm(llm, guided_decoding=guided_decoding)
 
         # TODO: whether we want to passdown type hints
         def _callable(state):
@@ -65,6 +204,87 @@ class Step(Registrable, abc.ABC):
             return parse_output(output) if len(parse_output.__code__.co_varnames) == 1 else parse_output(output, state)
         
         return _callable
+
+    def get_reask_messages(self, result: ParseResult) -> List[BaseMessage]:
+        """ Messages appended to the original prompt when re-asking a failed item. """
+        if result.text is None:
+            # the call itself failed, so we just send the same prompt again
+            return []
+
+        return [
+            AIMessage(content=result.text),
+            HumanMessage(content=REASK_PROMPT.format(reason=result.reason))
+        ]
+
+    def batch_with_reask(
+        self,
+        llm: BaseLanguageModel,
+        inputs: List[Dict[Text, Any]],
+        config: Optional[RunnableConfig] = None,
+        max_reasks: int = 1
+    ) -> List[ParseResult]:
+        """ Run the step over `inputs` without letting a single malformed
+        response fail the batch. Items that fail to parse are re-asked (and only those)
+        in follow-up mini-batches, up to `max_reasks` times, and every item
+        comes back as a `ParseResult` in input order.
+        """
+
+        conversations = [
+            prompt_value.to_messages() for prompt_value in self.get_prompt_template().batch(inputs, config)
+        ]
+        output_parser = self.get_output_parser()
+        results: List[Optional[ParseResult]] = [None] * len(inputs)
+        pending = list(range(len(inputs)))
+
+        for attempts in range(1, max_reasks + 2):
+            responses = llm.batch([conversations[idx] for idx in pending], config, return_exceptions=True)
+            pending = self._collect_reask_round(output_parser, conversations, results, pending, responses, attempts)
+            if not pending:
+                break
+
+        return results
+
+    async def abatch_with_reask(
+        self,
+        llm: BaseLanguageModel,
+        inputs: List[Dict[Text, Any]],
+        config: Optional[RunnableConfig] = None,
+        max_reasks: int = 1
+    ) -> List[ParseResult]:
+        """ Async version of `batch_with_reask`. """
+
+        conversations = [
+            prompt_value.to_messages() for prompt_value in await self.get_prompt_template().abatch(inputs, config)
+        ]
+        output_parser = self.get_output_parser()
+        results: List[Optional[ParseResult]] = [None] * len(inputs)
+        pending = list(range(len(inputs)))
+
+        for attempts in range(1, max_reasks + 2):
+            responses = await llm.abatch([conversations[idx] for idx in pending], config, return_exceptions=True)
+            pending = self._collect_reask_round(output_parser, conversations, results, pending, responses, attempts)
+            if not pending:
+                break
+
+        return results
+
+    def _collect_reask_round(
+        self,
+        output_parser: Runnable,
+        conversations: List[List[BaseMessage]],
+        results: List[Optional[ParseResult]],
+        pending: List[int],
+        responses: List[Any],
+        attempts: int
+    ) -> List[int]:
+        """ Store this round's results in place and return the indices that still need a re-ask. """
+
+        for idx, result in zip(pending, _parse_responses(output_parser, responses, attempts)):
+            results[idx] = result
+            if not result.ok:
+                conversations[idx] = conversations[idx] + self.get_reask_messages(result)
+
+        return [idx for idx in pending if not results[idx].ok]
     
     
 class FewShotStep(Step):
@@ -73,4 +293,25 @@ class FewShotStep(Step):
         example_selector: Optional[ExampleSelector] = None
     ):
         super().__init__()
-        self._example_selector = example_selector
\ No newline at end of file
+        self._example_selector = example_selector
+
+    def _label_prompt_template(
+        self,
+        instruction: Text,
+        query: Text,
+        label: Callable[[Dict[Text, Any]], Text]
+    ) -> Runnable:
+        """ A scoring prompt: the `instruction` as system message, then the selected
+        examples as `query` turns answered with their bare `label`, then the `query`.
+        """
+        query_template = ChatPromptTemplate.from_messages([("human", query)])
+
+        def _prompt(inputs: Dict[Text, Any]) -> ChatPromptValue:
+            messages: List[BaseMessage] = [SystemMessage(content=instruction)]
+            for example in self._example_selector.select_examples(inputs):
+                messages.extend(query_template.format_messages(**example))
+                messages.append(AIMessage(content=label(example)))
+            messages.extend(query_template.format_messages(**inputs))
+            return ChatPromptValue(messages=messages)
+
+        return RunnableLambda(_prompt)
\ No newline at end of file
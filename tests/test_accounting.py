@@ -0,0 +1,81 @@
+""" Offline tests for token and cost accounting. """
+
+import asyncio
+import unittest
+from langchain_core.caches import InMemoryCache
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration
+from langchain_interface.instrumentation import ModelPrice, TokenAccountant, account
+from langchain_interface.interfaces.bird.prob_inference_interface import BIRDProbInferenceInterface
+from langchain_interface.models.chat_models import ChatOpenAIWithBatchAPI, ReplayChatModel
+from benchmarks.record_fixtures import DEFAULT_RECORDINGS, bird_inputs, load_scenarios
+
+
+_PRICES = {
+    "gpt-4o": ModelPrice(prompt=2., completion=8., cached_prompt=1.),
+    "gpt-4o-mini": ModelPrice(prompt=.2, completion=.8),
+}
+
+
+class TestAccounting(unittest.TestCase):
+
+    def test_cost(self):
+        accountant = TokenAccountant(prices=_PRICES)
+        usage = {"input_tokens": 1000, "output_tokens": 100, "total_tokens": 1100, "input_token_details": {"cache_read": 400}}
+
+        accountant.record(AIMessage(content="", usage_metadata=usage, response_metadata={"model_name": "gpt-4o-2024-08-06"}), {"step": "A"})
+        accountant.record(AIMessage(content="", usage_metadata=usage, response_metadata={"model_name": "gpt-4o-mini", "batch_api": True}), {"step": "B"})
+        accountant.record(AIMessage(content="", usage_metadata={**usage, "total_cost": 0}, response_metadata={"model_name": "gpt-4o"}), {"step": "A"})
+        accountant.record(AIMessage(content="", usage_metadata=usage, response_metadata={"model_name": "local"}))
+
+        by_step = accountant.by("step")
+        self.assertAlmostEqual(by_step["A"].cost, (600 * 2. + 400 * 1. + 100 * 8.) / 1e6)
+        self.assertEqual(by_step["A"].calls, 2)
+        self.assertEqual(by_step["A"].cached_prompt_tokens, 800)
+        # the longest matching prefix, at the batch discount
+        self.assertAlmostEqual(by_step["B"].cost, (1000 * .2 + 100 * .8) / 1e6 * .5)
+        self.assertEqual(accountant.by("mode")["cached"].cost, 0.)
+        self.assertEqual(accountant.unpriced_models, {"local"})
+        self.assertEqual(accountant.total().prompt_tokens, 4000)
+
+    def test_rows_and_nodes(self):
+        scenarios = load_scenarios()[:2]
+        llm = ReplayChatModel.from_file(DEFAULT_RECORDINGS, model_name="gpt-4o")
+
+        with account(prices=_PRICES) as accountant:
+            BIRDProbInferenceInterface().run_dataset(llm, [bird_inputs(scenario) for scenario in scenarios], progress=False)
+
+        by_row = accountant.by("row")
+        self.assertEqual(set(by_row), {0, 1})
+        self.assertGreater(by_row[0].cost, 0.)
+        self.assertAlmostEqual(sum(usage.cost for usage in by_row.values()), accountant.total().cost)
+
+        by_node = accountant.by("node")
+        self.assertEqual(by_node["sentence_sampling_o1"].calls, 2)
+        self.assertEqual(accountant.by("row", "step")[(0, "BIRDSummarizeToFactorStep")].calls, 1)
+
+        # nothing is recorded outside of the context
+        calls = accountant.total().calls
+        ReplayChatModel(responses=["Hello."], model_name="gpt-4o").invoke([HumanMessage(content="Hi.")])
+        self.assertEqual(accountant.total().calls, calls)
+
+    def test_batch_api_cache_hits(self):
+        llm = ChatOpenAIWithBatchAPI(api_key="sk-test", model="gpt-4o-mini", cache=InMemoryCache())
+        llm.cache.update(
+            dumps([HumanMessage(content="Hi.")]),
+            llm._get_llm_string(stop=None),
+            [ChatGeneration(message=AIMessage(
+                content="Hello.",
+                usage_metadata={"input_tokens": 10, "output_tokens": 2, "total_tokens": 12},
+                response_metadata={"model_name": "gpt-4o-mini", "batch_api": True}
+            ))]
+        )
+
+        with account(prices=_PRICES) as accountant:
+            asyncio.run(llm.abatch(["Hi."], config={"configurable": {}, "metadata": {"row": 3, "step": "A"}}))
+
+        self.assertEqual(accountant.to_records(), [{
+            "model": "gpt-4o-mini", "mode": "cached", "step": "A", "node": "", "row": 3,
+            "calls": 1, "prompt_tokens": 10, "completion_tokens": 2, "cached_prompt_tokens": 0, "cost": 0.
+        }])
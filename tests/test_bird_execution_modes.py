@@ -0,0 +1,276 @@
+""" Offline tests that the latency-only BIRD execution modes give the results of
+the default graph on the same (replayed) completions.
+"""
+
+import asyncio
+import math
+import threading
+import time
+import unittest
+from typing import List, Text
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_interface.models.chat_models import ReplayChatModel
+from langchain_interface.parsers import first_fenced_block
+from langchain_interface.interfaces.bird.prob_inference_interface import BIRDProbInferenceInterface
+from benchmarks.record_fixtures import DEFAULT_RECORDINGS, _ScriptedBIRDModel, bird_inputs, load_scenarios
+
+
+_MODES = {
+    "pipelined": {"pipelined": True},
+    "speculative": {"speculative_support": True},
+    "pipelined, at most 2 checks at once": {"pipelined": True, "max_concurrency": 2},
+}
+
+_COMPARED_KEYS = ["implied_value_check", "direction_value_check", "filtered_factor_names"]
+
+
+class _CountingReplayChatModel(ReplayChatModel):
+
+    # appended to from the threads of a run, which `+= 1` would race on
+    prompts: List[Text] = []
+
+    @property
+    def num_calls(self) -> int:
+        return len(self.prompts)
+
+    def _completion(self, messages):
+        self.prompts.append(messages[-1].content)
+        return super()._completion(messages)
+
+
+class _ChatModelStarts(BaseCallbackHandler):
+    """ Records the metadata of every chat model run it is handed down to. """
+
+    def __init__(self):
+        self.metadata = []
+        self._lock = threading.Lock()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        with self._lock:
+            self.metadata.append(metadata or {})
+
+
+class TestBIRDExecutionModes(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._recordings = ReplayChatModel.from_file(DEFAULT_RECORDINGS).recordings
+        cls._inputs = [bird_inputs(scenario) for scenario in load_scenarios()]
+        cls._expected = BIRDProbInferenceInterface().get_runnable(cls._llm()).batch(cls._inputs)
+
+    @classmethod
+    def _llm(cls):
+        return ReplayChatModel(recordings=cls._recordings)
+
+    def _assert_same_results(self, outputs, tolerance=None):
+        for inputs, output, expected in zip(self._inputs, outputs, self._expected):
+            with self.subTest(scenario=inputs["scenario"]):
+                if tolerance is not None:
+                    self.assertLessEqual(abs(output['final_score'] - expected['final_score']), tolerance)
+                    continue
+                self.assertAlmostEqual(output['final_score'], expected['final_score'], places=6)
+                for key in _COMPARED_KEYS:
+                    self.assertEqual(output[key], expected[key], key)
+
+    def test_modes(self):
+        for name, kwargs in _MODES.items():
+            runnable = BIRDProbInferenceInterface(**kwargs).get_runnable(self._llm())
+            with self.subTest(mode=name):
+                self._assert_same_results([runnable.invoke(inputs) for inputs in self._inputs])
+
+    def test_modes_async(self):
+        for name, kwargs in _MODES.items():
+            runnable = BIRDProbInferenceInterface(**kwargs).get_runnable(self._llm())
+            with self.subTest(mode=name):
+                self._assert_same_results(asyncio.run(runnable.abatch(self._inputs)))
+
+    def test_pruning_stays_within_tolerance(self):
+        for tolerance in [0., .2]:
+            runnable = BIRDProbInferenceInterface(prune_tolerance=tolerance).get_runnable(self._llm())
+            with self.subTest(tolerance=tolerance):
+                self._assert_same_results([runnable.invoke(inputs) for inputs in self._inputs], tolerance=tolerance)
+                self._assert_same_results(asyncio.run(runnable.abatch(self._inputs)), tolerance=tolerance)
+
+    def test_speculation_report(self):
+        runnable = BIRDProbInferenceInterface(speculative_support=True).get_runnable(self._llm())
+
+        for inputs, expected in zip(self._inputs, self._expected):
+            report = runnable.invoke(inputs)['speculation_report']
+            self.assertEqual(report.speculative_checks, len(expected['direction_value_check']))
+            self.assertEqual(
+                report.not_implied_checks,
+                sum(score < .5 for score in expected['implied_value_check'].values())
+            )
+
+
+class TestBIRDRunContext(unittest.TestCase):
+    """ Checks run in worker threads or tasks in some modes; the callbacks and
+    metadata of the run have to reach them all the same.
+    """
+
+    def _starts(self, invoke, **kwargs) -> List[dict]:
+        starts = _ChatModelStarts()
+        runnable = BIRDProbInferenceInterface(**kwargs).get_runnable(ReplayChatModel.from_file(DEFAULT_RECORDINGS))
+        invoke(runnable, bird_inputs(load_scenarios()[0]), {"callbacks": [starts], "metadata": {"job": "test"}})
+        return starts.metadata
+
+    def test_checks_inherit_the_run_config(self):
+        expected = self._starts(lambda runnable, inputs, config: runnable.invoke(inputs, config))
+
+        for name, kwargs in {**_MODES, "streamed factors": {"stream_factors": True}}.items():
+            for invoke in [
+                lambda runnable, inputs, config: runnable.invoke(inputs, config),
+                lambda runnable, inputs, config: asyncio.run(runnable.ainvoke(inputs, config)),
+            ]:
+                with self.subTest(mode=name):
+                    metadata = self._starts(invoke, **kwargs)
+                    self.assertEqual(len(metadata), len(expected))
+                    self.assertTrue(all(item.get("job") == "test" and item.get("step") for item in metadata))
+
+
+class TestBIRDPruning(unittest.TestCase):
+
+    def test_early_exit_cancels_queued_checks(self):
+        recordings = ReplayChatModel.from_file(DEFAULT_RECORDINGS).recordings
+        tolerance = .8
+
+        for scenario in load_scenarios():
+            inputs = bird_inputs(scenario)
+            expected = BIRDProbInferenceInterface().get_runnable(ReplayChatModel(recordings=recordings)).invoke(inputs)
+            llm = _CountingReplayChatModel(recordings=recordings, latency=.02)
+            # one check at a time, so that most of them are still queued when the score is settled enough
+            runnable = BIRDProbInferenceInterface(prune_tolerance=tolerance, max_concurrency=1).get_runnable(llm)
+
+            with self.subTest(scenario=scenario["scenario"]):
+                output = runnable.invoke(inputs)
+                num_calls = llm.num_calls
+                report = output['pruning_report']
+
+                self.assertTrue(report.early_exit)
+                self.assertGreater(report.cancelled_checks, 0)
+                self.assertLessEqual(report.score_bounds[1] - report.score_bounds[0], tolerance)
+                self.assertLessEqual(abs(output['final_score'] - expected['final_score']), tolerance)
+                self.assertLess(len(output['responses']), len(expected['responses']))
+
+                # the queued checks are never sent, even after the node returned
+                time.sleep(.1)
+                self.assertEqual(llm.num_calls, num_calls)
+
+    def _pruned_runs(self, scenario, **kwargs):
+        """ The default and the pruned (one check at a time, sync and async) outputs of
+        a scenario, with the models that answered the pruned runs.
+        """
+        recordings = ReplayChatModel.from_file(DEFAULT_RECORDINGS).recordings
+        default_llm = _CountingReplayChatModel(recordings=recordings)
+        expected = BIRDProbInferenceInterface().get_runnable(default_llm).invoke(bird_inputs(scenario))
+        
+        runs = {}
+        for mode in ["sync", "async"]:
+            # the reevaluation prompt leaves out the values whose implication checks were
+            # cancelled, "{}" keeps every verdict as the recorded reevaluations do
+            llm = _CountingReplayChatModel(recordings=recordings, responses=["{}"], latency=.02)
+            runnable = BIRDProbInferenceInterface(prune_tolerance=0., max_concurrency=1, **kwargs).get_runnable(llm)
+            output = runnable.invoke(bird_inputs(scenario)) if mode == "sync" else asyncio.run(runnable.ainvoke(bird_inputs(scenario)))
+            runs[mode] = (output, llm)
+        
+        return expected, default_llm.num_calls, runs
+    
+    def test_not_implied_factors_skip_their_support_checks(self):
+        for scenario in load_scenarios():
+            expected, num_calls, runs = self._pruned_runs(scenario)
+            not_implied = [
+                value.name for factor in expected['factors'] for value in factor.values
+                if not any(expected['implied_value_check'][value.name] for value in factor.values)
+            ]
+            
+            for mode, (output, llm) in runs.items():
+                with self.subTest(scenario=scenario["scenario"], mode=mode):
+                    self.assertAlmostEqual(output['final_score'], expected['final_score'], places=6)
+                    self.assertEqual(output['filtered_factor_names'], expected['filtered_factor_names'])
+                    # their support checks are queued behind the implication checks
+                    self.assertEqual(output['pruning_report'].cancelled_checks, len(not_implied))
+                    self.assertFalse(set(not_implied) & set(output['direction_value_check']))
+                    if mode == "sync":
+                        self.assertEqual(llm.num_calls, num_calls - len(not_implied))
+    
+    def test_one_sided_factors_skip_their_implication_checks(self):
+        for scenario in load_scenarios():
+            expected, _, runs = self._pruned_runs(scenario, speculative_support=True)
+            one_sided = [
+                factor for factor in expected['factors']
+                if len({expected['direction_value_check'][value.name] for value in factor.values}) == 1
+            ]
+            
+            for mode, (output, llm) in runs.items():
+                with self.subTest(scenario=scenario["scenario"], mode=mode):
+                    self.assertAlmostEqual(output['final_score'], expected['final_score'], places=6)
+                    self.assertEqual(output['filtered_factor_names'], expected['filtered_factor_names'])
+                    self.assertGreaterEqual(output['pruning_report'].cancelled_checks, len(one_sided))
+                    # the implication check right behind the factor's last support check may
+                    # already be running, the rest are cancelled
+                    for factor in one_sided:
+                        self.assertFalse(all(value.name in output['implied_value_check'] for value in factor.values), factor.name)
+                    self.assertLessEqual(llm.num_misses, 1)
+    
+    def test_bounds_with_many_factors(self):
+        """ 3 ** 20 joint assignments: the bounds are marginalized within the budget. """
+        scenario = load_scenarios()[0]
+        scenario = {**scenario, "factors": {f"Factor {fidx}": [f"Value {fidx}.{vidx} holds" for vidx in range(3)] for fidx in range(20)}}
+        llm = _ScriptedBIRDModel(scenarios=[scenario])
+
+        start = time.perf_counter()
+        output = BIRDProbInferenceInterface(prune_tolerance=.2).get_runnable(llm).invoke(bird_inputs(scenario))
+
+        self.assertLess(time.perf_counter() - start, 30.)
+        self.assertEqual(output['marginalization_method'], "monte-carlo")
+        lower, upper = output['pruning_report'].score_bounds
+        self.assertLessEqual(lower, upper)
+
+
+class _ScoredBIRDModel(_ScriptedBIRDModel):
+    """ Scores the implication and support checks from canned logprobs: .8 on the
+    scripted verdict, .15 on the other label and .05 on a fence.
+    """
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        step = (run_manager.metadata if run_manager is not None else {}).get("step")
+        if step not in ("BIRDImplicationCheckStep", "BIRDSentenceSupportDeterminationStep"):
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        # "```true```" -> "true", "```Outcome 1```" -> "1"
+        label = first_fenced_block(self._answer(step, messages[-1].content)).content.split()[-1]
+        top_logprobs = [
+            {"token": token, "logprob": math.log(prob)}
+            for token, prob in [(label, .8), ({"true": "false", "false": "true", "1": "2", "2": "1"}[label], .15), ("```", .05)]
+        ]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(
+            content=label,
+            response_metadata={"logprobs": {"content": [{**top_logprobs[0], "top_logprobs": top_logprobs}]}}
+        ))])
+
+
+class TestBIRDLogprobMode(unittest.TestCase):
+
+    def test_scored_checks(self):
+        scenarios = load_scenarios()
+        inputs = [bird_inputs(scenario) for scenario in scenarios]
+        generated = BIRDProbInferenceInterface().get_runnable(_ScriptedBIRDModel(scenarios=scenarios)).batch(inputs)
+        scored = BIRDProbInferenceInterface(classification_mode="logprob").get_runnable(_ScoredBIRDModel(scenarios=scenarios)).batch(inputs)
+
+        for scenario, generated_output, scored_output in zip(scenarios, generated, scored):
+            with self.subTest(scenario=scenario["scenario"]):
+                for output in [generated_output, scored_output]:
+                    self.assertTrue(all(isinstance(score, float) for score in output['implied_value_check'].values()))
+                # the scored labels agree with the generated ones
+                self.assertEqual(
+                    {value_name: round(score) for value_name, score in scored_output['implied_value_check'].items()},
+                    generated_output['implied_value_check']
+                )
+                # the fence's mass is dropped
+                for score in scored_output['implied_value_check'].values():
+                    self.assertTrue(math.isclose(score, .8 / .95) or math.isclose(score, .15 / .95), score)
+                self.assertEqual(scored_output['direction_value_check'], generated_output['direction_value_check'])
+                self.assertEqual(scored_output['filtered_factor_names'], generated_output['filtered_factor_names'])
+                self.assertTrue(0. <= scored_output['final_score'] <= 1.)
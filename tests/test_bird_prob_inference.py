@@ -62,4 +62,31 @@ class TestBIRDProbInference(TestCase):
         print("\nDirection value check:") 
         json.dump(state['direction_value_check'], sys.stdout, indent=4)
         print("\nScore:")
-        json.dump(state['final_score'], sys.stdout, indent=4)
\ No newline at end of file
+        json.dump(state['final_score'], sys.stdout, indent=4)
+        
+    def test_bird_prob_inference_pipelined(self):
+        test_case = self._test_cases[2]
+        state = BIRDProbInferenceInterface(pipelined=True).get_runnable(self._llm).invoke(input=test_case)
+        
+        print("\nStage timings:")
+        json.dump({stage: end - start for stage, (start, end) in state['stage_timings'].items()}, sys.stdout, indent=4)
+        print("\nScore:")
+        json.dump(state['final_score'], sys.stdout, indent=4)
+        
+    def test_bird_prob_inference_speculative(self):
+        test_case = self._test_cases[2]
+        state = BIRDProbInferenceInterface(speculative_support=True).get_runnable(self._llm).invoke(input=test_case)
+        
+        print("\nSpeculation report:")
+        json.dump(state['speculation_report'].to_dict(), sys.stdout, indent=4)
+        print("\nScore:")
+        json.dump(state['final_score'], sys.stdout, indent=4)
+        
+    def test_bird_prob_inference_pruned(self):
+        test_case = self._test_cases[2]
+        state = BIRDProbInferenceInterface(prune_tolerance=.05, max_concurrency=4).get_runnable(self._llm).invoke(input=test_case)
+        
+        print("\nPruning report:")
+        json.dump(state['pruning_report'].to_dict(), sys.stdout, indent=4)
+        print("\nScore:")
+        json.dump(state['final_score'], sys.stdout, indent=4)
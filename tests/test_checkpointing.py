@@ -0,0 +1,128 @@
+""" Offline tests for the instance codec and checkpointed interfaces. """
+
+import os
+import tempfile
+import unittest
+from dataclasses import dataclass
+from typing import Annotated, List, Optional, Tuple
+from typing_extensions import TypedDict
+from langchain_core.messages import AIMessage
+from langgraph.graph import StateGraph, START, END
+from langchain_interface.instances.codec import InstanceCodec
+from langchain_interface.instances.instance import LLMResponse
+from langchain_interface.interfaces.interface import Interface
+from langchain_interface.checkpointers import SQLiteCheckpointSaver
+from langchain_interface.models.chat_models import ReplayChatModel
+from langchain_interface.interfaces.bird.prob_inference_interface import BIRDProbInferenceInterface
+from langchain_interface.states.base_states import append
+from benchmarks.record_fixtures import DEFAULT_RECORDINGS, bird_inputs, load_scenarios
+
+
+@dataclass(frozen=True, eq=True)
+class _Response(LLMResponse):
+    span: Tuple[float, float]
+    children: List["_Response"]
+
+
+class _CountingState(TypedDict):
+    text: str
+    responses: Annotated[list, append]
+    final: Optional[str]
+
+
+class _FlakyInterface(Interface):
+    """ Two nodes, the second of which fails while `failing` is set. """
+
+    def __init__(self, checkpointer=None):
+        super().__init__(checkpointer=checkpointer)
+        self.calls = []
+        self.failing = True
+
+    def get_runnable(self, llm=None):
+
+        def _first(state):
+            self.calls.append("first")
+            return {"responses": f"first {state['text']}"}
+
+        def _second(state):
+            self.calls.append("second")
+            if self.failing:
+                raise RuntimeError("crash")
+            return {"final": state['text'].upper()}
+
+        graph_builder = StateGraph(_CountingState)
+        graph_builder.add_node("first", _first)
+        graph_builder.add_node("second", _second)
+        graph_builder.add_edge(START, "first")
+        graph_builder.add_edge("first", "second")
+        graph_builder.add_edge("second", END)
+
+        return self.compile_graph(
+            graph_builder,
+            lambda input: {"text": input['text'], "responses": [], "final": None},
+            self.checkpoint_namespace(llm)
+        )
+
+
+class TestInstanceCodec(unittest.TestCase):
+
+    def test_round_trip(self):
+        codec = InstanceCodec()
+        value = {
+            "responses": [_Response(messages="a", span=(0., 1.), children=[_Response(messages="b", span=(1., 2.), children=[])])],
+            "spans": {"stage": (0.5, 1.5)},
+        }
+
+        encoded = codec.dumps_typed(value)
+        self.assertEqual(encoded[0], "instance-msgpack")
+        self.assertEqual(codec.loads_typed(encoded), value)
+
+        # messages are not dataclasses, so they go through the fallback serializer
+        message = codec.dumps_typed([AIMessage(content="x")])
+        self.assertNotEqual(message[0], "instance-msgpack")
+        self.assertEqual(codec.loads_typed(message)[0].content, "x")
+
+
+class TestCheckpointedInterface(unittest.TestCase):
+
+    def test_resume_from_last_completed_node(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoints.db")
+            interface = _FlakyInterface(checkpointer=SQLiteCheckpointSaver(path))
+
+            with self.assertRaises(RuntimeError):
+                interface.get_runnable().invoke({"text": "hi"})
+
+            # a fresh process: same database, same input
+            resumed = _FlakyInterface(checkpointer=SQLiteCheckpointSaver(path))
+            resumed.failing = False
+            output = resumed.get_runnable().invoke({"text": "hi"})
+
+            self.assertEqual(interface.calls, ["first", "second"])
+            self.assertEqual(resumed.calls, ["second"])
+            self.assertEqual(output['final'], "HI")
+            self.assertEqual(output['responses'], ["first hi"])
+
+            # finished runs are returned without running anything
+            self.assertEqual(resumed.get_runnable().invoke({"text": "hi"})['final'], "HI")
+            self.assertEqual(resumed.calls, ["second"])
+
+    def test_threads_are_kept_apart_by_model_and_options(self):
+        inputs = bird_inputs(load_scenarios()[0])
+
+        with tempfile.TemporaryDirectory() as directory:
+            saver = SQLiteCheckpointSaver(os.path.join(directory, "checkpoints.db"))
+            recorded = ReplayChatModel.from_file(DEFAULT_RECORDINGS)
+            score = BIRDProbInferenceInterface(checkpointer=saver).get_runnable(recorded).invoke(inputs)['final_score']
+
+            # the same model and options get the stored run back without calls
+            replayed = ReplayChatModel(recordings=recorded.recordings)
+            self.assertEqual(BIRDProbInferenceInterface(checkpointer=saver).get_runnable(replayed).invoke(inputs)['final_score'], score)
+
+            # another model runs the scenario from scratch (and misses every recording)
+            with self.assertRaises(ValueError):
+                BIRDProbInferenceInterface(checkpointer=saver).get_runnable(ReplayChatModel()).invoke(inputs)
+
+            # and so do other options
+            pruned = BIRDProbInferenceInterface(checkpointer=saver, prune_tolerance=.2).get_runnable(replayed).invoke(inputs)
+            self.assertIsNotNone(pruned['pruning_report'])
@@ -0,0 +1,94 @@
+""" Offline tests for metrics and span recording. """
+
+import json
+import os
+import tempfile
+import unittest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_interface.instrumentation import (
+    MetricsRegistry,
+    JSONLinesSpanExporter,
+    instrument,
+    increment
+)
+from langchain_interface.memo_stores import InMemoryMemoStore
+from langchain_interface.parsers import ParsingFailure
+from langchain_interface.steps.bird.implication_check_step import (
+    BIRDImplicationCheckStep,
+    BIRDImplicationCheckResponse
+)
+from langchain_interface.steps.bird.grouped_implication_check_step import BIRDGroupedImplicationCheckStep
+
+
+def _llm(*contents):
+    return GenericFakeChatModel(messages=iter([
+        AIMessage(content=content, usage_metadata={"input_tokens": 10, "output_tokens": 3, "total_tokens": 13})
+        for content in contents
+    ]))
+
+
+_INPUTS = {"scenario": "It rains.", "condition": "Clouds gather.", "statement": "The ground is wet."}
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_prometheus_text(self):
+        metrics = MetricsRegistry(buckets=(.1, 1.))
+        metrics.increment("calls_total", step="a")
+        metrics.increment("calls_total", 2, step="a")
+        for value in [.05, .5, 5.]:
+            metrics.observe("latency_seconds", value, step="a \"b\"")
+
+        text = metrics.to_prometheus()
+        self.assertIn('langchain_interface_calls_total{step="a"} 3', text)
+        self.assertIn('langchain_interface_latency_seconds_bucket{step="a \\"b\\"",le="0.1"} 1', text)
+        self.assertIn('langchain_interface_latency_seconds_bucket{step="a \\"b\\"",le="+Inf"} 3', text)
+        self.assertIn('langchain_interface_latency_seconds_count{step="a \\"b\\""} 3', text)
+
+    def test_step_metrics(self):
+        step = BIRDImplicationCheckStep()
+        chain = InMemoryMemoStore().memoize(step.chain_llm(_llm("```true```", "```false```")), "implication", BIRDImplicationCheckResponse)
+        grouped_chain = BIRDGroupedImplicationCheckStep().chain_llm(_llm("no json"))
+
+        with instrument() as metrics:
+            chain.invoke(_INPUTS)
+            chain.invoke(_INPUTS)
+            chain.invoke({**_INPUTS, "statement": "The sun shines."})
+            with self.assertRaises(ParsingFailure):
+                grouped_chain.invoke({"scenario": "It rains.", "condition": "Clouds gather.", "statements": json.dumps(["The ground is wet."])})
+
+        name = "BIRDImplicationCheckStep"
+        self.assertEqual(metrics.histogram("step_latency_seconds", step=name).count, 2)
+        self.assertEqual(metrics.histogram("prompt_render_seconds", step=name).count, 2)
+        self.assertEqual(metrics.counter("llm_calls_total", step=name), 2)
+        self.assertEqual(metrics.counter("prompt_tokens_total", step=name), 20)
+        self.assertEqual(metrics.counter("completion_tokens_total", step=name), 6)
+        self.assertEqual(metrics.counter("parse_failures_total", step=name), 0)
+        self.assertEqual(metrics.counter("parse_failures_total", step="BIRDGroupedImplicationCheckStep"), 1)
+        self.assertAlmostEqual(metrics.cache_hit_ratio("memo"), 1 / 3)
+
+    def test_disabled_outside_of_context(self):
+        step = BIRDImplicationCheckStep()
+        with instrument() as metrics:
+            pass
+        step.chain_llm(_llm("```true```")).invoke(_INPUTS)
+        increment("cache_lookups_total", cache="memo", result="hit")
+        self.assertEqual(metrics.to_prometheus(), "\n")
+
+    def test_spans(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "spans.jsonl")
+            with instrument(span_exporter=JSONLinesSpanExporter(path)):
+                BIRDImplicationCheckStep().chain_llm(_llm("```true```")).invoke(_INPUTS)
+
+            with open(path, "r", encoding="utf-8") as file_:
+                spans = [json.loads(line) for line in file_]
+
+        root = [span for span in spans if not span['parentSpanId']]
+        self.assertEqual([span['name'] for span in root], ["BIRDImplicationCheckStep"])
+        self.assertEqual({span['traceId'] for span in spans}, {root[0]['traceId']})
+        self.assertEqual(
+            sorted(attribute['value']['stringValue'] for span in spans for attribute in span['attributes'] if attribute['key'] == "langchain_interface.kind"),
+            ["llm", "parser", "prompt", "step"]
+        )
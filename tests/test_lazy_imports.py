@@ -0,0 +1,80 @@
+""" Importing the packages should not import the modules (and dependencies) of
+every step, interface and example selector.
+"""
+
+import importlib
+import importlib.util
+import json
+import os
+import pkgutil
+import subprocess
+import sys
+import unittest
+from langchain_interface import steps, example_selectors
+from langchain_interface.steps.step import Step
+from langchain_interface.steps.manifest import STEP_MODULES
+from langchain_interface.example_selectors.example_selector import ExampleSelector, SELECTOR_MODULES
+
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_HEAVY_MODULES = ["langchain_interface.steps.step", "rank_bm25", "langgraph", "tqdm"]
+
+
+def _loaded_after(statement):
+    """ The modules (among `_HEAVY_MODULES` and the step modules) loaded by
+    `statement` in a fresh interpreter.
+    """
+    code = (
+        "import json, sys\n"
+        f"{statement}\n"
+        "print(json.dumps(sorted(name for name in sys.modules if name.startswith(('langchain_interface', 'rank_bm25', 'langgraph', 'tqdm')))))"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code], cwd=_ROOT, capture_output=True, text=True, check=True
+    )
+    return set(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+
+def _registered_modules(registrable_cls, package):
+    """ name -> module of every registered class, after importing all of `package`. """
+    for module_info in pkgutil.walk_packages(package.__path__, package.__name__ + "."):
+        importlib.import_module(module_info.name)
+    return {name: subclass.__module__ for name, subclass in registrable_cls._registry[registrable_cls].items()}
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_step_manifest(self):
+        self.assertEqual(
+            {name: importlib.util.resolve_name(module, steps.__name__) for name, module in STEP_MODULES.items()},
+            _registered_modules(Step, steps)
+        )
+
+    def test_selector_manifest(self):
+        self.assertEqual(
+            {name: importlib.util.resolve_name(module, example_selectors.__name__) for name, module in SELECTOR_MODULES.items()},
+            _registered_modules(ExampleSelector, example_selectors)
+        )
+
+    def test_package_imports(self):
+        loaded = _loaded_after(
+            "import langchain_interface.steps, langchain_interface.interfaces, langchain_interface.example_selectors"
+        )
+        self.assertFalse(loaded & set(_HEAVY_MODULES))
+
+    def test_by_name(self):
+        loaded = _loaded_after("from langchain_interface.steps import Step; Step.by_name('decompose')")
+        self.assertIn("langchain_interface.steps.decomposition_step", loaded)
+        self.assertFalse(loaded & {"langchain_interface.steps.evidential_support_step", "rank_bm25", "langgraph"})
+
+    def test_attributes(self):
+        from langchain_interface.steps import DecompositionStep
+        from langchain_interface.steps.decomposition_step import DecompositionStep as Defined
+
+        self.assertIs(DecompositionStep, Defined)
+        self.assertIn("DecompositionStep", dir(steps))
+        with self.assertRaises(AttributeError):
+            steps.NoSuchStep
+
+    def test_list_available(self):
+        self.assertEqual(set(Step.list_available()), set(STEP_MODULES))
@@ -0,0 +1,108 @@
+""" Offline tests for BIRD marginalization. """
+
+import os
+import tempfile
+import unittest
+import numpy
+from dataclasses import replace
+from itertools import product
+from langchain_interface.interfaces.bird.marginalization import (
+    marginalize,
+    marginalize_batch,
+    marginalize_exact,
+    marginalize_monte_carlo,
+    pad_batch
+)
+from langchain_interface.interfaces.bird.run_record import BIRDRunRecord, save_records, load_records
+from langchain_interface.interfaces.bird import BIRDProbInferenceInterface
+
+
+def _brute_force(value_dists, supportiveness) -> float:
+    marginalized = 0.
+    for indices in product(*[range(len(dist)) for dist in value_dists]):
+        probs = numpy.array([support[index] for index, support in zip(indices, supportiveness)])
+        po_given_f = numpy.prod(probs) / (numpy.prod(probs) + numpy.prod(1 - probs))
+        marginalized += po_given_f * numpy.prod([dist[index] for index, dist in zip(indices, value_dists)])
+    return marginalized
+
+
+class TestMarginalization(unittest.TestCase):
+
+    def setUp(self):
+        rng = numpy.random.default_rng(0)
+        self.value_dists = [rng.dirichlet(numpy.ones(size)) for size in (2, 3, 2, 4)]
+        self.supportiveness = [rng.choice([.25, .5, .75], size=len(dist)) for dist in self.value_dists]
+
+    def test_exact_matches_enumeration(self):
+        self.assertAlmostEqual(
+            marginalize_exact(self.value_dists, self.supportiveness),
+            _brute_force(self.value_dists, self.supportiveness)
+        )
+        self.assertAlmostEqual(marginalize_exact([], []), .5)
+
+    def test_monte_carlo_within_interval(self):
+        exact = marginalize_exact(self.value_dists, self.supportiveness)
+        result = marginalize_monte_carlo(self.value_dists, self.supportiveness, num_samples=20000, confidence=.999, seed=0)
+
+        self.assertEqual(result.method, "monte-carlo")
+        self.assertLess(abs(result.score - exact), result.error)
+
+    def test_budget_picks_the_method(self):
+        self.assertEqual(marginalize(self.value_dists, self.supportiveness, budget=48).method, "exact")
+
+        result = marginalize(self.value_dists, self.supportiveness, budget=47, seed=0)
+        self.assertEqual(result.method, "monte-carlo")
+        self.assertGreater(result.error, 0.)
+
+    def test_padded_batch_matches_exact(self):
+        scenarios = [
+            (self.value_dists, self.supportiveness),
+            (self.value_dists[:2], self.supportiveness[:2]),
+            ([], [])
+        ]
+        scores = marginalize_batch(*pad_batch([dists for dists, _ in scenarios], [support for _, support in scenarios]), budget=300)
+
+        for score, (dists, support) in zip(scores, scenarios):
+            self.assertAlmostEqual(score, marginalize_exact(dists, support))
+
+        with self.assertRaises(ValueError):
+            marginalize_batch(*pad_batch([self.value_dists], [self.supportiveness]), budget=255)
+
+
+class TestRescoring(unittest.TestCase):
+
+    def test_rescore_stored_runs(self):
+        record = BIRDRunRecord(
+            scenario="s",
+            condition="c",
+            outcome_1="o1",
+            outcome_2="o2",
+            factors=[
+                {"name": "a", "values": [{"name": "a1"}, {"name": "a2"}]},
+                {"name": "b", "values": [{"name": "b1"}, {"name": "b2"}]},
+                {"name": "c", "values": [{"name": "c1"}, {"name": "c2"}]},
+            ],
+            implied_value_check={"a1": True, "a2": False, "b1": True, "b2": True, "c1": True, "c2": True},
+            direction_value_check={"a1": 1, "a2": 0, "b1": 1, "b2": 0, "c1": 0, "c2": 0},
+            filtered_factor_names=["a", "b"],
+            support_distribution={"b2": {"1": .5, "2": .5}},
+            final_score=None
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "runs.jsonl")
+            save_records([record, replace(record, scenario="s2")], path)
+
+            scores = BIRDProbInferenceInterface.rescore(path)
+            # a is settled on a1 (.25), b is split between b1 (.25) and b2 (.5 in expectation)
+            expected = .5 * .25 * .25 / (.25 * .25 + .75 * .75) + .5 * .25
+            self.assertAlmostEqual(scores[0], expected, places=5)
+            self.assertEqual(scores[0], scores[1])
+
+            # a resumed run appends its record again
+            save_records([replace(record, final_score=expected)], path)
+            self.assertEqual(load_records(path), [replace(record, final_score=expected), replace(record, scenario="s2")])
+            self.assertEqual(len(BIRDProbInferenceInterface.rescore(path)), 2)
+
+            neutral = BIRDProbInferenceInterface.rescore([record], supportiveness={0: .5, 1: .5, -1: .5})
+            self.assertAlmostEqual(neutral[0], .5)
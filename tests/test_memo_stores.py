@@ -0,0 +1,136 @@
+""" Offline tests for memoizing step verdicts across runs. """
+
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from collections import Counter
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_interface.memo_stores import MemoStore, InMemoryMemoStore, SQLiteMemoStore
+from langchain_interface.steps.bird.implication_check_step import (
+    BIRDImplicationCheckStep,
+    BIRDImplicationCheckResponse
+)
+from langchain_interface.steps.bird.grouped_implication_check_step import BIRDGroupedImplicationCheckStep
+from langchain_interface.interfaces.bird.prob_inference_interface import BIRDProbInferenceInterface
+from benchmarks.record_fixtures import _ScriptedBIRDModel, bird_inputs, load_scenarios
+
+
+_CHECK_STEPS = [
+    "BIRDImplicationCheckStep",
+    "BIRDGroupedImplicationCheckStep",
+    "BIRDSentenceSupportDeterminationStep",
+    "BIRDGroupedSentenceSupportDeterminationStep",
+]
+
+
+class _CountingScriptedBIRDModel(_ScriptedBIRDModel):
+    """ Counts its calls per step. """
+
+    calls: Counter = Counter()
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls[(run_manager.metadata if run_manager is not None else {}).get("step")] += 1
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+class TestMemoStores(unittest.TestCase):
+
+    def test_keys_ignore_superficial_differences(self):
+        self.assertEqual(
+            MemoStore.make_key("ns", {"a": "rain  tomorrow", "b": "x"}),
+            MemoStore.make_key("ns", {"b": " x", "a": "rain\ntomorrow "})
+        )
+        self.assertNotEqual(MemoStore.make_key("ns", {"a": "x"}), MemoStore.make_key("other", {"a": "x"}))
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "memos.db")
+            for store in [InMemoryMemoStore(), SQLiteMemoStore(database_path=path)]:
+                self.assertIsNone(store.lookup("key"))
+                store.update("key", {"implied": True})
+                self.assertEqual(store.lookup("key"), {"implied": True})
+
+            self.assertEqual(SQLiteMemoStore(database_path=path).lookup("key"), {"implied": True})
+
+    def test_sqlite_store_waits_to_enable_wal(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "memos.db")
+            # another process holding the new database, as when workers open it at once
+            holder = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+            holder.execute("CREATE TABLE IF NOT EXISTS memos (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            holder.execute("BEGIN IMMEDIATE")
+            release = threading.Timer(.2, holder.execute, args=("COMMIT",))
+            release.start()
+
+            store = SQLiteMemoStore(database_path=path, timeout=5.)
+            store.update("key", {"implied": True})
+            self.assertEqual(store.lookup("key"), {"implied": True})
+            release.join()
+            holder.close()
+
+    def test_memoized_chain_skips_seen_inputs(self):
+        llm = FakeListChatModel(responses=["```true```", "```false```"])
+        chain = InMemoryMemoStore().memoize(
+            BIRDImplicationCheckStep().chain_llm(llm),
+            namespace="implication",
+            response_class=BIRDImplicationCheckResponse
+        )
+
+        first = chain.invoke({"scenario": "s", "condition": "c", "statement": "it rains"})
+        second = chain.invoke({"scenario": "s ", "condition": "c", "statement": "it  rains"})
+        third = chain.invoke({"scenario": "s", "condition": "c", "statement": "it snows"})
+
+        self.assertTrue(first.implied)
+        self.assertEqual(second, first)
+        self.assertFalse(third.implied)
+
+
+class TestGroupedMemos(unittest.TestCase):
+
+    def _run(self, scenario, **kwargs):
+        llm = _CountingScriptedBIRDModel(scenarios=[scenario], calls=Counter())
+        output = BIRDProbInferenceInterface(**kwargs).get_runnable(llm).invoke(bird_inputs(scenario))
+        return output, {step: llm.calls[step] for step in _CHECK_STEPS if llm.calls[step]}
+
+    def test_grouped_checks_are_memoized_per_item(self):
+        scenario = load_scenarios()[1]
+        num_values = sum(len(values) for values in scenario["factors"].values())
+        store = InMemoryMemoStore()
+
+        expected, _ = self._run(scenario)
+        first, first_calls = self._run(scenario, memo_store=store, group_threshold=1, group_size=2)
+        self.assertEqual(first['final_score'], expected['final_score'])
+        self.assertEqual(set(first_calls), {"BIRDGroupedImplicationCheckStep", "BIRDGroupedSentenceSupportDeterminationStep"})
+        # one memo per item and check
+        self.assertEqual(len(store._memos), 2 * num_values)
+
+        # grouped runs read the grouped verdicts back
+        output, calls = self._run(scenario, memo_store=store, group_threshold=1, group_size=2)
+        self.assertEqual(calls, {})
+        self.assertEqual(output['final_score'], expected['final_score'])
+
+        # single checks use another prompt, so they do not read grouped verdicts
+        output, calls = self._run(scenario, memo_store=store)
+        self.assertEqual(set(calls), {"BIRDImplicationCheckStep", "BIRDSentenceSupportDeterminationStep"})
+        self.assertEqual(output['final_score'], expected['final_score'])
+
+    def test_grouped_memos_are_tied_to_the_grouped_prompt_revision(self):
+        scenario = load_scenarios()[1]
+        store = InMemoryMemoStore()
+
+        self._run(scenario, memo_store=store, group_threshold=1, group_size=2)
+        with mock.patch.object(BIRDGroupedImplicationCheckStep, "__PROMPT_REVISION__", 1):
+            _, calls = self._run(scenario, memo_store=store, group_threshold=1, group_size=2)
+        self.assertEqual(set(calls), {"BIRDGroupedImplicationCheckStep"})
+
+    def test_only_misses_are_grouped(self):
+        scenario = load_scenarios()[1]
+        store = InMemoryMemoStore()
+
+        # a run of another scenario with the same values but another condition only shares support verdicts
+        self._run(scenario, memo_store=store)
+        _, calls = self._run({**scenario, "condition": "Nothing happens."}, memo_store=store, group_threshold=1, group_size=2)
+        self.assertEqual(set(calls), {"BIRDGroupedImplicationCheckStep"})
@@ -0,0 +1,307 @@
+""" Offline tests for output parsers and the shared fenced-block extraction. """
+
+import math
+import re
+import unittest
+from typing import List
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.language_models.fake_chat_models import FakeListChatModel, GenericFakeChatModel
+from langchain_interface.parsers import (
+    find_fenced_blocks,
+    first_fenced_block,
+    ParsingFailure,
+    ChoiceGrammar,
+    LabelLogprobOutputParser,
+    IncrementalJSONObjectParser
+)
+from langchain_interface.steps.bird.sentence_support_determination_step import BIRDSentenceSupportDeterminationStep
+from langchain_interface.steps.evidential_support_step import EvidentialSupportOutputParser, EvidentialSupportStep
+from langchain_interface.steps.quiz_question_step import QuizQuestionOutputParser
+from langchain_interface.steps._general_claim_feedback_step import GeneralClaimFeedbackOutputParser
+from langchain_interface.steps.probability_estimate_step import ReasoningBasedProbOutputParser
+from langchain_interface.steps.bird.implication_check_step import BIRDImplicationCheckOutputParser, BIRDImplicationCheckStep
+from langchain_interface.steps.bird.grouped_implication_check_step import BIRDGroupedImplicationCheckOutputParser
+from langchain_interface.steps.bird.grouped_sentence_support_determination_step import BIRDGroupedSentenceSupportDeterminationOutputParser
+from langchain_interface.steps.bird.sentence_support_determination_step import BIRDSentenceSupportDeterminationOutputParser
+from langchain_interface.steps.bird.verbalized_probability_step import (
+    BIRDVerbalizedProbabilityOutputParser,
+    BIRDVerbalizedProbabilityStep
+)
+from langchain_interface.steps.bird.summarize_to_factor_step import BIRDSummarizeToFactorOutputParser
+
+
+class TestFencedBlocks(unittest.TestCase):
+
+    def test_find_fenced_blocks(self):
+        text = "reasoning\n```python\nx = 1\n```\nmore\n```Outcome 1```"
+        blocks = find_fenced_blocks(text)
+
+        self.assertEqual(len(blocks), 2)
+        self.assertEqual(blocks[0].language, "python")
+        self.assertEqual(blocks[0].body, "x = 1\n")
+        self.assertEqual(blocks[1].content, "Outcome 1")
+        self.assertEqual(blocks[1].language, "")
+        self.assertEqual(text[blocks[1].start:blocks[1].end], "```Outcome 1```")
+        self.assertIs(find_fenced_blocks(text), blocks)
+
+    def test_first_fenced_block(self):
+        self.assertIsNone(first_fenced_block("no fences here"))
+        self.assertEqual(first_fenced_block("```a``` ```python\nb```", language="python").body, "b")
+
+
+class TestOutputParsers(unittest.TestCase):
+
+    def test_evidential_support(self):
+        response = EvidentialSupportOutputParser().parse("Because.\n```\nLabel: Neutral\n```")
+        self.assertEqual(response.label, "Neutral")
+        self.assertEqual(response.reasoning, "Because.")
+
+    def test_reasoning_based_prob(self):
+        parser = ReasoningBasedProbOutputParser()
+        self.assertAlmostEqual(parser.parse("```0.72```").prob, 0.72)
+        self.assertAlmostEqual(parser.parse("```\n55%\n```").prob, 0.55)
+        self.assertAlmostEqual(parser.parse("``` 1 / 4 ```").prob, 0.25)
+
+    def test_general_claim_feedback(self):
+        response = GeneralClaimFeedbackOutputParser().parse("Too vague.\n```**Need Further Refinement**: True```")
+        self.assertEqual(response.verbal_feedback, "Too vague.")
+        self.assertTrue(response.need_further_refinement)
+
+        with self.assertRaises(ParsingFailure):
+            GeneralClaimFeedbackOutputParser().parse("Too vague.")
+
+    def test_bird_classification(self):
+        self.assertTrue(BIRDImplicationCheckOutputParser().parse("so\n```true```").implied)
+        self.assertFalse(BIRDImplicationCheckOutputParser().parse("so\n```false```").implied)
+        self.assertEqual(BIRDSentenceSupportDeterminationOutputParser().parse("```Outcome 2```").support_index, 1)
+        self.assertEqual(BIRDSentenceSupportDeterminationOutputParser().parse("no block").support_index, -1)
+
+    def test_bird_grouped_implication(self):
+        response = BIRDGroupedImplicationCheckOutputParser().parse(
+            '{"results": [{"statement": "It rains.", "reasoning": "r", "implied": true}, '
+            '{"statement": "it  snows", "reasoning": "r", "implied": false}]}'
+        )
+        self.assertTrue(response.verdict("It rains."))
+        self.assertFalse(response.verdict("It snows"))
+        self.assertIsNone(response.verdict("It hails"))
+
+        with self.assertRaises(ParsingFailure):
+            BIRDGroupedImplicationCheckOutputParser().parse('{"verdicts": []}')
+
+    def test_bird_grouped_support(self):
+        response = BIRDGroupedSentenceSupportDeterminationOutputParser().parse(
+            '{"results": [{"condition": "It rains", "reasoning": "r", "result": "Outcome 2"}, '
+            '{"condition": "It snows", "reasoning": "r", "result": "Both"}]}'
+        )
+        self.assertEqual(response.response_for("it rains.").support_index, 1)
+        self.assertEqual(response.response_for("It snows").support_index, -1)
+        self.assertIsNone(response.response_for("It hails"))
+
+    def test_bird_verbalized_probability(self):
+        response = BIRDVerbalizedProbabilityOutputParser().parse("```\nOutcome 1: Likely\nOutcome 2: Unlikely\n```")
+        self.assertAlmostEqual(response.verbalized_probability[0], 0.8)
+        self.assertAlmostEqual(response.verbalized_probability[1], 0.2)
+
+        for text in [
+            "Outcome 1: Likely\nOutcome 2: Unlikely",
+            "```\nOutcome 1: Likely\n```",
+            "```\nOutcome 1: Probable\nOutcome 2: Unlikely\n```",
+            "```\nLikely\nUnlikely\n```",
+        ]:
+            with self.subTest(text=text):
+                with self.assertRaises(ParsingFailure) as context:
+                    BIRDVerbalizedProbabilityOutputParser().parse(text)
+                self.assertEqual(context.exception.text_to_parse, text)
+
+
+class TestBulkParsing(unittest.TestCase):
+
+    def test_parse_many_keeps_failures_in_place(self):
+        results = EvidentialSupportOutputParser().parse_many([
+            "a\n```\nLabel: Neutral\n```",
+            "no block at all",
+            "b\n```\nLabel: Entailment\n```",
+        ])
+
+        self.assertEqual([r.ok for r in results], [True, False, True])
+        self.assertEqual(results[0].value.label, "Neutral")
+        self.assertEqual(results[1].reason, "No ``` block found.")
+        self.assertEqual(results[1].text, "no block at all")
+        self.assertEqual(results[2].value.label, "Entailment")
+
+    def test_json_parse_many(self):
+        parser = BIRDSummarizeToFactorOutputParser()
+        results = parser.parse_many(['{"a": ["x", "y"]}', ' {"b": []} '])
+        self.assertEqual([r.value.factor_dict for r in results], [{"a": ["x", "y"]}, {"b": []}])
+
+        results = parser.parse_many(['{"a": ["x", "y"]}', 'not json'])
+        self.assertEqual(results[0].value.factor_dict, {"a": ["x", "y"]})
+        self.assertFalse(results[1].ok)
+
+    def test_batch_routes_through_parse_many(self):
+        parser = ReasoningBasedProbOutputParser()
+        results = parser.batch(
+            [AIMessage(content="```0.3```", additional_kwargs={"reasoning_content": "because"}), "no block"],
+            return_exceptions=True
+        )
+
+        self.assertAlmostEqual(results[0].prob, 0.3)
+        self.assertEqual(results[0].reasoning, "because")
+        self.assertIsInstance(results[1], ParsingFailure)
+
+        with self.assertRaises(ParsingFailure):
+            parser.batch(["no block"])
+
+    def test_try_parse_does_not_raise(self):
+        result = QuizQuestionOutputParser().try_parse("no fields here")
+        self.assertFalse(result.ok)
+        self.assertIn("**Question**", result.reason)
+
+
+class TestReask(unittest.TestCase):
+
+    def test_only_failed_items_are_reasked(self):
+        llm = FakeListChatModel(responses=[
+            "a\n```\nLabel: Neutral\n```",
+            "garbage",
+            "b\n```\nLabel: Entailment\n```",
+        ])
+        results = EvidentialSupportStep().batch_with_reask(
+            llm,
+            [{"premise": "p1", "hypothesis": "h1"}, {"premise": "p2", "hypothesis": "h2"}],
+            config={"max_concurrency": 1},
+        )
+
+        self.assertEqual([r.value.label for r in results], ["Neutral", "Entailment"])
+        self.assertEqual([r.attempts for r in results], [1, 2])
+
+    def test_gives_up_after_max_reasks(self):
+        llm = FakeListChatModel(responses=["garbage"])
+        results = EvidentialSupportStep().batch_with_reask(llm, [{"premise": "p", "hypothesis": "h"}], max_reasks=2)
+
+        self.assertFalse(results[0].ok)
+        self.assertEqual(results[0].attempts, 3)
+
+
+class TestOutputGrammar(unittest.TestCase):
+
+    def test_choice_grammar_backends(self):
+        grammar = ChoiceGrammar(choices=("```true```", "```false```"))
+        self.assertEqual(grammar.to_guided_decoding_params(), {"guided_choice": ["```true```", "```false```"]})
+        self.assertEqual(grammar.to_json_schema()["properties"]["answer"]["enum"], ["```true```", "```false```"])
+        self.assertEqual(grammar.normalize('{"answer": "```true```"}'), "```true```")
+
+    def test_verbalized_probability_grammar_matches_the_prompt(self):
+        pattern = re.compile(BIRDVerbalizedProbabilityStep().get_output_grammar().pattern)
+        for text in [
+            "```\nOutcome 1: Likely\nOutcome 2: Unlikely\n```",
+            "```\nOutcome 1: somewhat likely\nOutcome 2: Somewhat unlikely\n```",
+        ]:
+            with self.subTest(text=text):
+                self.assertIsNotNone(pattern.fullmatch(text))
+                BIRDVerbalizedProbabilityOutputParser().parse(text)
+        self.assertIsNone(pattern.fullmatch("```\nOutcome 1: Probable\nOutcome 2: Unlikely\n```"))
+
+    def test_structured_output_is_unwrapped_for_the_parser(self):
+        llm = FakeListChatModel(responses=['{"answer": "```Outcome 2```"}'])
+        chain = BIRDSentenceSupportDeterminationStep().chain_llm(llm, guided_decoding="openai")
+        response = chain.invoke({"scenario": "s", "outcome_1": "o1", "outcome_2": "o2", "condition": "c"})
+        self.assertEqual(response.support_index, 1)
+
+
+class _PromptCapturingChatModel(GenericFakeChatModel):
+    """ Answers with the given messages and keeps the prompts it was sent. """
+
+    prompts: List[List[BaseMessage]] = []
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(messages)
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+class TestLabelScoring(unittest.TestCase):
+
+    @staticmethod
+    def _scored_message(top_logprobs):
+        return AIMessage(
+            content=top_logprobs[0][0],
+            response_metadata={"logprobs": {"content": [{
+                "token": top_logprobs[0][0],
+                "logprob": top_logprobs[0][1],
+                "top_logprobs": [{"token": token, "logprob": logprob} for token, logprob in top_logprobs]
+            }]}}
+        )
+
+    def test_distribution_from_top_logprobs(self):
+        message = self._scored_message([("true", math.log(.6)), (" True", math.log(.2)), ("false", math.log(.1)), ("maybe", math.log(.1))])
+        response = LabelLogprobOutputParser(labels=("true", "false")).invoke(message)
+
+        self.assertEqual(response.label, "true")
+        self.assertAlmostEqual(response.distribution["true"], .8 / .9)
+        self.assertAlmostEqual(response.distribution["false"], .1 / .9)
+
+        flattened = LabelLogprobOutputParser(labels=("true", "false"), temperature=2.).invoke(message)
+        self.assertAlmostEqual(flattened.distribution["true"], math.sqrt(.8) / (math.sqrt(.8) + math.sqrt(.1)))
+
+        with self.assertRaises(ParsingFailure):
+            LabelLogprobOutputParser(labels=("true", "false")).invoke(AIMessage(content="true"))
+
+    def test_step_scoring_chain(self):
+        llm = GenericFakeChatModel(messages=iter([
+            self._scored_message([("Ent", math.log(.7)), ("Neutral", math.log(.2)), ("Contr", math.log(.1))])
+        ]))
+        response = EvidentialSupportStep().chain_llm_scoring(llm).invoke({"premise": "p", "hypothesis": "h"})
+
+        self.assertEqual(response.label, "Entailment")
+        self.assertAlmostEqual(response.distribution["Contradiction"], .1)
+
+    def test_scoring_prompts_answer_with_bare_labels(self):
+        cases = [
+            (BIRDImplicationCheckStep(), {"scenario": "s", "condition": "c", "statement": "x"}, [("true", math.log(.7)), ("false", math.log(.2)), ("```", math.log(.1))]),
+            (BIRDSentenceSupportDeterminationStep(), {"scenario": "s", "outcome_1": "o1", "outcome_2": "o2", "condition": "c"}, [("2", math.log(.6)), ("1", math.log(.3)), ("Neither", math.log(.1))]),
+            (EvidentialSupportStep(), {"premise": "p", "hypothesis": "h"}, [("Ent", math.log(.5)), ("Neutral", math.log(.5))]),
+        ]
+
+        for step, inputs, top_logprobs in cases:
+            with self.subTest(step=step.__class__.__name__):
+                llm = _PromptCapturingChatModel(messages=iter([self._scored_message(top_logprobs)]))
+                response = step.chain_llm_scoring(llm).invoke(inputs)
+                prompt = llm.prompts[0]
+                roles = [message.type for message in prompt]
+
+                # one query turn per example, each answered by a bare label, and the query last
+                self.assertEqual(roles, ["system"] + ["human", "ai"] * (len(prompt) // 2 - 1) + ["human"])
+                self.assertTrue(prompt[0].content.endswith(step.get_scoring_instruction()))
+                for message in prompt[2:-1:2]:
+                    self.assertIsNotNone(LabelLogprobOutputParser(labels=step.get_label_candidates())._match_label(message.content), message.content)
+                self.assertEqual(prompt[-1].content, step.get_prompt_template().invoke(inputs).to_messages()[-1].content)
+
+                expected = {label: 0. for label in step.get_label_candidates()}
+                for token, logprob in top_logprobs:
+                    label = next((label for label in expected if label.lower().startswith(token.lower())), None)
+                    if label is not None:
+                        expected[label] += math.exp(logprob)
+                total = sum(expected.values())
+                for label, mass in expected.items():
+                    self.assertAlmostEqual(response.distribution[label], mass / total)
+
+
+class TestIncrementalJSON(unittest.TestCase):
+
+    def test_members_are_emitted_as_they_close(self):
+        parser = IncrementalJSONObjectParser()
+        text = '```json\n{"a, {b}": ["x \\"y\\"", "z"], "c": []}\n```'
+
+        emitted = [(idx, member) for idx in range(len(text)) for member in parser.feed(text[idx])]
+
+        self.assertEqual([member for _, member in emitted], [("a, {b}", ['x "y"', "z"]), ("c", [])])
+        self.assertEqual(text[emitted[0][0]], ",")
+        self.assertTrue(parser.done)
+
+    def test_parser_streams_members(self):
+        chunks = ['{"weather": ["rain",', ' "sun"], "ti', 'me": ["night"]}']
+        members = list(BIRDSummarizeToFactorOutputParser().iter_members(chunks))
+        self.assertEqual(members, [("weather", ["rain", "sun"]), ("time", ["night"])])
+
+        with self.assertRaises(ParsingFailure):
+            list(BIRDSummarizeToFactorOutputParser().iter_members(['{"weather": ["rain"]']))
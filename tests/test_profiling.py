@@ -0,0 +1,74 @@
+""" Offline tests for sampling profiles of graph runs. """
+
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from typing_extensions import TypedDict
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph import StateGraph, START, END
+from langchain_interface.instrumentation import SamplingProfiler, load_folded, diff_profiles, diff_folded
+from langchain_interface.steps.bird.implication_check_step import BIRDImplicationCheckStep
+
+
+def _spin(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+class _State(TypedDict):
+    value: int
+
+
+def _graph(seconds: float = .2):
+
+    async def _aspin(state):
+        _spin(seconds)
+        return {"value": 1}
+
+    graph_builder = StateGraph(_State)
+    graph_builder.add_node("spin", RunnableLambda(lambda state: _spin(seconds) or {"value": 1}, afunc=_aspin))
+    graph_builder.add_node("quick", lambda state: {"value": 2})
+    graph_builder.add_edge(START, "spin")
+    graph_builder.add_edge("spin", "quick")
+    graph_builder.add_edge("quick", END)
+    return graph_builder.compile()
+
+
+class TestProfiling(unittest.TestCase):
+
+    def test_time_is_attributed_to_nodes(self):
+        graph = _graph()
+        for run in [lambda: graph.invoke({"value": 0}), lambda: asyncio.run(graph.ainvoke({"value": 0}))]:
+            with SamplingProfiler(interval=.002) as profiler:
+                run()
+            by_node = profiler.by_node()
+            self.assertGreater(by_node.get("node:spin", 0.), .1)
+            self.assertLess(by_node.get("node:quick", 0.), .05)
+            self.assertTrue(any("_spin" in label for stack in profiler.stacks for label in stack))
+
+    def test_time_is_attributed_to_steps(self):
+        llm = RunnableLambda(lambda prompt: _spin(.15) or AIMessage(content="```true```"))
+        chain = BIRDImplicationCheckStep().chain_llm(llm)
+        with SamplingProfiler(interval=.002) as profiler:
+            chain.invoke({"scenario": "It rains.", "condition": "Clouds gather.", "statement": "The ground is wet."})
+        self.assertGreater(profiler.by_step().get("step:BIRDImplicationCheckStep", 0.), .1)
+
+    def test_folded_round_trip_and_diff(self):
+        with tempfile.TemporaryDirectory() as directory:
+            before, after = os.path.join(directory, "before.folded"), os.path.join(directory, "after.folded")
+            for path, seconds in [(before, .05), (after, .2)]:
+                graph = _graph(seconds)
+                with SamplingProfiler(interval=.002) as profiler:
+                    graph.invoke({"value": 0})
+                profiler.save(path)
+                self.assertEqual(load_folded(path), +profiler.stacks)
+
+            rows = diff_profiles(before, after)
+            self.assertEqual(rows[0][0], "node:spin")
+            self.assertGreater(rows[0][3], .1)
+            for line in diff_folded(load_folded(before), load_folded(after)).splitlines():
+                self.assertEqual(len(line.rsplit(" ", 2)), 3)
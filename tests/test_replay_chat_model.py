@@ -0,0 +1,70 @@
+""" Offline tests for replaying recorded completions. """
+
+import os
+import tempfile
+import unittest
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_interface.models.chat_models import ReplayChatModel, RecordingChatModel, prompt_key
+from langchain_interface.steps.step import Step
+from langchain_interface.steps.bird.implication_check_step import BIRDImplicationCheckStep
+from langchain_interface.interfaces.bird.prob_inference_interface import BIRDProbInferenceInterface
+from benchmarks.suite import load_step_fixtures
+from benchmarks.record_fixtures import DEFAULT_RECORDINGS, bird_inputs, load_scenarios
+
+
+_INPUTS = {"scenario": "It rains.", "condition": "Clouds gather.", "statement": "The ground is wet."}
+
+
+class TestReplayChatModel(unittest.TestCase):
+
+    def test_replay(self):
+        messages = [SystemMessage(content="Be brief."), HumanMessage(content="Hi.")]
+        llm = ReplayChatModel(recordings={prompt_key(messages): "Hello."})
+
+        response = llm.invoke(messages)
+        self.assertEqual(response.content, "Hello.")
+        self.assertGreater(response.usage_metadata["input_tokens"], 0)
+
+        # the role counts, not only the content
+        with self.assertRaises(ValueError):
+            llm.invoke([HumanMessage(content="Be brief."), HumanMessage(content="Hi.")])
+
+        fallback = ReplayChatModel(responses=["a", "b", "c"])
+        self.assertEqual(fallback.invoke("Hi.").content, fallback.invoke("Hi.").content)
+        self.assertEqual(fallback.num_misses, 2)
+
+    def test_record_and_replay(self):
+        step = BIRDImplicationCheckStep()
+        recorder = RecordingChatModel(llm=ReplayChatModel(responses=["Likely.\n```true```"]))
+        self.assertTrue(step.chain_llm(recorder).invoke(_INPUTS).implied)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "recordings.jsonl")
+            recorder.save(path)
+            llm = ReplayChatModel.from_file(path)
+
+        self.assertTrue(step.chain_llm(llm).invoke(_INPUTS).implied)
+        self.assertEqual(llm.num_misses, 0)
+
+    def test_step_fixtures(self):
+        fixtures = load_step_fixtures()
+        self.assertEqual(
+            {fixture["step"] for fixture in fixtures},
+            {name for name in Step.list_available() if name != "refine-claim-set-split"}
+        )
+
+        for fixture in fixtures:
+            step = Step.by_name(fixture["step"])()
+            messages = step.get_prompt_template().invoke(fixture["inputs"]).to_messages()
+            llm = ReplayChatModel(recordings={prompt_key(messages): fixture["completion"]})
+            with self.subTest(step=fixture["step"]):
+                self.assertEqual(step.chain_llm(llm).invoke(fixture["inputs"]).messages, fixture["completion"])
+
+    def test_bird_recordings(self):
+        """ If this fails, a BIRD prompt changed: run `python -m benchmarks.record_fixtures`. """
+        llm = ReplayChatModel.from_file(DEFAULT_RECORDINGS)
+        runnable = BIRDProbInferenceInterface().get_runnable(llm)
+
+        for scenario in load_scenarios():
+            self.assertIsNotNone(runnable.invoke(bird_inputs(scenario))["final_score"])
+        self.assertEqual(llm.num_misses, 0)
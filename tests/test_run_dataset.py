@@ -0,0 +1,97 @@
+""" Offline tests for streaming a dataset through an interface. """
+
+import asyncio
+import json
+import os
+import random
+import tempfile
+import unittest
+from langchain_core.runnables import RunnableLambda
+from langchain_interface.interfaces.interface import Interface
+
+
+class _SleepyInterface(Interface):
+    """ Echoes `value` after a random delay, failing on negative values. """
+
+    def __init__(self):
+        super().__init__()
+        self.running = 0
+        self.max_running = 0
+        self.num_read = 0
+
+    def get_runnable(self, llm=None):
+
+        async def _acall(input):
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            try:
+                await asyncio.sleep(random.random() * .01)
+                if input['value'] < 0:
+                    raise ValueError("negative")
+                return {"value": input['value'], "square": input['value'] ** 2}
+            finally:
+                self.running -= 1
+
+        return RunnableLambda(lambda input: None, afunc=_acall)
+
+    def inputs(self, values):
+        for value in values:
+            self.num_read += 1
+            yield {"value": value}
+
+
+class TestRunDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.directory.name, "outputs.jsonl")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _read(self):
+        with open(self.output_path, "r", encoding="utf-8") as file_:
+            return [json.loads(line) for line in file_]
+
+    def test_ordered_and_bounded(self):
+        interface = _SleepyInterface()
+        seen = []
+
+        def _on_result(index, output, error):
+            # nothing more than the window has been read ahead of the writer
+            self.assertLessEqual(interface.num_read - index, 12)
+            seen.append(index)
+
+        values = list(range(100)) + [-1] + list(range(100, 150))
+        report = interface.run_dataset(
+            None,
+            interface.inputs(values),
+            output_path=self.output_path,
+            on_result=_on_result,
+            output_fn=lambda state: state['square'],
+            max_concurrency=4,
+            max_pending=12,
+            progress=False
+        )
+
+        records = self._read()
+        self.assertEqual(report.num_inputs, len(values))
+        self.assertEqual(report.num_failed, 1)
+        self.assertLessEqual(interface.max_running, 4)
+        self.assertEqual(seen, list(range(len(values))))
+        self.assertEqual([record['index'] for record in records], list(range(len(values))))
+        self.assertIn("negative", records[100]['error'])
+        self.assertEqual([record['output'] for record in records[:100]], [value ** 2 for value in range(100)])
+
+    def test_resume_from_file(self):
+        input_path = os.path.join(self.directory.name, "inputs.jsonl")
+        with open(input_path, "w", encoding="utf-8") as file_:
+            for value in range(20):
+                file_.write(json.dumps({"value": value}) + "\n")
+
+        interface = _SleepyInterface()
+        interface.run_dataset(None, (item for item, _ in zip(interface.inputs(range(20)), range(8))), output_path=self.output_path, progress=False)
+        report = interface.run_dataset(None, input_path, output_path=self.output_path, resume=True, progress=False)
+
+        self.assertEqual(report.num_inputs, 12)
+        self.assertEqual([record['output']['value'] for record in self._read()], list(range(20)))
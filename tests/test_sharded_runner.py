@@ -0,0 +1,98 @@
+""" Offline tests for running an interface in worker processes. """
+
+import functools
+import json
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+from dataclasses import dataclass
+from langchain_core.runnables import RunnableLambda
+from langchain_interface.instances.instance import LLMResponse
+from langchain_interface.interfaces.interface import Interface
+from langchain_interface.memo_stores import SQLiteMemoStore
+from langchain_interface.runners import run_sharded
+
+
+@dataclass(frozen=True, eq=True)
+class _Square(LLMResponse):
+    value: int
+
+
+class _SquareInterface(Interface):
+    """ Squares `value` through a memoized "model" call. """
+
+    def __init__(self, memo_store):
+        super().__init__()
+        self._memo_store = memo_store
+
+    def get_runnable(self, llm=None):
+        square = self._memo_store.memoize(
+            RunnableLambda(lambda input: _Square(messages="", value=input['value'] ** 2)),
+            namespace="square",
+            response_class=_Square
+        )
+        return RunnableLambda(lambda input: {"square": square.invoke({"value": input['value']}).value})
+
+
+def _factory(memo_path):
+    return _SquareInterface(SQLiteMemoStore(memo_path)), None
+
+
+class TestShardedRunner(unittest.TestCase):
+
+    def test_merged_in_order_with_shared_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path, output_path, memo_path = (os.path.join(directory, name) for name in ["inputs.jsonl", "outputs.jsonl", "memos.db"])
+            with open(input_path, "w", encoding="utf-8") as file_:
+                for value in range(50):
+                    file_.write(json.dumps({"value": value % 20}) + "\n")
+
+            report = run_sharded(
+                functools.partial(_factory, memo_path),
+                input_path,
+                output_path,
+                num_workers=3,
+                max_concurrency=2,
+                progress=False
+            )
+
+            with open(output_path, "r", encoding="utf-8") as file_:
+                records = [json.loads(line) for line in file_]
+
+            self.assertEqual(report.num_inputs, 50)
+            self.assertEqual(report.num_failed, 0)
+            self.assertEqual([record['index'] for record in records], list(range(50)))
+            self.assertEqual([record['output']['square'] for record in records], [(value % 20) ** 2 for value in range(50)])
+            self.assertFalse([name for name in os.listdir(directory) if ".shard-" in name])
+
+            store = SQLiteMemoStore(memo_path)
+            for value in range(20):
+                self.assertIsNotNone(store.lookup(store.make_key("square", {"value": value})))
+
+    def test_each_worker_is_sent_its_shard(self):
+        inputs = [{"value": value} for value in range(10)]
+        submit = ProcessPoolExecutor.submit
+        sent = []
+
+        def _submit(executor, fn, factory, shard_inputs, *args):
+            sent.append(shard_inputs)
+            return submit(executor, fn, factory, shard_inputs, *args)
+
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(ProcessPoolExecutor, "submit", _submit):
+            output_path = os.path.join(directory, "outputs.jsonl")
+            report = run_sharded(
+                functools.partial(_factory, os.path.join(directory, "memos.db")),
+                inputs,
+                output_path,
+                num_workers=3,
+                progress=False
+            )
+
+            with open(output_path, "r", encoding="utf-8") as file_:
+                records = [json.loads(line) for line in file_]
+
+        self.assertEqual(sent, [inputs[shard::3] for shard in range(3)])
+        self.assertEqual(report.num_inputs, 10)
+        self.assertEqual([record['output']['square'] for record in records], [value ** 2 for value in range(10)])
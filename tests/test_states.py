@@ -0,0 +1,130 @@
+""" Offline tests for the state reducers. """
+
+import os
+import tempfile
+import unittest
+from langchain_interface.states.base_states import (
+    append,
+    keyupdate,
+    spanupdate,
+    AppendAggregate,
+    KeyUpdateAggregate,
+    SpanUpdateAggregate
+)
+from langchain_interface.models.chat_models import ReplayChatModel
+from langchain_interface.checkpointers import SQLiteCheckpointSaver
+from langchain_interface.interfaces.bird.prob_inference_interface import BIRDProbInferenceInterface
+from benchmarks.record_fixtures import DEFAULT_RECORDINGS, bird_inputs, load_scenarios
+
+
+# `final_score` of the default graph on the recorded scenarios
+_EXPECTED_SCORES = [.75, .3, .75, .5]
+
+
+class _CrashingReplayChatModel(ReplayChatModel):
+    """ Raises on its `crash_at`-th call and replays every other call. """
+
+    crash_at: int = 3
+    num_calls: int = 0
+
+    def _completion(self, messages):
+        self.num_calls += 1
+        if self.num_calls == self.crash_at:
+            raise RuntimeError("crash")
+        return super()._completion(messages)
+
+
+class TestReducers(unittest.TestCase):
+
+    def test_handed_in_values_are_not_mutated(self):
+        initial_list, initial_dict = ["a"], {"a": True}
+
+        merged_list = append(append(initial_list, "b"), ["c", "d"])
+        merged_dict = keyupdate(keyupdate(initial_dict, {"b": False}), {"c": True})
+
+        self.assertEqual(merged_list, ["a", "b", "c", "d"])
+        self.assertEqual(merged_dict, {"a": True, "b": False, "c": True})
+        self.assertEqual(initial_list, ["a"])
+        self.assertEqual(initial_dict, {"a": True})
+
+    def test_merged_values_are_not_mutated(self):
+        merged_list, merged_dict = append([], "a"), keyupdate({}, {"a": True})
+        self.assertEqual(append(merged_list, "b"), ["a", "b"])
+        self.assertEqual(keyupdate(merged_dict, {"b": True}), {"a": True, "b": True})
+        self.assertEqual(merged_list, ["a"])
+        self.assertEqual(merged_dict, {"a": True})
+
+        spans = spanupdate({}, {"stage": (1., 2.)})
+        self.assertEqual(spanupdate(spans, {"stage": (0., 1.5)}), {"stage": (0., 2.)})
+        self.assertEqual(spans, {"stage": (1., 2.)})
+
+
+class TestOnePassAggregates(unittest.TestCase):
+
+    def test_step_writes_are_merged_like_the_reducers(self):
+        writes = [{f"value {idx}": idx % 2 == 0} for idx in range(64)]
+        channel = KeyUpdateAggregate(dict).from_checkpoint({"value 0": False, "prior": True})
+        self.assertTrue(channel.update(writes))
+
+        expected = {"value 0": False, "prior": True}
+        for write in writes:
+            expected = keyupdate(expected, write)
+        self.assertEqual(channel.get(), expected)
+
+        channel = AppendAggregate(list).from_checkpoint(["a"])
+        channel.update(["b", ["c", "d"]])
+        self.assertEqual(channel.get(), append(append(["a"], "b"), ["c", "d"]))
+
+        channel = SpanUpdateAggregate(dict).from_checkpoint({"stage": (1., 2.)})
+        channel.update([{"stage": (0., 1.5)}, {"stage": (1., 3.)}, {"other": (4., 5.)}])
+        self.assertEqual(channel.get(), {"stage": (0., 3.), "other": (4., 5.)})
+
+    def test_checkpointed_values_are_not_mutated(self):
+        checkpointed_list, checkpointed_dict = ["a"], {"a": True}
+        list_channel = AppendAggregate(list).from_checkpoint(checkpointed_list)
+        dict_channel = KeyUpdateAggregate(dict).from_checkpoint(checkpointed_dict)
+
+        list_channel.update(["b", "c"])
+        dict_channel.update([{"b": False}, {"c": True}])
+
+        self.assertEqual(list_channel.get(), ["a", "b", "c"])
+        self.assertEqual(checkpointed_list, ["a"])
+        self.assertEqual(checkpointed_dict, {"a": True})
+
+    def test_empty_steps_keep_the_value(self):
+        channel = AppendAggregate(list).from_checkpoint(["a"])
+        self.assertFalse(channel.update([]))
+        self.assertEqual(channel.get(), ["a"])
+
+
+class TestReducersInGraph(unittest.TestCase):
+    """ LangGraph applies the writes of a step to copies of the channels as well
+    (e.g. to route conditional edges), so reducers that merge in place apply
+    them twice.
+    """
+
+    def test_bird_updates_are_merged_once(self):
+        runnable = BIRDProbInferenceInterface().get_runnable(ReplayChatModel.from_file(DEFAULT_RECORDINGS))
+
+        for scenario, expected_score in zip(load_scenarios(), _EXPECTED_SCORES):
+            with self.subTest(scenario=scenario["scenario"]):
+                output = runnable.invoke(bird_inputs(scenario))
+                self.assertEqual(len(output['factors']), len(scenario["factors"]))
+                self.assertEqual(len(output['filtered_factor_names']), len(set(output['filtered_factor_names'])))
+                self.assertAlmostEqual(output['final_score'], expected_score, places=4)
+
+    def test_resumed_run_matches_uninterrupted_run(self):
+        scenario = load_scenarios()[0]
+
+        with tempfile.TemporaryDirectory() as directory:
+            llm = _CrashingReplayChatModel(recordings=ReplayChatModel.from_file(DEFAULT_RECORDINGS).recordings)
+            runnable = BIRDProbInferenceInterface(
+                checkpointer=SQLiteCheckpointSaver(os.path.join(directory, "checkpoints.db"))
+            ).get_runnable(llm)
+
+            with self.assertRaises(RuntimeError):
+                runnable.invoke(bird_inputs(scenario))
+            resumed = runnable.invoke(bird_inputs(scenario))
+
+        self.assertEqual(len(resumed['factors']), len(scenario["factors"]))
+        self.assertAlmostEqual(resumed['final_score'], _EXPECTED_SCORES[0], places=4)
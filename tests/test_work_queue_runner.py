@@ -0,0 +1,137 @@
+""" Offline tests for the work-queue runner and its SQLite queue. """
+
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from dataclasses import dataclass
+from langchain_core.runnables import RunnableLambda
+from langchain_interface.instances.instance import LLMResponse
+from langchain_interface.runners import WorkQueueRunner, SQLiteWorkQueue
+
+
+@dataclass(frozen=True, eq=True)
+class _Square(LLMResponse):
+    value: int
+
+
+class _SlowWorkQueue(SQLiteWorkQueue):
+    """ Takes a while to ack, as a remote or busy queue would. """
+
+    def ack(self, *args):
+        time.sleep(.2)
+        super().ack(*args)
+
+
+class TestWorkQueueRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "queue.db")
+        self.calls = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _runnable(self):
+
+        async def _acall(input):
+            self.calls.append(input['value'])
+            await asyncio.sleep(.001)
+            if input['value'] < 0:
+                raise ValueError("negative")
+            return {"square": _Square(messages="", value=input['value'] ** 2)}
+
+        return RunnableLambda(lambda input: None, afunc=_acall)
+
+    def test_submissions_are_deduplicated(self):
+        runner = WorkQueueRunner(SQLiteWorkQueue(self.path))
+        self.assertEqual(runner.submit({"value": value % 5} for value in range(10)), 5)
+        runner.work(self._runnable(), progress=False)
+        self.assertEqual(WorkQueueRunner(SQLiteWorkQueue(self.path)).submit({"value": value} for value in range(8)), 3)
+        self.assertEqual(WorkQueueRunner(SQLiteWorkQueue(self.path), namespace="other").submit([{"value": 0}]), 1)
+        self.assertEqual(runner.lookup({"value": 3}), ({"square": _Square(messages="", value=9)}, None))
+
+    def test_expired_leases_are_requeued(self):
+        queue = SQLiteWorkQueue(self.path)
+        runner = WorkQueueRunner(queue, lease_seconds=60.)
+        runner.submit({"value": value} for value in range(6))
+
+        # a worker that dies holding two items
+        self.assertEqual(len(queue.claim("dead", 2, lease_seconds=.05)), 2)
+        report = runner.work(self._runnable(), progress=False, poll_interval=.01, wait=False)
+        self.assertEqual(report.num_inputs, 4)
+
+        time.sleep(.1)
+        runner.work(self._runnable(), progress=False, poll_interval=.01)
+        self.assertEqual(sorted(self.calls), list(range(6)))
+        self.assertEqual([output['square'].value for _, output, _ in runner.results()], [value ** 2 for value in range(6)])
+
+    def test_failures_are_retried_then_failed(self):
+        runner = WorkQueueRunner(SQLiteWorkQueue(self.path), max_attempts=2)
+        runner.submit([{"value": 1}, {"value": -1}, {"value": 2}])
+        report = runner.work(self._runnable(), progress=False, poll_interval=.01)
+
+        # only the last attempt counts as a failure
+        self.assertEqual((report.num_inputs, report.num_failed), (3, 1))
+        self.assertEqual(self.calls.count(-1), 2)
+        results = list(runner.results())
+        self.assertIsNone(results[1][1])
+        self.assertIn("negative", results[1][2])
+
+    def test_items_that_kill_their_workers_are_failed(self):
+        queue = SQLiteWorkQueue(self.path)
+        runner = WorkQueueRunner(queue, max_attempts=2)
+        runner.submit([{"value": 1}, {"value": 2}])
+
+        # the first item takes down every worker that claims it
+        for attempt in [1, 2]:
+            claimed = queue.claim(f"dead {attempt}", 1, lease_seconds=.01, max_attempts=2)
+            self.assertEqual([(item.seq, item.attempts) for item in claimed], [(1, attempt)])
+            time.sleep(.05)
+
+        report = runner.work(self._runnable(), progress=False, poll_interval=.01)
+        self.assertEqual(self.calls, [2])
+        self.assertEqual((report.num_inputs, report.num_failed), (1, 0))
+        output, error = runner.lookup({"value": 1})
+        self.assertIsNone(output)
+        self.assertIn("Lease expired after 2 attempts", error)
+        self.assertEqual(queue.num_unfinished(), 0)
+
+    def test_workers_share_the_queue(self):
+        WorkQueueRunner(SQLiteWorkQueue(self.path)).submit({"value": value} for value in range(200))
+        threads = [
+            threading.Thread(target=lambda: WorkQueueRunner(SQLiteWorkQueue(self.path)).work(self._runnable(), max_concurrency=4, progress=False, poll_interval=.01))
+            for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(self.calls), list(range(200)))
+
+    def test_queue_calls_do_not_block_the_event_loop(self):
+        runner = WorkQueueRunner(_SlowWorkQueue(self.path))
+        runner.submit({"value": value} for value in range(4))
+        ticks = []
+
+        async def _tick():
+            while True:
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(.01)
+
+        async def _work():
+            ticker = asyncio.ensure_future(_tick())
+            try:
+                return await runner.awork(self._runnable(), progress=False, poll_interval=.01)
+            finally:
+                ticker.cancel()
+                ticks.append(time.perf_counter())
+
+        report = asyncio.run(_work())
+        self.assertEqual(report.num_inputs, 4)
+        # the acks take .2s each, the loop kept ticking meanwhile
+        self.assertLess(max(later - earlier for earlier, later in zip(ticks, ticks[1:])), .1)